@@ -0,0 +1,49 @@
+# audio/downlink.py
+
+from tts.audioDuration import duration_counter
+
+# Client-facing name -> ElevenLabs output_format. Raw PCM starts playing soonest (no decoder to
+# prime) but costs 256 kbit/s; MP3 and Opus trade a little start-up latency for far fewer bytes.
+OUTPUT_FORMATS = {
+    "pcm_16000": "pcm_16000",
+    "mp3": "mp3_44100_128",
+    "opus": "opus_48000_64",
+}
+DEFAULT_FORMAT = "mp3"  # What every client got before negotiation existed
+
+
+class DownlinkFormat:
+    """
+    How the server streams TTS audio to one client, agreed on connect. The client lists the
+    formats it can play in order of preference; the server picks the first one it allows.
+    Until a client asks (or when nothing matches) replies stay MP3.
+    """
+    def __init__(self, name: str = DEFAULT_FORMAT):
+        self.name = name
+        self.output_format = OUTPUT_FORMATS[name]
+
+    @classmethod
+    def negotiate(cls, client_config: dict, allowed=tuple(OUTPUT_FORMATS)):
+        requested = client_config.get("formats") or []
+        if isinstance(requested, str):
+            requested = [requested]
+        for name in requested:
+            if name in OUTPUT_FORMATS and name in allowed:
+                return cls(name)
+        return cls()
+
+    def counter(self):
+        """Fresh duration counter for one stretch of this format's audio."""
+        return duration_counter(self.output_format)
+
+    def to_message(self) -> dict:
+        message = {"type": "playback_config", "format": self.name, "output_format": self.output_format}
+        if self.name.startswith("pcm_"):
+            message.update(sample_rate=int(self.name.split("_")[1]), encoding="int16")
+        return message
+
+
+def allowed_formats(setting: str) -> tuple:
+    """Parses a comma-separated TTS_DOWNLINK_FORMATS value, ignoring unknown names."""
+    names = tuple(name.strip() for name in setting.split(",") if name.strip() in OUTPUT_FORMATS)
+    return names or (DEFAULT_FORMAT,)
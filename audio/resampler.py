@@ -0,0 +1,72 @@
+# audio/resampler.py
+
+from math import gcd
+
+import numpy as np
+
+ZERO_CROSSINGS = 16   # Filter half-width in output samples (quality vs. CPU)
+ROLLOFF = 0.9         # Passband edge as a fraction of the output Nyquist (7.2 kHz at 16 kHz)
+KAISER_BETA = 8.6     # ~85 dB stopband
+
+
+def design_polyphase_filter(up: int, down: int, zero_crossings: int = ZERO_CROSSINGS,
+                            rolloff: float = ROLLOFF, beta: float = KAISER_BETA) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass at the upsampled rate, cut at the lower of the two
+    Nyquists, split into `up` phases. Row p holds the taps for output phase p,
+    reversed so it can be dotted directly with a chronological window of input samples.
+    """
+    taps_per_phase = 2 * int(np.ceil(zero_crossings * max(1.0, down / up)))
+    length = taps_per_phase * up
+    cutoff = 0.5 * rolloff / max(up, down)              # cycles per upsampled sample
+    m = np.arange(length) - (length - 1) / 2
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * m) * np.kaiser(length, beta) * up
+    # prototype[phase + k * up] multiplies x[base - k]; reverse k to line up with x[base - taps + 1 .. base].
+    return prototype.reshape(taps_per_phase, up).T[:, ::-1].astype(np.float32).copy()
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (e.g. 44.1/48/22.05 kHz -> 16 kHz), one per client stream.
+    Each call consumes any number of samples and returns every output sample they complete;
+    the filter history and output phase carry over, so splitting a stream into frames gives
+    the same result as resampling it in one go. Output for a whole call is one gather + one
+    batched dot product, no Python loop per sample. int16 in -> int16 out, float in -> float32 out.
+    """
+    def __init__(self, in_rate: int, out_rate: int = 16000, zero_crossings: int = ZERO_CROSSINGS,
+                 rolloff: float = ROLLOFF, beta: float = KAISER_BETA):
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate, self.out_rate = in_rate, out_rate
+        self.up, self.down = out_rate // divisor, in_rate // divisor
+        self.phases = design_polyphase_filter(self.up, self.down, zero_crossings, rolloff, beta)
+        self.taps = self.phases.shape[1]
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0      # Input samples seen so far
+        self._produced = 0      # Output samples emitted so far
+
+    def __call__(self, samples: np.ndarray) -> np.ndarray:
+        is_pcm16 = samples.dtype == np.int16
+        if len(samples) == 0:  # e.g. an empty audio_chunk; sliding_window_view needs at least `taps` samples
+            return np.zeros(0, dtype=np.int16 if is_pcm16 else np.float32)
+        block = samples.astype(np.float32) * (1.0 / 32768.0) if is_pcm16 else samples.astype(np.float32, copy=False)
+        buffer = np.concatenate([self._history, block])
+        first_input = self._consumed - (self.taps - 1)     # Absolute index of buffer[0]
+        self._consumed += len(block)
+
+        # Output n sits at input position n * down / up; it needs inputs up to floor(n * down / up).
+        last = (self._consumed * self.up - 1) // self.down  # Last output whose newest input has arrived
+        n = np.arange(self._produced, last + 1, dtype=np.int64)
+        self._produced = last + 1
+        position = n * self.down
+        newest, phase = position // self.up, position % self.up
+
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+        out = np.einsum("ij,ij->i", windows[newest - first_input - (self.taps - 1)], self.phases[phase])
+        self._history = buffer[len(buffer) - (self.taps - 1):].copy()
+
+        if is_pcm16:
+            return np.clip(out * 32768.0, -32768, 32767).astype(np.int16)
+        return out.astype(np.float32, copy=False)
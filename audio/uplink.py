@@ -0,0 +1,79 @@
+# audio/uplink.py
+
+import base64
+
+import numpy as np
+
+from audio.resampler import PolyphaseResampler
+
+VAD_WINDOW_SIZE = 512          # Silero VAD window at 16 kHz (32 ms)
+MIN_FRAME_MS, MAX_FRAME_MS = 32, 100
+DEFAULT_FRAME_MS = 64
+ENCODINGS = ("float32", "int16")
+MIN_CLIENT_RATE, MAX_CLIENT_RATE = 8000, 96000
+
+
+class UplinkFormat:
+    """
+    How one client streams microphone audio to the server, agreed on connect.
+    Frames are whole multiples of the VAD window, so every message the server
+    receives maps onto complete VAD windows with no leftover bookkeeping.
+    Whatever the wire encoding, decoded audio is int16 PCM: that is what gets
+    buffered and uploaded to STT, and only VAD input is staged as float.
+    Clients that capture at another rate (browsers often ignore the 16 kHz hint)
+    send at their native rate and get a per-stream polyphase resampler.
+    """
+    def __init__(self, frame_samples: int, sample_rate: int = 16000, encoding: str = "float32",
+                 pipeline_rate: int = 16000):
+        self.frame_samples = frame_samples
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.pipeline_rate = pipeline_rate
+        self.resampler = PolyphaseResampler(sample_rate, pipeline_rate) if sample_rate != pipeline_rate else None
+
+    @classmethod
+    def negotiate(cls, client_config: dict, sample_rate: int = 16000):
+        """
+        Clamps the client's requested frame length to 32-100 ms. At the pipeline rate frames are
+        aligned to the VAD window; at other client rates they are the nearest whole sample count.
+        """
+        try:
+            frame_ms = float(client_config.get("frame_ms", DEFAULT_FRAME_MS))
+        except (TypeError, ValueError):
+            frame_ms = DEFAULT_FRAME_MS
+        frame_ms = min(MAX_FRAME_MS, max(MIN_FRAME_MS, frame_ms))
+        encoding = client_config.get("encoding", "float32")
+        if encoding not in ENCODINGS:
+            encoding = "float32"
+        try:
+            client_rate = int(client_config.get("sample_rate", sample_rate))
+        except (TypeError, ValueError):
+            client_rate = sample_rate
+        if not MIN_CLIENT_RATE <= client_rate <= MAX_CLIENT_RATE:
+            client_rate = sample_rate
+        if client_rate == sample_rate:
+            windows = max(1, int(frame_ms * sample_rate / 1000) // VAD_WINDOW_SIZE)
+            frame_samples = windows * VAD_WINDOW_SIZE
+        else:
+            frame_samples = int(round(frame_ms * client_rate / 1000))
+        return cls(frame_samples, client_rate, encoding, sample_rate)
+
+    def decode(self, data: str) -> np.ndarray:
+        """Decodes one base64 audio_chunk payload into int16 PCM at the pipeline rate."""
+        raw = base64.b64decode(data)
+        if self.encoding == "int16":
+            pcm = np.frombuffer(raw, dtype=np.int16)
+            return self.resampler(pcm) if self.resampler else pcm
+        samples = np.frombuffer(raw, dtype=np.float32)
+        if self.resampler:
+            samples = self.resampler(samples)
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+    def to_message(self) -> dict:
+        return {"type": "audio_config", "frame_samples": self.frame_samples,
+                "sample_rate": self.sample_rate, "encoding": self.encoding}
+
+
+def pcm16_to_float(pcm: np.ndarray) -> np.ndarray:
+    """VAD input staging: int16 PCM -> float32 in [-1, 1)."""
+    return pcm.astype(np.float32) * (1.0 / 32768.0)
@@ -0,0 +1,282 @@
+# benchmarks/endpointSweep.py
+
+"""
+Endpointing sweep: how the VAD/turn-taking parameters trade end-of-turn latency against
+cutting the user off mid-turn, measured on labeled recordings instead of guessed.
+
+1. Per-window speech probabilities are computed once per recording (ONNX VAD, cached in
+   --cache keyed by path and mtime), with --tail-silence-s of silence appended.
+2. The server's endpointing is replayed over those probabilities for every combination of
+   threshold x min_silence_duration_ms x end_of_turn_s: the StreamingVADIterator state
+   machine plus the /ws end-of-turn timer, stepped window by window with the whole grid
+   as one NumPy vector. Recordings are split across processes.
+3. Each labeled turn is scored: a premature cut is an end of turn declared inside it
+   (more than --tolerance-ms before its labeled end); latency is the time from the labeled
+   end to the first end of turn after it; a turn with none before the next one is missed.
+
+speech_pad_ms is not swept: it only moves the reported start/end sample, and the server
+buffers audio from the start window, so it changes neither the timing nor the cuts.
+Neither is max_utterance_s: reaching it cuts an STT segment at a pause
+(vad/utteranceSegmenter.py) but never ends the turn.
+
+Manifest: JSONL (one {"audio_path": ..., "speech_ts": [{"start": s, "end": s}, ...]} per
+line) or the .feather format of vad_model/silero-vad-master/tuning. Speech segments closer
+than --turn-gap-s belong to one turn (default: one turn per recording).
+
+Usage (from the repository root):
+    python -m benchmarks.endpointSweep --manifest turns.jsonl
+    python -m benchmarks.endpointSweep --manifest val.feather --end-of-turn 0.3 0.5 0.8 --csv sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+import wave
+from multiprocessing import Pool
+
+import numpy as np
+
+from audio.resampler import PolyphaseResampler
+from personas.personaRegistry import get_registry
+from vad.streamingVAD import SAMPLE_RATE, WINDOW_SIZE, load_vad_model
+
+NO_LIMIT = float("inf")
+
+
+# ==============================================================================
+# 1. LABELED RECORDINGS AND CACHED PROBABILITIES
+# ==============================================================================
+
+def load_manifest(path: str) -> list:
+    if path.endswith(".feather"):
+        import pandas as pd
+
+        return pd.read_feather(path, columns=["audio_path", "speech_ts"]).to_dict("records")
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def group_turns(speech_ts, turn_gap_s: float) -> np.ndarray:
+    """Labeled speech segments -> [(turn start, turn end)] in seconds."""
+    turns = []
+    for segment in sorted(speech_ts, key=lambda s: s["start"]):
+        if turns and segment["start"] - turns[-1][1] < turn_gap_s:
+            turns[-1][1] = max(turns[-1][1], segment["end"])
+        else:
+            turns.append([segment["start"], segment["end"]])
+    return np.array(turns, dtype=np.float64).reshape(-1, 2)
+
+
+def read_pcm16k(path: str) -> np.ndarray:
+    """Mono float32 at 16 kHz from a 16-bit WAV (or anything soundfile reads, if installed)."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as wf:
+            rate, channels = wf.getframerate(), wf.getnchannels()
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path} must be 16-bit PCM.")
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+    else:
+        import soundfile
+
+        pcm, rate = soundfile.read(path, dtype="float32", always_2d=True)
+        channels = pcm.shape[1]
+        pcm = pcm.reshape(-1)
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        pcm = PolyphaseResampler(rate, SAMPLE_RATE)(pcm)
+    return pcm
+
+
+def window_probabilities(model, pcm: np.ndarray) -> np.ndarray:
+    stream = model.new_stream()
+    count = len(pcm) // WINDOW_SIZE
+    windows = np.ascontiguousarray(pcm[:count * WINDOW_SIZE].reshape(count, WINDOW_SIZE), dtype=np.float32)
+    return np.array([stream(window) for window in windows], dtype=np.float32)
+
+
+def cached_probabilities(recordings: list, cache_path: str, tail_silence_s: float) -> list:
+    """Speech probability per 32 ms window for each recording, computed once and kept in an .npz."""
+    cache = dict(np.load(cache_path)) if cache_path and os.path.exists(cache_path) else {}
+    model, updated, probs = None, False, []
+    for recording in recordings:
+        path = recording["audio_path"]
+        key = f"{os.path.abspath(path)}|{os.path.getmtime(path)}|{tail_silence_s}"
+        if key not in cache:
+            model = model or load_vad_model("onnx")
+            pcm = np.concatenate([read_pcm16k(path), np.zeros(int(tail_silence_s * SAMPLE_RATE), np.float32)])
+            cache[key] = window_probabilities(model, pcm)
+            updated = True
+        probs.append(cache[key])
+    if cache_path and updated:
+        np.savez(cache_path, **cache)
+    return probs
+
+
+# ==============================================================================
+# 2. VECTORIZED REPLAY OF THE SERVER'S ENDPOINTING
+# ==============================================================================
+
+def simulate(probs: np.ndarray, turns: np.ndarray, grid: dict, tolerance_s: float):
+    """
+    Replays StreamingVADIterator._advance and the /ws end-of-turn timer for every grid point
+    at once. Returns (premature, latency) arrays of shape (grid points, turns); latency is
+    NaN where the turn was missed.
+    """
+    threshold = grid["threshold"]
+    min_silence = grid["min_silence_ms"] * SAMPLE_RATE / 1000
+    end_of_turn = grid["end_of_turn_s"] * SAMPLE_RATE
+    points = len(threshold)
+
+    triggered = np.zeros(points, dtype=bool)      # VAD iterator state
+    temp_end = np.zeros(points)
+    speaking = np.zeros(points, dtype=bool)       # Server state: utterance open, timer deadline
+    deadline = np.full(points, np.inf)
+
+    turn_start, turn_end = turns[:, 0] * SAMPLE_RATE, turns[:, 1] * SAMPLE_RATE
+    next_start = np.append(turn_start[1:], np.inf)
+    tolerance = tolerance_s * SAMPLE_RATE
+    premature = np.zeros((points, len(turns)), dtype=bool)
+    latency = np.full((points, len(turns)), np.nan)
+
+    def declare(mask, at):
+        """End of turn declared at sample(s) `at` for the grid points in `mask`."""
+        at = np.broadcast_to(at, mask.shape)
+        for k in range(len(turns)):
+            inside = mask & (at > turn_start[k]) & (at < turn_end[k] - tolerance)
+            premature[inside, k] = True
+            after = mask & (at >= turn_end[k] - tolerance) & (at < next_start[k]) & np.isnan(latency[:, k])
+            latency[after, k] = np.maximum(at[after] - turn_end[k], 0) / SAMPLE_RATE
+
+    for i, prob in enumerate(probs):
+        current = (i + 1) * WINDOW_SIZE
+
+        # The asyncio timer fires on the wall clock, before this window arrives.
+        fired = deadline <= current
+        if fired.any():
+            declare(fired & speaking, deadline)
+            speaking &= ~fired
+            deadline[fired] = np.inf
+
+        # StreamingVADIterator._advance
+        speech = prob >= threshold
+        temp_end[speech] = 0
+        start = speech & ~triggered
+        triggered |= start
+        low = (prob < threshold - 0.15) & triggered
+        temp_end[low & (temp_end == 0)] = current
+        end = low & (current - temp_end >= min_silence)
+        temp_end[end] = 0
+        triggered &= ~end
+
+        # /ws handler: a start opens (or continues) the utterance and cancels the timer; an end arms it.
+        speaking |= start
+        deadline[start] = np.inf
+        arm = end & speaking & np.isinf(deadline)
+        deadline[arm] = current + end_of_turn[arm]
+
+    return premature, latency
+
+
+def _simulate_job(job):
+    return simulate(*job)
+
+
+# ==============================================================================
+# 3. SUMMARY AND PARETO FRONTIER
+# ==============================================================================
+
+def summarize(grid: dict, premature: np.ndarray, latency: np.ndarray) -> list:
+    rows = []
+    for p in range(len(grid["threshold"])):
+        found = latency[p][~np.isnan(latency[p])]
+        rows.append({
+            "threshold": float(grid["threshold"][p]),
+            "min_silence_ms": int(grid["min_silence_ms"][p]),
+            "end_of_turn_s": float(grid["end_of_turn_s"][p]),
+            "premature_cut_rate": float(premature[p].mean()),
+            "missed_rate": float(1 - len(found) / latency.shape[1]),
+            "latency_p50_s": float(np.percentile(found, 50)) if len(found) else np.nan,
+            "latency_p90_s": float(np.percentile(found, 90)) if len(found) else np.nan,
+        })
+    return rows
+
+
+def pareto_frontier(rows: list, latency_key: str = "latency_p50_s", max_missed: float = 0.05) -> list:
+    """Settings no other setting beats on both latency and premature cuts (among those missing few turns)."""
+    candidates = sorted((r for r in rows if r["missed_rate"] <= max_missed and not np.isnan(r[latency_key])),
+                        key=lambda r: (r[latency_key], r["premature_cut_rate"]))
+    frontier, best_cut_rate = [], np.inf
+    for row in candidates:
+        if row["premature_cut_rate"] < best_cut_rate:
+            frontier.append(row)
+            best_cut_rate = row["premature_cut_rate"]
+    return frontier
+
+
+def print_rows(title: str, rows: list):
+    print(f"\n{title}")
+    print(f"  {'thr':>5} {'silence':>8} {'eot s':>6} | {'cut %':>6} {'miss %':>6} {'p50 s':>6} {'p90 s':>6}")
+    for r in rows:
+        print(f"  {r['threshold']:5.2f} {r['min_silence_ms']:8d} {r['end_of_turn_s']:6.2f} | "
+              f"{100 * r['premature_cut_rate']:6.1f} {100 * r['missed_rate']:6.1f} "
+              f"{r['latency_p50_s']:6.2f} {r['latency_p90_s']:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpointing sweep: end-of-turn latency vs. premature cuts.")
+    parser.add_argument("--manifest", required=True, help="JSONL or .feather with audio_path and speech_ts.")
+    parser.add_argument("--cache", default="endpoint_probs.npz", help="Per-window probability cache ('' to disable).")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    parser.add_argument("--min-silence-ms", type=int, nargs="+", default=[0, 50, 100, 200, 300, 500])
+    parser.add_argument("--end-of-turn", type=float, nargs="+", default=[0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.2])
+    parser.add_argument("--turn-gap-s", type=float, default=NO_LIMIT,
+                        help="Labeled speech closer than this is one turn (default: one turn per recording).")
+    parser.add_argument("--tolerance-ms", type=float, default=100.0, help="Label precision around the turn end.")
+    parser.add_argument("--tail-silence-s", type=float, default=3.0)
+    parser.add_argument("--max-missed", type=float, default=0.05, help="Frontier only keeps settings missing fewer turns.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", help="Write every grid point to this CSV.")
+    args = parser.parse_args()
+
+    recordings = load_manifest(args.manifest)
+    started = time.perf_counter()
+    probs = cached_probabilities(recordings, args.cache, args.tail_silence_s)
+    turns = [group_turns(r["speech_ts"], args.turn_gap_s) for r in recordings]
+    print(f"{len(recordings)} recordings, {sum(len(t) for t in turns)} turns, "
+          f"{sum(len(p) for p in probs)} windows (probabilities in {time.perf_counter() - started:.1f}s)")
+
+    combos = list(itertools.product(args.threshold, args.min_silence_ms, args.end_of_turn))
+    grid = {name: np.array(values, dtype=np.float64)
+            for name, values in zip(("threshold", "min_silence_ms", "end_of_turn_s"), zip(*combos))}
+
+    started = time.perf_counter()
+    jobs = [(p, t, grid, args.tolerance_ms / 1000) for p, t in zip(probs, turns) if len(t)]
+    with Pool(max(1, min(args.workers, len(jobs)))) as pool:
+        results = pool.map(_simulate_job, jobs, chunksize=max(1, len(jobs) // (4 * max(1, args.workers))))
+    premature = np.concatenate([r[0] for r in results], axis=1)
+    latency = np.concatenate([r[1] for r in results], axis=1)
+    print(f"Simulated {len(combos)} settings in {time.perf_counter() - started:.1f}s")
+
+    rows = summarize(grid, premature, latency)
+    vad = get_registry().default.vad
+    current = [r for r in rows if r["threshold"] == vad.threshold and r["min_silence_ms"] == vad.min_silence_duration_ms
+               and r["end_of_turn_s"] == vad.end_of_turn_s]
+    if current:
+        print_rows(f"Current defaults ({get_registry().default.name}):", current)
+    print_rows(f"Pareto frontier (p50 latency vs. premature cuts, <= {100 * args.max_missed:.0f}% missed turns):",
+               pareto_frontier(rows, max_missed=args.max_missed))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nAll {len(rows)} settings written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# benchmarks/loadTest.py
+
+"""
+Load test for server.py: spins up the app with mocked vendors (benchmarks/mockServer.py)
+and drives N simulated callers through the /ws audio_chunk protocol with real speech.
+
+Each caller streams a 16 kHz mono WAV in real time, keeps the "mic" open with silence
+until the AI starts talking (like the browser client), waits for tts_end and repeats.
+
+Usage (from the repository root):
+    python -m benchmarks.loadTest --wav speech_16k.wav --clients 20 --turns 3
+    python -m benchmarks.loadTest --wav speech_16k.wav --clients 50 --stt-latency 0.6 --tts-bytes-per-s 32000
+
+Reported: turn latency percentiles (end of user speech -> first TTS byte), transcript
+latency, VAD CPU per stream, event-loop lag and RSS per session.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import wave
+
+import numpy as np
+import websockets
+
+from audio.resampler import PolyphaseResampler
+from monitoring.metrics import LatencyWindow
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+
+
+def load_speech(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise SystemExit(f"{path} must be 16 kHz, mono, 16-bit PCM.")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return pcm.astype(np.float32) / 32768.0
+
+
+def http_json(base_url: str, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(base_url + path, method=method)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ,
+               MOCK_STT_LATENCY_S=str(args.stt_latency),
+               MOCK_LLM_TTFB_S=str(args.llm_ttfb),
+               MOCK_LLM_TOKENS_PER_S=str(args.llm_tokens_per_s),
+               MOCK_LLM_REPLY_TOKENS=str(args.llm_reply_tokens),
+               MOCK_TTS_TTFB_S=str(args.tts_ttfb),
+               MOCK_TTS_BYTES_PER_S=str(args.tts_bytes_per_s))
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.mockServer", "--port", str(args.port)],
+                               cwd=REPO_ROOT, env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Mock server exited during startup.")
+        try:
+            if http_json(base_url, "/ready").get("ready"):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Mock server did not come up in time.")
+
+
+class Caller:
+    """One simulated browser tab."""
+    def __init__(self, caller_id: int, args, speech: np.ndarray):
+        self.caller_id = caller_id
+        self.args = args
+        self.rate = args.client_rate
+        # Callers at other rates send the same speech resampled, so the server has to convert it back.
+        self.speech = PolyphaseResampler(SAMPLE_RATE, self.rate)(speech) if self.rate != SAMPLE_RATE else speech
+        self.transcript_event = asyncio.Event()
+        self.audio_event = asyncio.Event()
+        self.tts_end_event = asyncio.Event()
+        self.transcript_at = self.first_audio_at = None
+        self.audio_seconds_sent = 0.0
+        self.chunk_samples = args.chunk_samples
+        self.encoding = "float32"
+        self.config_event = asyncio.Event()
+
+    def reset_turn(self):
+        for event in (self.transcript_event, self.audio_event, self.tts_end_event):
+            event.clear()
+        self.transcript_at = self.first_audio_at = None
+
+    async def receive(self, ws):
+        loop = asyncio.get_running_loop()
+        async for message in ws:
+            if isinstance(message, bytes):
+                if not self.audio_event.is_set():
+                    self.first_audio_at = loop.time()
+                    self.audio_event.set()
+                continue
+            msg = json.loads(message)
+            if msg["type"] == "audio_config":
+                self.chunk_samples = msg["frame_samples"]
+                self.encoding = msg["encoding"]
+                self.config_event.set()
+            elif msg["type"] == "user_transcript":
+                self.transcript_at = loop.time()
+                self.transcript_event.set()
+            elif msg["type"] == "tts_end":
+                self.tts_end_event.set()
+
+    async def send_samples(self, ws, samples: np.ndarray, stop_event: asyncio.Event = None):
+        """Sends samples in browser-sized chunks at real-time pace (absolute schedule, no drift)."""
+        loop = asyncio.get_running_loop()
+        chunk = self.chunk_samples
+        started = loop.time()
+        for i, offset in enumerate(range(0, len(samples), chunk)):
+            if stop_event is not None and stop_event.is_set():
+                return
+            delay = started + i * chunk / self.rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            frame = samples[offset:offset + chunk]
+            if self.encoding == "int16":
+                data = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+            else:
+                data = frame.astype(np.float32).tobytes()
+            await ws.send(json.dumps({"type": "audio_chunk", "data": base64.b64encode(data).decode()}))
+            self.audio_seconds_sent += chunk / self.rate
+
+    async def run(self, results: dict):
+        loop = asyncio.get_running_loop()
+        url = f"ws://127.0.0.1:{self.args.port}/ws?character={self.args.character}&password=bench"
+        silence = np.zeros(int(self.args.reply_timeout * self.rate), dtype=np.float32)
+        async with websockets.connect(url, max_size=None) as ws:
+            receiver = asyncio.create_task(self.receive(ws))
+            try:
+                if self.args.frame_ms:
+                    await ws.send(json.dumps({"type": "audio_config", "frame_ms": self.args.frame_ms,
+                                              "encoding": self.args.encoding, "sample_rate": self.rate}))
+                    await asyncio.wait_for(self.config_event.wait(), 10)
+                if self.args.playback_format:
+                    await ws.send(json.dumps({"type": "playback_config", "formats": [self.args.playback_format]}))
+                for _ in range(self.args.turns):
+                    self.reset_turn()
+                    await self.send_samples(ws, self.speech)
+                    speech_end = loop.time()
+                    # The mic stays open (sending silence) until the AI's voice arrives.
+                    await self.send_samples(ws, silence, stop_event=self.audio_event)
+                    if not self.audio_event.is_set():
+                        results["timeouts"] += 1
+                        continue
+                    results["turn"].observe(self.first_audio_at - speech_end)
+                    if self.transcript_at:
+                        results["transcript"].observe(self.transcript_at - speech_end)
+                    try:
+                        await asyncio.wait_for(self.tts_end_event.wait(), self.args.reply_timeout)
+                    except asyncio.TimeoutError:
+                        results["timeouts"] += 1
+                    await asyncio.sleep(self.args.think_time)
+            finally:
+                receiver.cancel()
+        results["audio_seconds"] += self.audio_seconds_sent
+
+
+async def run_load(args, speech: np.ndarray, base_url: str) -> dict:
+    results = {"turn": LatencyWindow(size=100000), "transcript": LatencyWindow(size=100000),
+               "timeouts": 0, "audio_seconds": 0.0, "peak_rss_mb": 0.0}
+    callers = [Caller(i, args, speech) for i in range(args.clients)]
+
+    async def sample_rss():
+        while True:
+            stats = await asyncio.to_thread(http_json, base_url, "/bench/stats")
+            results["peak_rss_mb"] = max(results["peak_rss_mb"], stats["rss_mb"])
+            await asyncio.sleep(1.0)
+
+    async def start_caller(caller: Caller, delay: float):
+        await asyncio.sleep(delay)
+        await caller.run(results)
+
+    sampler = asyncio.create_task(sample_rss())
+    try:
+        ramp_step = args.ramp / max(1, args.clients)
+        await asyncio.gather(*(start_caller(c, i * ramp_step) for i, c in enumerate(callers)))
+    finally:
+        sampler.cancel()
+    return results
+
+
+def print_report(args, results: dict, before: dict, after: dict, wall_s: float):
+    turn, transcript = results["turn"].snapshot(), results["transcript"].snapshot()
+    vad_cpu_s = after["vad_cpu_s"] - before["vad_cpu_s"]
+    audio_s = max(results["audio_seconds"], 1e-9)
+    rss_delta = max(0.0, results["peak_rss_mb"] - before["rss_mb"])
+
+    print("\n=== Shrudaya load test ===")
+    print(f"callers: {args.clients}   turns/caller: {args.turns}   wall time: {wall_s:.1f} s")
+    print(f"turn latency (speech end -> first audio):  p50 {turn['p50_ms']} ms   "
+          f"p95 {turn['p95_ms']} ms   p99 {turn['p99_ms']} ms   (n={turn['count']}, timeouts={results['timeouts']})")
+    print(f"transcript latency:                        p50 {transcript['p50_ms']} ms   p95 {transcript['p95_ms']} ms")
+    print(f"VAD CPU: {vad_cpu_s:.2f} s for {audio_s:.0f} s of audio "
+          f"= {100 * vad_cpu_s / audio_s:.2f}% of one core per real-time stream")
+    print(f"process CPU: {after['process_cpu_s'] - before['process_cpu_s']:.1f} s")
+    print(f"event-loop lag: p50 {after['loop_lag']['p50_ms']} ms   p95 {after['loop_lag']['p95_ms']} ms   "
+          f"max {after['loop_lag_max_ms']} ms")
+    print(f"RSS: idle {before['rss_mb']} MB   peak {results['peak_rss_mb']} MB   "
+          f"~{rss_delta / args.clients:.2f} MB per session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /ws pipeline with mocked vendors.")
+    parser.add_argument("--wav", required=True, help="16 kHz mono 16-bit speech recording (one user turn)")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which callers connect")
+    parser.add_argument("--think-time", type=float, default=0.5, help="pause between turns (s)")
+    parser.add_argument("--reply-timeout", type=float, default=20.0)
+    parser.add_argument("--frame-ms", type=float, default=64,
+                        help="uplink frame size to negotiate (0 = legacy, one message per --chunk-samples)")
+    parser.add_argument("--encoding", choices=("int16", "float32"), default="int16",
+                        help="uplink sample encoding to negotiate (with --frame-ms > 0)")
+    parser.add_argument("--client-rate", type=int, default=SAMPLE_RATE,
+                        help="capture rate callers report (e.g. 48000 exercises server-side resampling)")
+    parser.add_argument("--chunk-samples", type=int, default=128, help="samples per message when --frame-ms is 0")
+    parser.add_argument("--character", default="Taara")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--stt-latency", type=float, default=0.35)
+    parser.add_argument("--llm-ttfb", type=float, default=0.40)
+    parser.add_argument("--llm-tokens-per-s", type=float, default=40)
+    parser.add_argument("--llm-reply-tokens", type=int, default=40)
+    parser.add_argument("--tts-ttfb", type=float, default=0.30)
+    parser.add_argument("--tts-bytes-per-s", type=float, default=16000)
+    parser.add_argument("--playback-format", choices=("mp3", "pcm_16000", "opus"),
+                        help="downlink format to negotiate (default: the server's MP3); mock PCM streams at 32000 B/s")
+    args = parser.parse_args()
+
+    speech = load_speech(args.wav)
+    server_process = start_server(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        http_json(base_url, "/bench/reset", method="POST")
+        before = http_json(base_url, "/bench/stats")
+        started = time.time()
+        results = asyncio.run(run_load(args, speech, base_url))
+        wall_s = time.time() - started
+        after = http_json(base_url, "/bench/stats")
+        print_report(args, results, before, after, wall_s)
+    finally:
+        server_process.terminate()
+        server_process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/mockServer.py
+
+"""
+Runs the real FastAPI app from server.py with the vendor calls swapped for the
+local stand-ins in benchmarks/mockVendors.py, plus a /bench/stats endpoint that
+reports event-loop lag, process RSS and VAD CPU time.
+
+Usage (from the repository root):
+    python -m benchmarks.mockServer --port 8765
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+# Keep benchmark runs away from the real session database and conversation logs.
+os.environ.setdefault("SESSION_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="shrudaya-bench-"), "sessions.db"))
+os.environ.pop("APP_PASSWORD", None)
+os.environ.setdefault("VAD_BACKEND", "onnx")
+
+import uvicorn
+
+import server
+from benchmarks import mockVendors
+from monitoring.metrics import LatencyWindow, METRICS
+
+LOOP_LAG_INTERVAL_S = 0.05
+loop_lag = LatencyWindow(size=20000)
+
+
+def install_mock_vendors():
+    server.transcribe_audio = mockVendors.transcribe_audio
+    server.stream_mistral_chat_async = mockVendors.stream_mistral_chat_async
+    server.stream_tts_audio = mockVendors.stream_tts_audio
+    server.warm_up_stt = mockVendors.warm_up_stt
+    server.warm_up_llm = mockVendors.warm_up_llm
+    server.warm_up_tts = mockVendors.warm_up_tts
+    server.log_conversation = lambda *args, **kwargs: 0
+    for persona in server.PERSONAS.personas.values():
+        persona.voice_id = persona.voice_id or "mock-voice"
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS is the best portable fallback (KiB on Linux, bytes on macOS).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def monitor_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LOOP_LAG_INTERVAL_S
+        await asyncio.sleep(LOOP_LAG_INTERVAL_S)
+        loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+def install_bench_routes():
+    original_lifespan = server.app.router.lifespan_context
+
+    @asynccontextmanager
+    async def bench_lifespan(app):
+        async with original_lifespan(app):
+            lag_task = asyncio.create_task(monitor_loop_lag())
+            yield
+            lag_task.cancel()
+
+    server.app.router.lifespan_context = bench_lifespan
+
+    @server.app.get("/bench/stats")
+    async def bench_stats():
+        counters = METRICS.counters
+        return {
+            "time": time.time(),
+            "rss_mb": round(current_rss_mb(), 1),
+            "process_cpu_s": round(time.process_time(), 3),
+            "loop_lag": loop_lag.snapshot(),
+            "loop_lag_max_ms": round((loop_lag.percentile(100) or 0) * 1000, 1),
+            "vad_cpu_s": counters.get("vad_cpu_us", 0) / 1e6,
+            "vad_windows": counters.get("vad_windows", 0),
+            "sessions_in_memory": server.SESSIONS.active_count,
+            "metrics": METRICS.snapshot(),
+        }
+
+    @server.app.post("/bench/reset")
+    async def bench_reset():
+        global loop_lag
+        loop_lag = LatencyWindow(size=20000)
+        return {"ok": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrudaya server with mocked vendors for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    install_mock_vendors()
+    install_bench_routes()
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
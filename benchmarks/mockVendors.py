@@ -0,0 +1,76 @@
+# benchmarks/mockVendors.py
+
+"""
+Local stand-ins for Sarvam (STT), Mistral (LLM) and ElevenLabs (TTS).
+They keep the real functions' signatures so they can be swapped into server.py,
+and their timing is driven by environment variables so the load test can
+model slow or fast vendors without touching the network:
+
+    MOCK_STT_LATENCY_S      seconds per transcription          (default 0.35)
+    MOCK_LLM_TTFB_S         seconds to the first token          (default 0.40)
+    MOCK_LLM_TOKENS_PER_S   streaming rate after the first token (default 40)
+    MOCK_LLM_REPLY_TOKENS   tokens per reply                    (default 40)
+    MOCK_TTS_TTFB_S         seconds to the first audio chunk    (default 0.30)
+    MOCK_TTS_BYTES_PER_S    audio byte rate (128 kbps MP3 = 16000) (default 16000)
+                            raw PCM output formats always use their true rate (pcm_16000 = 32000)
+"""
+
+import asyncio
+import os
+import time
+
+MOCK_TRANSCRIPT = "Hey, how was your day? Tell me something fun."
+MOCK_REPLY_WORDS = ("Arre, my day was pretty good! I spent it thinking about music, "
+                    "chai and the stars. What about you? Did anything make you smile today?").split()
+TTS_CHUNK_BYTES = 4096
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def warm_up_stt() -> bool:
+    return True
+
+
+async def warm_up_llm() -> bool:
+    return True
+
+
+async def warm_up_tts() -> bool:
+    return True
+
+
+def transcribe_audio(audio_file, raise_errors=False):
+    # The real client is synchronous and runs in a worker thread, so this one blocks too.
+    time.sleep(_env("MOCK_STT_LATENCY_S", 0.35))
+    return MOCK_TRANSCRIPT
+
+
+async def stream_mistral_chat_async(user_message: str, conversation: list, raise_errors: bool = False,
+                                    reply_cache=None, model: str = "mock"):
+    conversation.append({"role": "user", "content": user_message})
+    await asyncio.sleep(_env("MOCK_LLM_TTFB_S", 0.40))
+    token_interval = 1 / _env("MOCK_LLM_TOKENS_PER_S", 40)
+    reply_tokens = int(_env("MOCK_LLM_REPLY_TOKENS", 40))
+    words = [MOCK_REPLY_WORDS[i % len(MOCK_REPLY_WORDS)] for i in range(reply_tokens)]
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(token_interval)
+        yield word + " "
+    conversation.append({"role": "assistant", "content": " ".join(words)})
+
+
+async def stream_tts_audio(text: str, voice_id: str, model_id: str = "mock", raise_errors: bool = False,
+                           output_format: str = None):
+    await asyncio.sleep(_env("MOCK_TTS_TTFB_S", 0.30))
+    bytes_per_s = _env("MOCK_TTS_BYTES_PER_S", 16000)
+    if output_format and output_format.startswith("pcm_"):
+        bytes_per_s = 2 * int(output_format.split("_")[1])
+    # Roughly 70 ms of speech per character at a conversational pace.
+    total_bytes = int(len(text) * 0.07 * bytes_per_s)
+    chunk_interval = TTS_CHUNK_BYTES / bytes_per_s
+    for offset in range(0, total_bytes, TTS_CHUNK_BYTES):
+        if offset:
+            await asyncio.sleep(chunk_interval)
+        yield bytes(min(TTS_CHUNK_BYTES, total_bytes - offset))
@@ -0,0 +1,73 @@
+# benchmarks/startupBench.py
+
+"""
+Cold-start benchmark for the server runtime: for each VAD backend, a fresh Python
+process imports server.py, loads the VAD the way the lifespan does and runs one
+window. Reports import time, VAD load time, first-window time and RSS, and whether
+torch ended up in the process.
+
+Usage (from the repository root):
+    python -m benchmarks.startupBench
+    python -m benchmarks.startupBench --backends onnx --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+import numpy as np
+import server
+t1 = time.perf_counter()
+from vad.streamingVAD import load_vad_model
+model = load_vad_model(os.environ["VAD_BACKEND"])
+t2 = time.perf_counter()
+model.new_stream()(np.zeros(512, dtype=np.float32))
+t3 = time.perf_counter()
+from benchmarks.mockServer import current_rss_mb
+print(json.dumps({"import_s": t1 - t0, "vad_load_s": t2 - t1, "first_window_s": t3 - t2,
+                  "rss_mb": current_rss_mb(), "torch_loaded": "torch" in sys.modules}))
+"""
+
+
+def run_once(backend: str, db_dir: str) -> dict:
+    env = dict(os.environ, VAD_BACKEND=backend, SESSION_DB_PATH=os.path.join(db_dir, f"{backend}.db"))
+    result = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "exit " + str(result.returncode)}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure server cold start and RSS per VAD backend.")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "torch"], choices=["onnx", "torch"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="shrudaya-startup-")
+    print("\n=== Shrudaya startup benchmark (median of runs) ===")
+    for backend in args.backends:
+        runs = [run_once(backend, db_dir) for _ in range(args.runs)]
+        failed = [r for r in runs if "error" in r]
+        if failed:
+            print(f"{backend:>6}: failed ({failed[0]['error']})")
+            continue
+        median = {key: statistics.median(r[key] for r in runs)
+                  for key in ("import_s", "vad_load_s", "first_window_s", "rss_mb")}
+        total = median["import_s"] + median["vad_load_s"] + median["first_window_s"]
+        print(f"{backend:>6}: import {median['import_s'] * 1000:.0f} ms   VAD load {median['vad_load_s'] * 1000:.0f} ms   "
+              f"first window {median['first_window_s'] * 1000:.1f} ms   total {total:.2f} s   "
+              f"RSS {median['rss_mb']:.0f} MB   torch loaded: {runs[0]['torch_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
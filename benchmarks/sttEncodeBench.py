@@ -0,0 +1,80 @@
+# benchmarks/sttEncodeBench.py
+
+"""
+Is compressing the STT upload worth it? For each codec and utterance length, compares
+encode time against the upload time saved over a link of --uplink-kbps, relative to WAV.
+A positive net saving means the codec makes the turn faster on that link.
+
+Speech compresses very differently from noise, so pass a real recording with --wav
+(any 16 kHz mono 16-bit speech; it is looped or cut to each length). Without one,
+a synthetic voiced signal is used.
+
+Usage (from the repository root):
+    python -m benchmarks.sttEncodeBench --wav speech_16k.wav --uplink-kbps 512
+"""
+
+import argparse
+import time
+import wave
+
+import numpy as np
+
+from stt.audioEncoding import CODECS, encode_pcm
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(seconds: float) -> np.ndarray:
+    """Harmonic 'voice' with a wandering pitch, syllable-rate envelope and a little noise."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    noise = np.random.default_rng(0).standard_normal(len(t)) * 0.02
+    return (np.clip(0.25 * voice * envelope + noise, -1, 1) * 32767).astype(np.int16)
+
+
+def load_speech(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise SystemExit(f"{path} must be 16 kHz, mono, 16-bit PCM.")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode time vs. upload savings for the STT upload codecs.")
+    parser.add_argument("--wav", default=None, help="16 kHz mono speech recording (default: synthetic)")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[2, 5, 10, 20])
+    parser.add_argument("--uplink-kbps", type=float, default=1000.0, help="effective upload bandwidth")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    source = load_speech(args.wav) if args.wav else synthetic_speech(max(args.seconds))
+    bytes_per_s = args.uplink_kbps * 1000 / 8
+    print(f"\n=== STT upload codecs ({'recording' if args.wav else 'synthetic speech'}, "
+          f"{args.uplink_kbps:.0f} kbps uplink) ===")
+    print(f"{'len':>5} {'codec':>5} {'size KB':>8} {'ratio':>6} {'encode ms':>10} {'upload ms':>10} {'net saving ms':>14}")
+    for seconds in args.seconds:
+        pcm = np.resize(source, int(seconds * SAMPLE_RATE))
+        wav_upload_ms = None
+        for codec in CODECS:
+            try:
+                encode_pcm(pcm, SAMPLE_RATE, codec)  # warm-up (and availability check)
+            except Exception as e:
+                print(f"{seconds:>4.0f}s {codec:>5}  unavailable ({e})")
+                continue
+            started = time.perf_counter()
+            for _ in range(args.repeats):
+                encoded = encode_pcm(pcm, SAMPLE_RATE, codec)
+            encode_ms = (time.perf_counter() - started) / args.repeats * 1000
+            upload_ms = len(encoded.data) / bytes_per_s * 1000
+            if codec == "wav":
+                wav_upload_ms, wav_size = upload_ms, len(encoded.data)
+            net = (wav_upload_ms - upload_ms - encode_ms) if codec != "wav" else 0.0
+            print(f"{seconds:>4.0f}s {codec:>5} {len(encoded.data) / 1024:>8.1f} {wav_size / len(encoded.data):>6.1f} "
+                  f"{encode_ms:>10.1f} {upload_ms:>10.0f} {net:>+14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/vadWindowBench.py
+
+"""
+Per-window cost of Silero VAD inference (one 512-sample, 32 ms window at 16 kHz).
+
+Compares the call paths a single stream can take:
+    utils_vad.OnnxWrapper   the silero wrapper (torch tensors in and out; skipped if torch is missing)
+    naive numpy             concatenate + new feed dict + new sr array per call (the pre-buffered path)
+    reused feeds            vad/streamingVAD.py with preallocated buffers and session.run()
+    io binding              vad/streamingVAD.py with preallocated buffers bound to ORT (server default)
+
+Usage (from the repository root):
+    python -m benchmarks.vadWindowBench --windows 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from vad.streamingVAD import (CONTEXT_SIZE, DEFAULT_ONNX_MODEL, SAMPLE_RATE, SILERO_REPO_DIR, WINDOW_SIZE,
+                              OnnxVADModel)
+
+
+class NaiveNumpyStream:
+    """What every window cost before the buffers: fresh arrays and dicts on each call."""
+    def __init__(self, session):
+        self.session = session
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, CONTEXT_SIZE), dtype=np.float32)
+
+    def __call__(self, window):
+        x = np.concatenate([self.context, window.reshape(1, -1)], axis=1)
+        out, self.state = self.session.run(None, {"input": x, "state": self.state,
+                                                  "sr": np.array(SAMPLE_RATE, dtype=np.int64)})
+        self.context = x[:, -CONTEXT_SIZE:]
+        return float(out[0, 0])
+
+
+def silero_wrapper_stream():
+    try:
+        import torch
+        sys.path.insert(0, os.path.join(SILERO_REPO_DIR, "src"))
+        from silero_vad.utils_vad import OnnxWrapper
+    except ImportError as e:
+        print(f"utils_vad.OnnxWrapper: skipped ({e})")
+        return None
+    wrapper = OnnxWrapper(DEFAULT_ONNX_MODEL, force_onnx_cpu=True)
+    return lambda window: wrapper(torch.from_numpy(window), SAMPLE_RATE).item()
+
+
+def measure(name: str, stream, audio: np.ndarray, windows: int):
+    frames = [audio[i * WINDOW_SIZE:(i + 1) * WINDOW_SIZE] for i in range(len(audio) // WINDOW_SIZE)]
+    for frame in frames[:50]:
+        stream(frame)  # warm-up
+    started = time.perf_counter()
+    for i in range(windows):
+        stream(frames[i % len(frames)])
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for i in range(200):
+        stream(frames[i % len(frames)])
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+    per_window_us = elapsed / windows * 1e6
+    print(f"{name:<24} {per_window_us:8.1f} us/window   {100 * per_window_us / 32000:6.3f}% of real time   "
+          f"python heap peak {peak / 1024:6.1f} KiB over 200 windows (live {allocated / 1024:.1f} KiB)")
+    return per_window_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-window cost of the VAD call paths.")
+    parser.add_argument("--windows", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = (0.1 * rng.standard_normal(SAMPLE_RATE * 10)).astype(np.float32)
+    bound, unbound = OnnxVADModel(use_io_binding=True), OnnxVADModel(use_io_binding=False)
+
+    print(f"\n=== Silero VAD per-window cost ({args.windows} windows, one stream, 1 thread) ===")
+    wrapper = silero_wrapper_stream()
+    if wrapper: measure("utils_vad.OnnxWrapper", wrapper, audio, args.windows)
+    baseline = measure("naive numpy", NaiveNumpyStream(bound.session), audio, args.windows)
+    reused = measure("reused feeds", unbound.new_stream(), audio, args.windows)
+    binding = measure("io binding", bound.new_stream(), audio, args.windows)
+    print(f"speed-up vs naive: reused feeds {baseline / reused:.2f}x, io binding {baseline / binding:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
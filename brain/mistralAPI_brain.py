@@ -1,32 +1,31 @@
 # brain/mistralAPI_brain.py
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from mistralai.client import MistralClient
 from mistralai.async_client import MistralAsyncClient
 
+from brain.replyCache import replay_reply
+from personas.personaRegistry import get_registry
+
 load_dotenv()
 
 # ==============================================================================
-# SYNCHRONOUS FUNCTION (Unchanged)
+# SYNCHRONOUS FUNCTION
 # ==============================================================================
-def mistral_chat(user_message, conversation):
+def mistral_chat(user_message, conversation, persona=None):
     # ... (this function can remain as is for your other scripts)
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
         print("⚠️ MISTRAL_API_KEY not found.")
         return conversation, ""
 
+    # The prompt and model come from the same persona registry the server uses.
+    persona = persona or get_registry().default
     client = MistralClient(api_key=api_key)
-    MODEL = "mistral-small-latest"
-    system_prompt = """
-    You are Taara, a witty, warm, and supportive AI assistant.
-    Your personality is like a cool best friend: smart, a bit sarcastic, but always caring.
-    GUIDELINES:
-    - Keep replies concise and conversational, like you're texting.
-    - Use a natural mix of English and Hindi (Hinglish).
-    - Be supportive.
-    """
+    MODEL = persona.llm_model
+    system_prompt = persona.system_prompt
     if not conversation or conversation[0]["role"] != "system":
         conversation.insert(0, {"role": "system", "content": system_prompt})
     
@@ -49,18 +48,51 @@ def mistral_chat(user_message, conversation):
 # ==============================================================================
 # ASYNCHRONOUS STREAMING FUNCTION (MODIFIED)
 # ==============================================================================
-async def stream_mistral_chat_async(user_message: str, conversation: list):
+@lru_cache(maxsize=None)
+def _get_async_client(api_key: str) -> MistralAsyncClient:
+    """One client (and so one connection pool) per process instead of a new one per reply."""
+    return MistralAsyncClient(api_key=api_key)
+
+async def warm_up() -> bool:
+    """
+    Opens (or refreshes) the pooled connection to Mistral with a free list_models call,
+    so the first reply doesn't pay DNS and TLS setup.
+    """
+    api_key = os.getenv("MISTRAL_API_KEY")
+    if not api_key:
+        return False
+    try:
+        await _get_async_client(api_key).list_models()
+        return True
+    except Exception as e:
+        print(f"⚠️ Mistral warm-up failed: {e}")
+        return False
+
+async def stream_mistral_chat_async(user_message: str, conversation: list, raise_errors: bool = False,
+                                    reply_cache=None, model: str = "mistral-small-latest"):
     """
     Asynchronous generator for the FastAPI server.
     It now relies on the conversation history already containing the system prompt.
+    With raise_errors=True, failures propagate (after undoing the user message) so
+    the server's resilience layer can time out and retry the call.
+    An optional ReplyCache short-circuits stateless openers without calling Mistral.
     """
+    cache_key = reply_cache.key_for(user_message, conversation) if reply_cache else None
+    cached_reply = reply_cache.get(cache_key) if cache_key else None
+    if cached_reply is not None:
+        conversation.append({"role": "user", "content": user_message})
+        async for content in replay_reply(cached_reply):
+            yield content
+        conversation.append({"role": "assistant", "content": cached_reply})
+        return
+
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
         print("⚠️ MISTRAL_API_KEY not found.")
         return
 
-    async_client = MistralAsyncClient(api_key=api_key)
-    MODEL = "mistral-small-latest"
+    async_client = _get_async_client(api_key)
+    MODEL = model
     
     # --- MODIFICATION ---
     # The system prompt is now handled by server.py before calling this function.
@@ -69,6 +101,7 @@ async def stream_mistral_chat_async(user_message: str, conversation: list):
     conversation.append({"role": "user", "content": user_message})
     
     full_reply = ""
+    completed = False
     try:
         async for chunk in async_client.chat_stream(model=MODEL, messages=conversation):
             if chunk.choices and chunk.choices[0].delta.content is not None:
@@ -78,6 +111,14 @@ async def stream_mistral_chat_async(user_message: str, conversation: list):
         
         # Append the full reply to the conversation history for context
         conversation.append({"role": "assistant", "content": full_reply})
+        completed = True
+        if cache_key:
+            reply_cache.put(cache_key, full_reply)
 
     except Exception as e:
-        print(f"❌ Error during async Mistral chat: {e}")
\ No newline at end of file
+        if raise_errors:
+            raise
+        print(f"❌ Error during async Mistral chat: {e}")
+    finally:
+        if raise_errors and not completed:
+            conversation.pop()  # Leave the history as it was so a retry doesn't duplicate the turn
@@ -0,0 +1,86 @@
+# brain/replyCache.py
+
+import re
+import time
+from collections import OrderedDict
+
+from monitoring.metrics import METRICS
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_REPLAY_TOKENS = re.compile(r"\S+\s*")
+
+
+class ReplyCache:
+    """
+    LRU + TTL cache for replies to stateless openers ("hello", "who are you", "bye").
+    Entries are keyed by the character's system prompt plus the normalized user message,
+    and only conversations that hold nothing but the system prompt qualify, so a cached
+    reply can never ignore context the user already gave. A greeting the character spoke
+    before the user's first message doesn't disqualify the opener; it becomes part of the key.
+    """
+    def __init__(self, max_entries: int = 256, ttl_s: float = 3600.0,
+                 max_context_messages: int = 1, max_message_chars: int = 40):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_context_messages = max_context_messages
+        self.max_message_chars = max_message_chars
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        message = _NON_WORD.sub(" ", message.lower())
+        return _WHITESPACE.sub(" ", message).strip()
+
+    def key_for(self, user_message: str, conversation: list):
+        """Returns the cache key for this turn, or None if the turn isn't a stateless opener."""
+        if not conversation or conversation[0]["role"] != "system":
+            return None
+        greeting = 1
+        while greeting < len(conversation) and conversation[greeting]["role"] == "assistant":
+            greeting += 1
+        if len(conversation) - (greeting - 1) > self.max_context_messages:
+            return None
+        normalized = self.normalize(user_message)
+        if not normalized or len(normalized) > self.max_message_chars:
+            return None
+        spoken_first = tuple(message["content"] for message in conversation[1:greeting])
+        return (conversation[0]["content"], normalized) + spoken_first
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] > self.ttl_s:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            METRICS.incr("reply_cache_misses")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        METRICS.incr("reply_cache_hits")
+        return entry[0]
+
+    def put(self, key, reply: str):
+        if not reply:
+            return
+        self._entries[key] = (reply, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return round(self.hits / lookups, 3) if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio}
+
+
+async def replay_reply(reply: str):
+    """Yields a cached reply word by word, so downstream consumers see a normal token stream."""
+    for token in _REPLAY_TOKENS.findall(reply):
+        yield token
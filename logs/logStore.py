@@ -0,0 +1,159 @@
+# logs/logStore.py
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_LOGS_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = "logs.db"
+
+# Legacy CSV names/dates: "28th May, 2025" (and the early "28 May, 2025")
+LEGACY_DATE = re.compile(r"(\d{1,2})(?:st|nd|rd|th)? (\w+), (\d{4})")
+
+
+def parse_legacy_date(text: str):
+    """'28th May, 2025' -> '2025-05-28' (None if it doesn't look like a log date)."""
+    match = LEGACY_DATE.search(text)
+    if not match:
+        return None
+    day, month, year = match.groups()
+    try:
+        return datetime.strptime(f"{day} {month} {year}", "%d %B %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def fts_query(text: str) -> str:
+    """Free text -> FTS5 query: every word must match, quoted so punctuation can't break the syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class LogStore:
+    """
+    Conversation log in SQLite: one row per message, indexed by day, person and session,
+    with an FTS5 index over the text. A small per-day summary table keeps the viewer's day
+    list O(days), and every viewer query is a single indexed, paged SELECT.
+    """
+    def __init__(self, path: str = os.path.join(DEFAULT_LOGS_DIR, DB_NAME)):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY, day TEXT NOT NULL, time TEXT NOT NULL, person TEXT NOT NULL,
+                session TEXT, content TEXT NOT NULL, source TEXT);
+            CREATE INDEX IF NOT EXISTS messages_day ON messages (day, id);
+            CREATE INDEX IF NOT EXISTS messages_person ON messages (person, day, id);
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session, id);
+            CREATE INDEX IF NOT EXISTS messages_source ON messages (source);
+            CREATE TABLE IF NOT EXISTS days (day TEXT PRIMARY KEY, messages INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ingested_files (path TEXT PRIMARY KEY, mtime REAL NOT NULL);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id');
+
+            CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+                INSERT INTO days VALUES (new.day, 1) ON CONFLICT (day) DO UPDATE SET messages = messages + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                UPDATE days SET messages = messages - 1 WHERE day = old.day;
+            END;
+        """)
+        self._db.commit()
+
+    # --- Writing ---
+    def append(self, person: str, message: str, session: str = None, when: datetime = None):
+        when = when or datetime.now()
+        with self._lock:
+            self._db.execute("INSERT INTO messages (day, time, person, session, content) VALUES (?, ?, ?, ?, ?)",
+                             (when.strftime("%Y-%m-%d"), when.strftime("%H:%M:%S"), person, session, message))
+            self._db.commit()
+
+    def ingest_csv(self, path: str) -> int:
+        """
+        Imports one legacy daily CSV (Date, Time, Person, Context). Re-ingesting a file that
+        changed replaces its rows, an unchanged file is skipped. Returns the rows imported.
+        """
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        row = self._db.execute("SELECT mtime FROM ingested_files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row["mtime"] == mtime:
+            return 0
+        df = pd.read_csv(path, dtype=str).fillna("")
+        file_day = parse_legacy_date(os.path.basename(path))
+        rows = []
+        for record in df.itertuples(index=False):
+            day = parse_legacy_date(record.Date) or file_day
+            if day is None: continue
+            try:
+                time_of_day = datetime.strptime(record.Time.strip(), "%I:%M:%S %p").strftime("%H:%M:%S")
+            except ValueError:
+                time_of_day = record.Time.strip()
+            rows.append((day, time_of_day, record.Person, record.Context, path))
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE source = ?", (path,))
+            self._db.executemany("INSERT INTO messages (day, time, person, content, source) VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO ingested_files VALUES (?, ?)", (path, mtime))
+            self._db.commit()
+        return len(rows)
+
+    def ingest_directory(self, logs_dir: str = DEFAULT_LOGS_DIR) -> int:
+        imported = 0
+        for name in sorted(os.listdir(logs_dir)):
+            if name.endswith(".csv"):
+                try:
+                    imported += self.ingest_csv(os.path.join(logs_dir, name))
+                except Exception as e:
+                    logging.warning(f"Skipping log file {name}: {e}")
+        return imported
+
+    # --- Viewer queries ---
+    def days(self) -> list:
+        """[(day, message count)], newest first."""
+        rows = self._db.execute("SELECT day, messages FROM days WHERE messages > 0 ORDER BY day DESC").fetchall()
+        return [(r["day"], r["messages"]) for r in rows]
+
+    def persons(self) -> list:
+        return [r[0] for r in self._db.execute("SELECT DISTINCT person FROM messages ORDER BY person")]
+
+    @staticmethod
+    def _filtered(day, person, session, search):
+        """FROM/WHERE clause and parameters shared by count() and query()."""
+        where, params = [], []
+        source = "messages m"
+        if search and search.strip():
+            source = "messages_fts JOIN messages m ON m.id = messages_fts.rowid"
+            where.append("messages_fts MATCH ?")
+            params.append(fts_query(search))
+        for column, value in (("m.day", day), ("m.person", person), ("m.session", session)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        return source + clause, params
+
+    def count(self, day: str = None, person: str = None, session: str = None, search: str = None) -> int:
+        source, params = self._filtered(day, person, session, search)
+        return self._db.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+
+    def query(self, day: str = None, person: str = None, session: str = None, search: str = None,
+              page: int = 0, page_size: int = 100) -> list:
+        """
+        One page of messages matching every given filter, oldest first.
+        `search` is full-text (all words must appear) across every day unless `day` is also given.
+        """
+        source, params = self._filtered(day, person, session, search)
+        rows = self._db.execute(
+            f"SELECT m.day, m.time, m.person, m.session, m.content FROM {source} "
+            f"ORDER BY m.day, m.id LIMIT ? OFFSET ?", params + [page_size, page * page_size]).fetchall()
+        return [dict(r) for r in rows]
+
+    def close(self):
+        self._db.close()
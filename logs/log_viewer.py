@@ -1,34 +1,46 @@
 import streamlit as st
-import pandas as pd
+import sys
 from pathlib import Path
-import re
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # `streamlit run logs/log_viewer.py` from anywhere
+from logs.logStore import DB_NAME, LogStore
 
 st.set_page_config(page_title="Shrudaya Logs Viewer", layout="wide")
 
 # Logs directory
 logs_dir = Path(__file__).resolve().parent.parent / "logs"
+PAGE_SIZE = 100
 
-# Regex to match files like '28th May, 2025.csv'
-def date_sort_key(filename):
-    match = re.match(r"(\d{1,2})(st|nd|rd|th) (\w+), (\d{4})", filename.stem)
-    if not match:
-        # Return a very old timestamp so unmatched files appear at the end
-        return pd.Timestamp.min
-    day, _, month, year = match.groups()
-    return pd.to_datetime(f"{day} {month} {year}", format="%d %B %Y")
-
-
-# Find latest file
-csv_files = sorted(logs_dir.glob("*.csv"), key=date_sort_key, reverse=True)
 
-st.title("📜 Shrudaya - Daily Conversation Logs")
+@st.cache_resource
+def open_store():
+    # Legacy daily CSVs are imported once; later runs skip files that haven't changed.
+    store = LogStore(str(logs_dir / DB_NAME))
+    store.ingest_directory(str(logs_dir))
+    return store
 
-if csv_files:
-    latest_file = csv_files[0]
-    st.success(f"Showing logs from: **{latest_file.stem}**")
 
-    df = pd.read_csv(latest_file)
-    st.dataframe(df, use_container_width=True)
+store = open_store()
+st.title("📜 Shrudaya - Conversation Logs")
 
-else:
+days = store.days()
+if not days:
     st.warning("No logs found yet. Speak to your AI buddy first!")
+    st.stop()
+
+# Every filter is applied in SQLite; only the visible page is loaded.
+with st.sidebar:
+    search = st.text_input("🔍 Search all conversations")
+    day_labels = {"All days": None, **{f"{day} ({count})": day for day, count in days}}
+    day = day_labels[st.selectbox("Day", list(day_labels), index=0 if search else 1)]
+    person = st.selectbox("Person", ["Everyone"] + store.persons())
+    session = st.text_input("Session token")
+
+filters = dict(day=day, person=None if person == "Everyone" else person,
+               session=session.strip() or None, search=search)
+total = store.count(**filters)
+pages = max(1, -(-total // PAGE_SIZE))
+page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) - 1
+
+st.success(f"**{total}** messages" + (f" on **{day}**" if day else "") + (f" matching **{search}**" if search else ""))
+st.dataframe(store.query(**filters, page=page, page_size=PAGE_SIZE), use_container_width=True)
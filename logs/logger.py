@@ -1,27 +1,17 @@
-from datetime import datetime
-import pandas as pd
 import os
+from functools import lru_cache
 
+from logs.logStore import DB_NAME, LogStore
 
-def log_conversation(person, message, logs_dir="logs"):
-    now = datetime.now()
-    day = now.day
-    day_suffix = "th" if 11 <= day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
-    rest_of_date = now.strftime("%B, %Y")
-    formatted_date = f"{day}{day_suffix} {rest_of_date}"  # e.g. 28th May, 2025
-
-    formatted_time = now.strftime("%I:%M:%S %p")  # e.g. 03:02:01 PM
 
+@lru_cache(maxsize=None)
+def get_log_store(logs_dir="logs"):
+    """One LogStore (logs/logs.db) per logs directory, opened on first use."""
     os.makedirs(logs_dir, exist_ok=True)
-    file_path = os.path.join(logs_dir, f"{formatted_date}.csv")
-
-    data = {"Date": [formatted_date], "Time": [formatted_time], "Person": [person], "Context": [message]}
+    return LogStore(os.path.join(logs_dir, DB_NAME))
 
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
-        df = pd.concat([df, pd.DataFrame(data)], ignore_index=True)
-    else:
-        df = pd.DataFrame(data)
 
-    df.to_csv(file_path, index=False)
-    return 0
\ No newline at end of file
+def log_conversation(person, message, logs_dir="logs", session=None):
+    # An indexed insert instead of re-reading and rewriting the day's CSV on every message.
+    get_log_store(logs_dir).append(person, message, session=session)
+    return 0
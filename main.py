@@ -1,40 +1,262 @@
+# main.py
 
-from brain.mistralAPI_brain import mistral_chat   # Brain
-from tts.elevenLabs.xiTTS import speak_text_xi    # TTS
-from logs.logger import log_conversation          # Logger
-from misc.chimePlayer import play_chime           # Chime Notification
-from stt.sarvamSTT import transcribe_audio        # STT
-from recording.recordingAudio import record_audio # Audio Recorder
+"""
+Command-line voice chat using the same streaming pieces as the web app:
+Silero VAD endpointing -> Sarvam STT -> streamed Mistral reply cut into sentences ->
+streamed ElevenLabs PCM -> local playback. Listening, the LLM, TTS and playback run as
+separate asyncio tasks, so a reply starts playing while the rest is still being written.
+
+Usage:
+    python main.py                                     # microphone in, speakers out
+    python main.py --input hello.wav --output reply.wav  # headless: WAV in, WAV out
+    python main.py --input hello.wav --fast --output none
+"""
+
+import argparse
+import asyncio
+import secrets
+import wave
+
+import numpy as np
+
+from audio.resampler import PolyphaseResampler                  # Any input rate -> 16 kHz
+from brain.mistralAPI_brain import stream_mistral_chat_async   # Brain
+from logs.logger import log_conversation                        # Logger
+from personas.personaRegistry import get_registry               # Characters
+from pipeline.sentenceChunker import SentenceChunker            # Reply -> TTS chunks
+from recording.audioSources import PyAudioSource, WavFileSource, to_wav  # Mic / WAV input
+from stt.sarvamSTT import transcribe_audio                      # STT
+from tts.elevenLabs.xiTTS import stream_tts_audio               # TTS
+from vad.streamingVAD import StreamingVADIterator, load_vad_model  # Endpointing
+from vad.utteranceGate import UtteranceGate  # Drops blips before STT
+
+try:
+    from misc.chimePlayer import play_chime                     # Chime Notification (Windows only)
+except ImportError:
+    play_chime = None
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 1024                 # 64 ms capture frames (two VAD windows)
+TTS_OUTPUT_FORMAT = "pcm_16000"      # Raw PCM plays without a decoder
+GREETING = "Hello boss, how're you doing today?"
+EXIT_WORDS = {"stop", "exit", "quit", "bye"}
+
+# ==============================================================================
+# 1. AUDIO OUT
+# ==============================================================================
+
+class SpeakerOutput:
+    """Plays 16 kHz int16 PCM on the default output device; blocking writes run in a worker thread."""
+    def __init__(self):
+        import pyaudio
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, output=True)
+
+    async def play(self, pcm: bytes):
+        await asyncio.to_thread(self._stream.write, pcm)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pyaudio.terminate()
+
+
+class WavFileOutput:
+    """Headless sink: everything the assistant says is appended to one WAV file."""
+    def __init__(self, path: str):
+        self._wav = wave.open(path, "wb")
+        self._wav.setnchannels(1); self._wav.setsampwidth(2); self._wav.setframerate(SAMPLE_RATE)
+
+    async def play(self, pcm: bytes):
+        self._wav.writeframes(pcm)
+
+    def close(self):
+        self._wav.close()
 
-def main():
-    conversation = []
 
-    # Greet the user first before loop starts
-    greeting = "Hello boss, how're you doing today?"
-    speak_text_xi(greeting)
+class NullOutput:
+    """Text-only: replies are printed, not spoken."""
+    async def play(self, pcm: bytes): pass
+    def close(self): pass
 
-    print("🎤 Speak your heart out. Say 'stop' to exit anytime.\n")
+# ==============================================================================
+# 2. STREAMING CONVERSATION
+# ==============================================================================
 
-    while True:
-        # Play chime before recording
-        play_chime()
+class VoiceChat:
+    """
+    One local conversation. listen() endpoints the input with the persona's VAD settings
+    and queues finished utterances; converse() takes one turn per utterance. While a turn
+    is in flight the input is ignored (half duplex), so the assistant never hears itself.
+    """
+    def __init__(self, persona, source, output, vad_model, speak: bool = True):
+        self.persona = persona
+        self.source = source
+        self.output = output
+        self.vad_model = vad_model
+        self.speak = speak and bool(persona.voice_id)
+        self.conversation = [persona.system_message()]
+        self.session_id = f"cli-{secrets.token_urlsafe(8)}"  # Groups this run's messages in the log store
+        self.utterances = asyncio.Queue()
+        self.idle = asyncio.Event()
+        self.idle.set()
 
-        audio_path = record_audio(duration=10)
-        transcript = transcribe_audio(audio_path)
+    async def listen(self):
+        vad = self.persona.vad
+        vad_iterator = StreamingVADIterator(self.vad_model.new_stream(), threshold=vad.threshold,
+                                            min_silence_duration_ms=vad.min_silence_duration_ms,
+                                            speech_pad_ms=vad.speech_pad_ms)
+        end_of_turn_samples = int(vad.end_of_turn_s * SAMPLE_RATE)
+        gate = UtteranceGate.from_settings(vad)
+        speech, probs, speaking, turn_ends_at = [], [], False, None
+        rate = self.source.sample_rate
+        resampler = PolyphaseResampler(rate, SAMPLE_RATE) if rate != SAMPLE_RATE else None
 
-        if transcript is None:
-            continue
+        async for frame in self.source.aframes(FRAME_SAMPLES):
+            if not self.source.realtime:
+                await self.idle.wait()  # A file can wait for the assistant; a live mic can't.
+            batch = vad_iterator.process(resampler(frame) if resampler else frame)
+            if not self.idle.is_set():
+                speech, probs, speaking, turn_ends_at = [], [], False, None
+                continue
+            speech_from = 0 if speaking else None
+            for kind, window_index, sample in batch.events:
+                if kind == 'start':
+                    if not speaking:
+                        speaking, speech_from = True, window_index
+                    turn_ends_at = None
+                elif kind == 'end' and speaking:
+                    # Endpointing runs on the audio clock, so --fast replays endpoint exactly like real time.
+                    turn_ends_at = sample + end_of_turn_samples
+            if speech_from is not None and speech_from < len(batch.windows):
+                speech.append(batch.windows[speech_from:].reshape(-1))
+                probs.append(batch.probs[speech_from:])
+            if turn_ends_at is not None and vad_iterator.current_sample >= turn_ends_at:
+                self._finish_utterance(speech, probs, gate)
+                speech, probs, speaking, turn_ends_at = [], [], False, None
 
-        log_conversation("User", transcript)  # Log User's input
+        if speaking: self._finish_utterance(speech, probs, gate)
+        await self.utterances.put(None)
 
-        if transcript.strip().lower() in ["stop", "exit", "quit", "bye"]:
-            print("👋 Alright, Vansh. Catch you later!")
-            break
-        conversation, ai_reply = mistral_chat(transcript, conversation)
-        
-        speak_text_xi(ai_reply)
-        if ai_reply:
-            log_conversation("AI", ai_reply)
+    def _finish_utterance(self, speech: list, probs: list, gate: UtteranceGate):
+        utterance = np.concatenate(speech)
+        if gate.check(utterance, np.concatenate(probs)):
+            return  # A cough or a click: keep listening
+        self.idle.clear()
+        self.utterances.put_nowait(utterance)
+
+    async def converse(self, greeting: str = None):
+        if greeting:
+            await self._reply_pipeline(self._fixed_text(greeting))
+        print("🎤 Speak your heart out. Say 'stop' to exit anytime.\n")
+        while True:
+            if play_chime and isinstance(self.source, PyAudioSource): play_chime()
+            utterance = await self.utterances.get()
+            if utterance is None: break
+            try:
+                if await self.take_turn(utterance): break
+            finally:
+                self.idle.set()
+
+    async def take_turn(self, utterance: np.ndarray) -> bool:
+        """Returns True when the user asked to stop."""
+        transcript = await asyncio.to_thread(self._transcribe, utterance)
+        if not transcript or not transcript.strip(): return False
+        log_conversation("User", transcript, session=self.session_id)
+        if transcript.strip().strip(".!?").lower() in EXIT_WORDS:
+            print("👋 Alright, boss. Catch you later!")
+            return True
+        await self._reply_pipeline(self._llm_reply(transcript))
+        return False
+
+    def _transcribe(self, utterance: np.ndarray):
+        return transcribe_audio(to_wav(utterance, SAMPLE_RATE))
+
+    async def _llm_reply(self, transcript: str):
+        async for text_chunk in stream_mistral_chat_async(transcript, self.conversation,
+                                                          model=self.persona.llm_model):
+            yield text_chunk
+
+    @staticmethod
+    async def _fixed_text(text: str):
+        yield text
+
+    async def _reply_pipeline(self, reply_stream):
+        """LLM -> sentence chunks -> TTS -> playback, each stage its own task joined by queues."""
+        text_queue, audio_queue = asyncio.Queue(), asyncio.Queue(maxsize=64)
+
+        async def write():
+            chunker, full_reply = SentenceChunker(self.persona), ""
+            try:
+                print("🤖 ", end="", flush=True)
+                async for text_chunk in reply_stream:
+                    full_reply += text_chunk
+                    print(text_chunk, end="", flush=True)
+                    for sentence in chunker.feed(text_chunk):
+                        await text_queue.put(sentence)
+                final_chunk = chunker.flush()
+                if final_chunk: await text_queue.put(final_chunk)
+                print()
+                if full_reply: log_conversation("AI", full_reply, session=self.session_id)
+            finally:
+                await text_queue.put(None)
+
+        async def synthesize():
+            try:
+                while (sentence := await text_queue.get()) is not None:
+                    if not self.speak: continue
+                    async for audio_chunk in stream_tts_audio(sentence, self.persona.voice_id, self.persona.tts_model,
+                                                              output_format=TTS_OUTPUT_FORMAT):
+                        await audio_queue.put(audio_chunk)
+            finally:
+                await audio_queue.put(None)
+
+        async def play():
+            carry = b""  # PCM chunks can split a 16-bit sample
+            while (audio_chunk := await audio_queue.get()) is not None:
+                pcm = carry + audio_chunk
+                whole = len(pcm) - len(pcm) % 2
+                carry = pcm[whole:]
+                if whole: await self.output.play(pcm[:whole])
+
+        await asyncio.gather(write(), synthesize(), play())
+
+# ==============================================================================
+# 3. ENTRY POINT
+# ==============================================================================
+
+async def run(args):
+    persona = get_registry().get(args.character)
+    source = WavFileSource(args.input, realtime=not args.fast) if args.input else PyAudioSource()
+    if args.output == "speaker": output = SpeakerOutput()
+    elif args.output == "none": output = NullOutput()
+    else: output = WavFileOutput(args.output)
+
+    vad_model = await asyncio.to_thread(load_vad_model, "onnx")
+    chat = VoiceChat(persona, source, output, vad_model, speak=args.output != "none")
+    source.start()
+    listener = asyncio.create_task(chat.listen())
+    try:
+        await chat.converse(greeting=None if args.no_greeting else GREETING)
+    finally:
+        source.stop()
+        listener.cancel()
+        output.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Talk to Shrudaya from the terminal.")
+    parser.add_argument("--character", default=None, help="persona name (defaults to the registry default)")
+    parser.add_argument("--input", default=None, help="mono 16-bit WAV (any rate) to use instead of the microphone")
+    parser.add_argument("--fast", action="store_true", help="replay --input as fast as possible")
+    parser.add_argument("--output", default="speaker", help="'speaker', 'none' (text only) or a WAV path")
+    parser.add_argument("--no-greeting", action="store_true")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n👋 Bye!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,61 @@
+# monitoring/metrics.py
+
+from collections import defaultdict, deque
+
+
+class LatencyWindow:
+    """
+    Keeps the most recent latency samples (in seconds) and answers percentile queries.
+    A bounded deque keeps memory flat no matter how long the server runs.
+    """
+    def __init__(self, size: int = 500):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": _to_ms(self.percentile(50)),
+            "p95_ms": _to_ms(self.percentile(95)),
+            "p99_ms": _to_ms(self.percentile(99)),
+        }
+
+
+class Metrics:
+    """Process-wide counters and latency windows, exposed by the server on /metrics."""
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.latencies = defaultdict(LatencyWindow)
+
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def observe(self, name: str, seconds: float):
+        self.latencies[name].observe(seconds)
+
+    def latency(self, name: str) -> LatencyWindow:
+        return self.latencies[name]
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "latencies": {name: window.snapshot() for name, window in self.latencies.items()},
+        }
+
+
+def _to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+METRICS = Metrics()
@@ -0,0 +1,85 @@
+# personas/personaRegistry.py
+
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PERSONAS_PATH = os.path.join(os.path.dirname(__file__), "personas.json")
+
+
+class VADSettings:
+    """Endpointing parameters for one persona (what counts as the end of the user's turn)."""
+    def __init__(self, threshold: float = 0.5, min_silence_duration_ms: int = 100,
+                 speech_pad_ms: int = 30, end_of_turn_s: float = 0.8, min_voiced_ms: float = 200,
+                 min_mean_prob: float = 0.0, min_rms: float = 0.0, max_utterance_s: float = 15.0):
+        self.threshold = threshold
+        self.min_silence_duration_ms = min_silence_duration_ms
+        self.speech_pad_ms = speech_pad_ms
+        self.end_of_turn_s = end_of_turn_s
+        # Utterance gate (vad/utteranceGate.py): shorter, less confident or quieter utterances never reach STT.
+        self.min_voiced_ms = min_voiced_ms
+        self.min_mean_prob = min_mean_prob
+        self.min_rms = min_rms
+        # Longer speech is cut at a pause and transcribed segment by segment (vad/utteranceSegmenter.py); 0 = never.
+        self.max_utterance_s = max_utterance_s
+
+
+class Persona:
+    """
+    Everything the pipeline needs to know about a character, resolved once at startup:
+    prompt, voice, models, endpointing and how replies are chunked for TTS.
+    """
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.system_prompt = config["system_prompt"]
+        self.voice_id = config.get("voice_id") or os.getenv(config.get("voice_id_env", ""))
+        self.tts_model = config.get("tts_model", "eleven_multilingual_v2")
+        self.llm_model = config.get("llm_model", "mistral-small-latest")
+        # Optional first line, spoken when the call is answered (its audio is prefetched while the phone rings).
+        self.greeting = config.get("greeting", "")
+        self.vad = VADSettings(**config.get("vad", {}))
+
+        chunking = config.get("chunking", {})
+        self.sentence_delimiters = re.compile(chunking.get("sentence_delimiters", r"(?<=[.?!])\s*"))
+        self.min_chunk_chars = chunking.get("min_chunk_chars", 0)
+
+        if not self.voice_id:
+            logging.warning(f"No voice ID configured for persona '{name}'; its replies will be text-only.")
+
+    def system_message(self) -> dict:
+        return {"role": "system", "content": self.system_prompt}
+
+
+class PersonaRegistry:
+    def __init__(self, personas: dict, default_name: str):
+        if default_name not in personas:
+            raise ValueError(f"Default persona '{default_name}' is not defined.")
+        self.personas = personas
+        self.default = personas[default_name]
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PERSONAS_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        personas = {name: Persona(name, config) for name, config in data["personas"].items()}
+        return cls(personas, data.get("default", next(iter(personas))))
+
+    def get(self, name: str = None) -> Persona:
+        """Unknown or missing names resolve to the default persona."""
+        return self.personas.get(name, self.default)
+
+    @property
+    def names(self):
+        return list(self.personas)
+
+
+@lru_cache(maxsize=None)
+def get_registry() -> PersonaRegistry:
+    """Loads the persona registry once per process (override the file with PERSONAS_PATH)."""
+    return PersonaRegistry.load(os.getenv("PERSONAS_PATH", DEFAULT_PERSONAS_PATH))
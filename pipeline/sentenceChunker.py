@@ -0,0 +1,36 @@
+# pipeline/sentenceChunker.py
+
+class SentenceChunker:
+    """
+    Turns a stream of LLM tokens into TTS-sized chunks using the persona's chunking policy:
+    split on its sentence delimiters, merge sentences shorter than min_chunk_chars with the next one.
+    Shared by the web server and the CLI so both speak replies in the same pieces.
+    """
+    def __init__(self, persona):
+        self.sentence_delimiters = persona.sentence_delimiters
+        self.min_chunk_chars = persona.min_chunk_chars
+        self._sentence_buffer = ""
+        self._pending_chunk = ""
+
+    def feed(self, text_chunk: str) -> list:
+        """Adds streamed text; returns the chunks that are now complete (often none)."""
+        self._sentence_buffer += text_chunk
+        parts = self.sentence_delimiters.split(self._sentence_buffer)
+        if len(parts) == 1:
+            return []
+        ready = []
+        for part in parts[:-1]:
+            if not part.strip(): continue
+            # Short sentences ("Hi!") are merged with the next one per the persona's chunking policy.
+            self._pending_chunk = f"{self._pending_chunk} {part.strip()}".strip()
+            if len(self._pending_chunk) >= self.min_chunk_chars:
+                ready.append(self._pending_chunk)
+                self._pending_chunk = ""
+        self._sentence_buffer = parts[-1]
+        return ready
+
+    def flush(self) -> str:
+        """Whatever is left once the reply is complete ('' if nothing)."""
+        final_chunk = f"{self._pending_chunk} {self._sentence_buffer.strip()}".strip()
+        self._sentence_buffer, self._pending_chunk = "", ""
+        return final_chunk
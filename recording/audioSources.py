@@ -0,0 +1,269 @@
+# recording/audioSources.py
+
+import io
+import socket
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 1024  # 64 ms at 16 kHz
+
+# ==============================================================================
+# 1. RING BUFFER
+# ==============================================================================
+
+class RingBuffer:
+    """
+    Fixed-size int16 ring fed by a source thread and read by absolute sample position.
+    Positions only grow, so a reader can keep a cursor (or a speech start minus some
+    pre-roll) and copy any range that hasn't been overwritten yet. No per-frame lists.
+    """
+    def __init__(self, capacity: int, dtype=np.int16):
+        self._data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.total = 0          # Samples ever written
+        self.closed = False     # Set when the source ends; readers drain what's left
+        self._cond = threading.Condition()
+
+    def write(self, samples: np.ndarray):
+        with self._cond:
+            n = len(samples)
+            if n >= self.capacity:
+                samples, skipped = samples[-self.capacity:], n - self.capacity
+                self.total += skipped
+                n = self.capacity
+            start = self.total % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self.total += n
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    @property
+    def oldest(self) -> int:
+        """First absolute position still held."""
+        return max(0, self.total - self.capacity)
+
+    def wait(self, position: int, timeout: float = None) -> bool:
+        """Blocks until `position` samples have been written; False on timeout or when closed short of it."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.total >= position or self.closed, timeout) and self.total >= position
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Copy of samples [start, end); positions already overwritten are clamped away."""
+        with self._cond:
+            start, end = max(start, self.oldest), min(end, self.total)
+            if end <= start:
+                return np.empty(0, dtype=self._data.dtype)
+            i, j = start % self.capacity, end % self.capacity
+            if i < j or j == 0:
+                return self._data[i:j or self.capacity].copy()
+            return np.concatenate([self._data[i:], self._data[:j]])
+
+
+def to_wav(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE, name: str = "audio.wav") -> io.BytesIO:
+    """Wraps int16 PCM in an in-memory WAV file (what the STT upload needs), no disk writes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sample_rate)
+        wf.writeframes(pcm.astype(np.int16, copy=False).tobytes())
+    buffer.seek(0)
+    buffer.name = name  # Multipart uploads take the file name from here
+    return buffer
+
+
+def rms(pcm: np.ndarray) -> float:
+    """Root mean square of int16 samples (drop-in for audioop.rms(data, 2), which is gone in Python 3.13)."""
+    if not len(pcm):
+        return 0.0
+    samples = pcm.astype(np.float32)
+    return float(np.sqrt(np.dot(samples, samples) / len(samples)))
+
+# ==============================================================================
+# 2. SOURCES
+# ==============================================================================
+
+class AudioSource:
+    """
+    Something that produces 16 kHz mono int16 PCM into a RingBuffer. Live sources
+    (mic, socket) write from their own thread; realtime=False sources are pulled,
+    so they run exactly as fast as the reader consumes them.
+    """
+    realtime = True
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, buffer_s: float = 60.0):
+        self.sample_rate = sample_rate
+        self.ring = RingBuffer(int(buffer_s * sample_rate))
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.ring.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _pull(self, position: int):
+        """Pulled sources write until `position` is available (or they run out)."""
+
+    def frames(self, frame_samples: int = FRAME_SAMPLES, start: int = None):
+        """Yields consecutive frames from `start` (default: now); the last one may be short."""
+        cursor = self.ring.total if start is None else start
+        while True:
+            if not self.realtime:
+                self._pull(cursor + frame_samples)
+            if not self.ring.wait(cursor + frame_samples, timeout=0.5):
+                if not self.ring.closed:
+                    continue
+                tail = self.ring.read(cursor, self.ring.total)
+                if len(tail): yield tail
+                return
+            yield self.ring.read(cursor, cursor + frame_samples)
+            cursor += frame_samples
+
+    async def aframes(self, frame_samples: int = FRAME_SAMPLES):
+        """frames() for asyncio code; each blocking wait runs in a worker thread."""
+        import asyncio
+
+        iterator = self.frames(frame_samples)
+        while True:
+            frame = await asyncio.to_thread(next, iterator, None)
+            if frame is None:
+                return
+            yield frame
+
+
+class PyAudioSource(AudioSource):
+    """The microphone through PyAudio in callback mode: PortAudio's thread writes straight into the ring."""
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_samples: int = FRAME_SAMPLES,
+                 device_index: int = None, buffer_s: float = 60.0):
+        super().__init__(sample_rate, buffer_s)
+        self.frame_samples = frame_samples
+        self.device_index = device_index
+        self._pyaudio = self._stream = None
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        return None, pyaudio.paContinue
+
+    def start(self):
+        import pyaudio
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+                                          frames_per_buffer=self.frame_samples,
+                                          input_device_index=self.device_index, stream_callback=self._on_audio)
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._pyaudio.terminate()
+            self._stream = None
+        super().stop()
+
+
+class WavFileSource(AudioSource):
+    """
+    Replays a mono 16-bit WAV in place of the mic, followed by `tail_silence_s` of silence
+    so the last utterance gets endpointed. realtime=True paces it like a live mic from a
+    thread; realtime=False hands it over as fast as the reader asks (tests, benchmarks).
+    """
+    def __init__(self, path: str, realtime: bool = True, tail_silence_s: float = 2.0,
+                 frame_samples: int = FRAME_SAMPLES, buffer_s: float = 60.0):
+        with wave.open(path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                raise ValueError(f"{path} must be mono, 16-bit PCM.")
+            sample_rate = wf.getframerate()
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        super().__init__(sample_rate, buffer_s)
+        self.pcm = np.concatenate([pcm, np.zeros(int(tail_silence_s * sample_rate), dtype=np.int16)])
+        self.realtime = realtime
+        self.frame_samples = frame_samples
+        self._offset = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def _pull(self, position: int):
+        while self.ring.total < position and self._offset < len(self.pcm):
+            self._write_next()
+        if self._offset >= len(self.pcm):
+            self.ring.close()
+
+    def _write_next(self):
+        frame = self.pcm[self._offset:self._offset + self.frame_samples]
+        self._offset += len(frame)
+        self.ring.write(frame)
+
+    def _replay(self):
+        started = time.monotonic()
+        while self._offset < len(self.pcm) and not self._stopping.is_set():
+            delay = started + self._offset / self.sample_rate - time.monotonic()
+            if delay > 0: time.sleep(delay)
+            self._write_next()
+        self.ring.close()
+
+    def start(self):
+        if self.realtime:
+            self._thread = threading.Thread(target=self._replay, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        super().stop()
+
+
+class SocketSource(AudioSource):
+    """
+    Raw int16 little-endian mono PCM over TCP (e.g. `arecord -f S16_LE -r 16000 | nc host port`).
+    Listens on (host, port) and reads from the first client that connects.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 5055, sample_rate: int = SAMPLE_RATE,
+                 buffer_s: float = 60.0):
+        super().__init__(sample_rate, buffer_s)
+        self.address = (host, port)
+        self._server = None
+        self._thread = None
+
+    def _receive(self):
+        try:
+            connection, _ = self._server.accept()
+        except OSError:
+            self.ring.close()
+            return
+        carry = b""  # recv() can split a sample
+        with connection:
+            while True:
+                data = connection.recv(8192)
+                if not data: break
+                data = carry + data
+                whole = len(data) - len(data) % 2
+                carry = data[whole:]
+                self.ring.write(np.frombuffer(data[:whole], dtype="<i2"))
+        self.ring.close()
+
+    def start(self):
+        self._server = socket.create_server(self.address)
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+        super().stop()
@@ -1,48 +1,33 @@
-import pyaudio
-import time
 import sys
-import wave
 
-def record_audio(duration=10, output_file='recorded_audio.wav'):
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 44100
-    CHUNK = 1024
+from recording.audioSources import PyAudioSource, to_wav
 
-    p = pyaudio.PyAudio()
-
-    stream_in = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
+def record_audio(duration=10, output_file=None, source=None):
+    """
+    Records `duration` seconds from `source` (default: the microphone at 16 kHz).
+    Returns an in-memory WAV ready for transcribe_audio(), or the path if output_file is given.
+    """
+    source = source or PyAudioSource(buffer_s=duration + 1)
+    total = int(duration * source.sample_rate)
 
     print(f"🎙️ Recording... Speak! Recording will last {duration} seconds.")
-    frames = []
-    start_time = time.time()
-    elapsed = 0
-
-    while elapsed < duration:
-        data = stream_in.read(CHUNK)
-        frames.append(data)
-
-        new_elapsed = int(time.time() - start_time)
-        if new_elapsed != elapsed:
-            elapsed = new_elapsed
-            time_left = duration - elapsed
-            sys.stdout.write(f"\r⏳ Time left: {time_left} seconds ")
-            sys.stdout.flush()
-
+    with source:
+        start = source.ring.total
+        elapsed = 0
+        for _ in source.frames(start=start):
+            new_elapsed = int((source.ring.total - start) / source.sample_rate)
+            if new_elapsed != elapsed:
+                elapsed = new_elapsed
+                sys.stdout.write(f"\r⏳ Time left: {duration - elapsed} seconds ")
+                sys.stdout.flush()
+            if source.ring.total - start >= total:
+                break
+        pcm = source.ring.read(start, start + total)
     print("\n✅ Done recording.")
 
-    stream_in.stop_stream()
-    stream_in.close()
-    p.terminate()
-
-    with wave.open(output_file, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-
-    return output_file
\ No newline at end of file
+    wav = to_wav(pcm, source.sample_rate)
+    if output_file is None:
+        return wav
+    with open(output_file, 'wb') as f:
+        f.write(wav.getbuffer())
+    return output_file
@@ -1,53 +1,38 @@
-import pyaudio
-import wave
-import audioop
-import time
+from recording.audioSources import PyAudioSource, rms, to_wav
 
-def record_audio(output_file='recorded_audio.wav', silence_limit=2, silence_threshold=1000):
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 16000  # Slightly lower rate to reduce load
-    CHUNK = 1024
-
-    p = pyaudio.PyAudio()
-    stream_in = p.open(format=FORMAT,
-                       channels=CHANNELS,
-                       rate=RATE,
-                       input=True,
-                       frames_per_buffer=CHUNK)
+def record_audio(output_file=None, silence_limit=2, silence_threshold=1000, pre_roll_s=0.3, source=None):
+    """
+    Records one utterance from `source` (default: the microphone at 16 kHz), from just before
+    the voice starts (`pre_roll_s`) until `silence_limit` seconds of silence. Returns an
+    in-memory WAV, or the path if output_file is given.
+    """
+    source = source or PyAudioSource()
+    chunk = 1024
 
     print("🎙️ Speak your heart out. Recording will stop automatically after silence...\n")
-    frames = []
-    silence_start = None
-    started = False
-
-    try:
-        while True:
-            data = stream_in.read(CHUNK)
-            rms = audioop.rms(data, 2)  # 2 bytes per sample
-            frames.append(data)
+    speech_start = None
+    silent_samples = 0
 
-            if rms > silence_threshold:
-                if not started:
+    with source:
+        cursor = source.ring.total
+        for frame in source.frames(chunk, start=cursor):
+            cursor += len(frame)
+            if rms(frame) > silence_threshold:
+                if speech_start is None:
                     print("🟢 Detected voice, recording started...")
-                    started = True
-                silence_start = None  # Reset silence timer
-            elif started:
-                if silence_start is None:
-                    silence_start = time.time()
-                elif time.time() - silence_start > silence_limit:
+                    speech_start = max(source.ring.oldest, cursor - len(frame) - int(pre_roll_s * source.sample_rate))
+                silent_samples = 0  # Reset silence timer
+            elif speech_start is not None:
+                silent_samples += len(frame)
+                if silent_samples > silence_limit * source.sample_rate:
                     print("⏹️ Silence detected, stopping recording.")
                     break
-    finally:
-        stream_in.stop_stream()
-        stream_in.close()
-        p.terminate()
-
-    with wave.open(output_file, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
+        pcm = source.ring.read(speech_start if speech_start is not None else cursor, cursor)
 
+    wav = to_wav(pcm, source.sample_rate)
+    if output_file is None:
+        return wav
+    with open(output_file, 'wb') as f:
+        f.write(wav.getbuffer())
     print("✅ Recording saved as", output_file)
     return output_file
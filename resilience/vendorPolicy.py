@@ -0,0 +1,220 @@
+# resilience/vendorPolicy.py
+
+import asyncio
+import logging
+import random
+import time
+
+from monitoring.metrics import METRICS
+
+# ==============================================================================
+# POLICIES & CIRCUIT BREAKERS
+# ==============================================================================
+
+class VendorUnavailable(Exception):
+    """Raised when a vendor call is refused by its breaker or runs out of attempts."""
+
+
+class CallPolicy:
+    """
+    Timing budget for one logical vendor call.
+    - attempt_timeout_s: how long a single attempt may take (non-streaming calls).
+    - ttfb_s: how long a stream may take to produce its first chunk.
+    - deadline_s: total budget across all attempts, including backoff sleeps.
+    - retries: extra attempts after the first one fails.
+    - hedge_after_s: if set, a second identical request is fired when the first
+      hasn't answered by then (the rolling p95 is used once enough samples exist).
+    """
+    def __init__(self, deadline_s: float, attempt_timeout_s: float = None, ttfb_s: float = None,
+                 retries: int = 1, backoff_s: float = 0.2, backoff_max_s: float = 2.0,
+                 hedge_after_s: float = None, hedge_min_samples: int = 20):
+        self.deadline_s = deadline_s
+        self.attempt_timeout_s = attempt_timeout_s or deadline_s
+        self.ttfb_s = ttfb_s or deadline_s
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge_after_s = hedge_after_s
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries out so a vendor blip doesn't get a synchronized retry storm.
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_s * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker. While open, calls are refused
+    immediately so the server can fall back (e.g. text-only replies) instead of
+    waiting on a vendor that is known to be down. Half-open lets a single probe
+    through; everyone else is refused until it succeeds. A probe that never reports
+    back (e.g. its caller was cancelled) is given up on after reset_after_s.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_after_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half_open":
+            return state == "closed"
+        now = time.monotonic()
+        if self._probe_started is not None and now - self._probe_started < self.reset_after_s:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logging.info(f"Circuit '{self.name}' closed again.")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self._probe_started = None
+        self._failures += 1
+        METRICS.incr(f"{self.name}_failures")
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                logging.warning(f"Circuit '{self.name}' opened after {self._failures} failures.")
+                METRICS.incr(f"{self.name}_circuit_opened")
+            self._opened_at = time.monotonic()
+
+# ==============================================================================
+# CALL WRAPPERS
+# ==============================================================================
+
+def _hedge_delay(name: str, policy: CallPolicy):
+    if policy.hedge_after_s is None:
+        return None
+    window = METRICS.latency(f"{name}_latency")
+    if window.count >= policy.hedge_min_samples:
+        return window.percentile(95)
+    return policy.hedge_after_s
+
+
+async def _hedged_attempt(name: str, factory, policy: CallPolicy, timeout: float):
+    """Runs one attempt, firing a duplicate request if the first is slower than the hedge delay."""
+    hedge_delay = _hedge_delay(name, policy)
+    primary = asyncio.ensure_future(factory())
+    if hedge_delay is None or hedge_delay >= timeout:
+        return await asyncio.wait_for(primary, timeout)
+
+    pending = {primary}
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            METRICS.incr(f"{name}_hedges")
+            pending.add(asyncio.ensure_future(factory()))
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, end - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_policy(name: str, factory, policy: CallPolicy, breaker: CircuitBreaker):
+    """
+    Awaits `factory()` (a coroutine factory) under the policy: per-attempt timeout,
+    overall deadline, bounded jittered retries and optional hedging.
+    """
+    if not breaker.allow():
+        METRICS.incr(f"{name}_rejected_open_circuit")
+        raise VendorUnavailable(f"{name} circuit is open")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline_s
+    last_error = None
+    for attempt in range(policy.retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        started = loop.time()
+        try:
+            result = await _hedged_attempt(name, factory, policy, min(policy.attempt_timeout_s, remaining))
+            METRICS.observe(f"{name}_latency", loop.time() - started)
+            breaker.record_success()
+            return result
+        except asyncio.TimeoutError as e:
+            last_error = e
+            METRICS.incr(f"{name}_timeouts")
+        except Exception as e:
+            last_error = e
+        breaker.record_failure()
+        if attempt < policy.retries and breaker.allow():
+            METRICS.incr(f"{name}_retries")
+            await asyncio.sleep(min(policy.backoff(attempt), max(0, deadline - loop.time())))
+        else:
+            break
+    raise VendorUnavailable(f"{name} failed after {attempt + 1} attempt(s): {last_error!r}") from last_error
+
+
+async def stream_with_policy(name: str, factory, policy: CallPolicy, breaker: CircuitBreaker):
+    """
+    Async-iterates `factory()` (an async generator factory) under the policy.
+    The first chunk must arrive within ttfb_s and the whole stream within the deadline.
+    Retries only happen before the first chunk: once data went out it can't be taken back.
+    """
+    if not breaker.allow():
+        METRICS.incr(f"{name}_rejected_open_circuit")
+        raise VendorUnavailable(f"{name} circuit is open")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline_s
+    last_error = None
+    for attempt in range(policy.retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        stream = factory()
+        started = loop.time()
+        yielded = False
+        try:
+            chunk = await asyncio.wait_for(anext(stream), min(policy.ttfb_s, remaining))
+            METRICS.observe(f"{name}_ttfb", loop.time() - started)
+            while True:
+                yielded = True
+                yield chunk
+                chunk = await asyncio.wait_for(anext(stream), max(0, deadline - loop.time()))
+        except StopAsyncIteration:
+            METRICS.observe(f"{name}_latency", loop.time() - started)
+            breaker.record_success()
+            return
+        except asyncio.TimeoutError as e:
+            last_error = e
+            METRICS.incr(f"{name}_timeouts")
+        except Exception as e:
+            last_error = e
+        finally:
+            await stream.aclose()
+        breaker.record_failure()
+        if yielded or not breaker.allow():
+            break
+        if attempt < policy.retries:
+            METRICS.incr(f"{name}_retries")
+            await asyncio.sleep(min(policy.backoff(attempt), max(0, deadline - loop.time())))
+    raise VendorUnavailable(f"{name} stream failed: {last_error!r}") from last_error
@@ -1,27 +1,36 @@
 # server.py
 
 import asyncio
-import base64
 import json
 import logging
 import numpy as np
-import torch
-import tempfile
-import wave
 import os
-import re
+import time
+from contextlib import asynccontextmanager
 from typing import List
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 
-from brain.mistralAPI_brain import stream_mistral_chat_async
-from stt.sarvamSTT import transcribe_audio
+from brain.mistralAPI_brain import stream_mistral_chat_async, warm_up as warm_up_llm
+from brain.replyCache import ReplyCache
+from stt.sarvamSTT import transcribe_audio, warm_up as warm_up_stt
+from stt.audioEncoding import UtteranceEncoder
 from logs.logger import log_conversation
-from tts.elevenLabs.xiTTS import stream_tts_audio
+from tts.elevenLabs.xiTTS import stream_tts_audio, warm_up as warm_up_tts
+from monitoring.metrics import METRICS
+from personas.personaRegistry import Persona, get_registry
+from pipeline.sentenceChunker import SentenceChunker
+from audio.uplink import UplinkFormat, VAD_WINDOW_SIZE
+from audio.downlink import DownlinkFormat, allowed_formats
+from resilience.vendorPolicy import CallPolicy, CircuitBreaker, VendorUnavailable, call_with_policy, stream_with_policy
+from sessions.sessionStore import SQLiteSessionStore
+from vad.streamingVAD import StreamingVADIterator, load_vad_model
+from vad.utteranceGate import UtteranceGate
+from vad.utteranceSegmenter import UtteranceSegmenter
 
 # ==============================================================================
 # 1. CONFIGURATION & SETUP
@@ -29,24 +38,91 @@ from tts.elevenLabs.xiTTS import stream_tts_audio
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
-app = FastAPI()
+
+async def evict_idle_sessions():
+    while True:
+        await asyncio.sleep(60)
+        try:
+            SESSIONS.evict_idle()
+        except Exception as e:
+            # Keep the loop alive: one failed pass (e.g. a SQLite error while saving) must not stop eviction for good.
+            logging.error(f"Idle session eviction failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The VAD loads in the background so the process answers /ready (503) while it warms up.
+    vad_task = asyncio.create_task(load_vad())
+    eviction_task = asyncio.create_task(evict_idle_sessions())
+    yield
+    vad_task.cancel()
+    eviction_task.cancel()
+    STT_ENCODER.close()
+    SESSIONS.close()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 templates = Jinja2Templates(directory="web/templates")
 SAMPLE_RATE = 16000
+PERSONAS = get_registry()  # Loaded once; each connection resolves its persona up front
+
+# --- Session Persistence ---
+# Conversations survive dropped connections: the client reconnects with its session token.
+SESSIONS = SQLiteSessionStore(
+    path=os.getenv("SESSION_DB_PATH", "sessions/sessions.db"),
+    idle_ttl_s=float(os.getenv("SESSION_IDLE_TTL_S", "900")),
+)
+
+# --- Vendor Resilience ---
+# Deadlines bound the tail of every turn; breakers flip the call to text-only when a vendor is down.
+STT_POLICY = CallPolicy(deadline_s=12.0, attempt_timeout_s=6.0, retries=2, hedge_after_s=2.5)
+LLM_POLICY = CallPolicy(deadline_s=30.0, ttfb_s=6.0, retries=1)
+TTS_POLICY = CallPolicy(deadline_s=20.0, ttfb_s=4.0, retries=1)
+BREAKERS = {name: CircuitBreaker(name) for name in ("stt", "llm", "tts")}
+
+# --- STT Upload Encoding ---
+# "flac" (lossless) or "opus" shrink the upload on slow egress links; see benchmarks/sttEncodeBench.py.
+STT_ENCODER = UtteranceEncoder(os.getenv("STT_UPLOAD_CODEC", "wav"))
+
+# --- TTS Downlink Formats ---
+# Formats a client may negotiate for reply audio (mp3, pcm_16000, opus). Drop pcm_16000 to cap the
+# downlink at compressed bitrates; clients that ask for nothing allowed get MP3.
+TTS_DOWNLINK_FORMATS = allowed_formats(os.getenv("TTS_DOWNLINK_FORMATS", "pcm_16000,mp3,opus"))
+
+# --- Connection Warm-Up ---
+# Vendor clients keep one connection pool per process. Each call touches it while the phone rings and
+# again when the user starts speaking, so a turn's first STT/LLM/TTS request finds a warm connection.
+# Calls share the pools, so a vendor warmed less than WARMUP_INTERVAL_S ago is skipped; 0 disables it.
+WARMUP_INTERVAL_S = float(os.getenv("WARMUP_INTERVAL_S", "4"))
+_last_warm_up = {}
+
+# --- LLM Reply Cache (optional) ---
+# Replays replies to stateless openers ("hello", "who are you") instead of a full LLM round trip.
+REPLY_CACHE = ReplyCache(
+    max_entries=int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "256")),
+    ttl_s=float(os.getenv("REPLY_CACHE_TTL_S", "3600")),
+) if os.getenv("ENABLE_REPLY_CACHE") == "1" else None
 
 # ==============================================================================
 # 2. VAD MODULE
 # ==============================================================================
-try:
-    model, utils = torch.hub.load(
-        repo_or_dir='vad_model/silero-vad-master', model='silero_vad',
-        source='local', trust_repo=True
-    )
-    (get_speech_timestamps, _, _, VADIterator, _) = utils
-    logging.info("Local PyTorch VAD model loaded successfully.")
-except Exception as e:
-    logging.error(f"FATAL: Could not load local VAD model. Error: {e}")
-    exit()
+# "onnx" needs only onnxruntime + NumPy; "torch" keeps the original TorchScript model (imports torch/torchaudio).
+VAD_BACKEND = os.getenv("VAD_BACKEND", "torch")
+VAD_ONNX_MODEL = os.getenv("VAD_ONNX_MODEL")  # Optional ONNX export for VAD_BACKEND=onnx (tuning/export_onnx.py)
+vad_model = None
+vad_error = None
+
+async def load_vad():
+    global vad_model, vad_error
+    started = time.perf_counter()
+    try:
+        loaded = await asyncio.to_thread(load_vad_model, VAD_BACKEND, VAD_ONNX_MODEL)
+        # One dummy window so the first caller doesn't pay for graph initialisation.
+        await asyncio.to_thread(loaded.new_stream(), np.zeros(VAD_WINDOW_SIZE, dtype=np.float32))
+        vad_model = loaded
+        logging.info(f"VAD model ({VAD_BACKEND}) ready in {time.perf_counter() - started:.2f}s.")
+    except Exception as e:
+        vad_error = str(e)
+        logging.error(f"Could not load the {VAD_BACKEND} VAD model. Error: {e}")
 
 # ==============================================================================
 # 3. FASTAPI SERVER LOGIC
@@ -56,118 +132,293 @@ except Exception as e:
 async def get_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/metrics")
+async def get_metrics():
+    snapshot = METRICS.snapshot()
+    snapshot["circuits"] = {name: breaker.state for name, breaker in BREAKERS.items()}
+    if REPLY_CACHE: snapshot["reply_cache"] = REPLY_CACHE.stats()
+    snapshot["sessions_in_memory"] = SESSIONS.active_count
+    return snapshot
+
+@app.get("/ready")
+async def get_ready():
+    if vad_model is None:
+        return JSONResponse(status_code=503, content={"ready": False, "vad_backend": VAD_BACKEND, "error": vad_error})
+    return {"ready": True, "vad_backend": VAD_BACKEND}
+
 async def safe_send(websocket: WebSocket, message: dict):
     try: await websocket.send_text(json.dumps(message))
     except RuntimeError: logging.warning("WebSocket is closed.")
 
 # --- Processing Pipelines ---
-async def tts_consumer(websocket: WebSocket, text_queue: asyncio.Queue, character_name: str):
+async def warm_up_vendors():
+    """Refreshes each vendor's pooled connection unless another call just did; failures only cost a counter."""
+    if not WARMUP_INTERVAL_S: return
+    warmers = {"stt": lambda: asyncio.to_thread(warm_up_stt), "llm": warm_up_llm, "tts": warm_up_tts}
+    now = time.monotonic()
+    due = [name for name in warmers
+           if now - _last_warm_up.get(name, float("-inf")) >= WARMUP_INTERVAL_S and BREAKERS[name].state != "open"]
+    for name in due: _last_warm_up[name] = now
+
+    async def warm(name):
+        started = time.perf_counter()
+        if await warmers[name](): METRICS.observe(f"warmup_{name}", time.perf_counter() - started)
+        else: METRICS.incr(f"warmup_{name}_failed")
+    await asyncio.gather(*(warm(name) for name in due), return_exceptions=True)
+
+async def synthesize(text: str, persona: Persona, downlink: DownlinkFormat):
+    """Whole-text TTS into memory (the greeting, prefetched while the phone rings): (chunks, seconds)."""
+    audio_stream = stream_with_policy(
+        "tts", lambda: stream_tts_audio(text, persona.voice_id, persona.tts_model, raise_errors=True,
+                                        output_format=downlink.output_format),
+        TTS_POLICY, BREAKERS["tts"])
+    duration = downlink.counter()
+    chunks = []
+    async for audio_chunk in audio_stream:
+        duration.feed(audio_chunk)
+        chunks.append(audio_chunk)
+    return chunks, duration.seconds
+
+async def send_greeting(websocket: WebSocket, persona: Persona, conversation_history: list,
+                        audio: asyncio.Task = None, session_token: str = None):
+    """
+    Says the persona's greeting once the call is answered, with the audio synthesized during the ring.
+    Without audio (text-only persona) the greeting is just text.
+    """
+    conversation_history.append({"role": "assistant", "content": persona.greeting})
+    log_conversation("AI", persona.greeting, session=session_token)
+    await safe_send(websocket, {"type": "ai_text_chunk", "data": persona.greeting})
+    if audio is None: return
     await safe_send(websocket, {"type": "tts_start"})
+    seconds = 0.0
+    try:
+        chunks, seconds = await audio
+        for audio_chunk in chunks:
+            await websocket.send_bytes(audio_chunk)
+    except VendorUnavailable as e:
+        logging.warning(f"Greeting audio unavailable: {e}")
+        seconds = 0.0
+    except RuntimeError: pass
+    await safe_send(websocket, {"type": "tts_end", "playback_end_at": round(seconds, 3)})
+
+async def send_fallback(websocket: WebSocket, reason: str):
+    METRICS.incr(f"fallback_text_only_{reason}")
+    await safe_send(websocket, {"type": "fallback", "mode": "text_only", "reason": reason})
+
+async def tts_consumer(websocket: WebSocket, text_queue: asyncio.Queue, persona: Persona,
+                       downlink: DownlinkFormat = None, turn_started: float = None, turn_metric: str = "turn_latency"):
+    """
+    Streams each sentence's TTS audio in the connection's negotiated format and keeps count of how much playable audio went out.
+    With turn_started (perf_counter at the end of the user's turn), the wait until the first audio byte
+    is recorded under turn_metric.
+    After every sentence a tts_sentence marker says where it sits on the reply's audio timeline;
+    tts_end carries playback_end_at (seconds of audio in the whole reply), so the client
+    reopens the mic exactly when playback finishes instead of guessing.
+    """
+    await safe_send(websocket, {"type": "tts_start"})
+    text_only = not persona.voice_id
+    downlink = downlink or DownlinkFormat()
+    audio_seconds = 0.0
+    sentence_index = 0
     while True:
+        sentence = await text_queue.get()
         try:
-            sentence = await text_queue.get()
             if sentence is None: break
-            if not sentence.strip(): continue
-            async for audio_chunk in stream_tts_audio(sentence, character_name):
+            if not sentence.strip() or text_only: continue
+            audio_stream = stream_with_policy(
+                "tts", lambda: stream_tts_audio(sentence, persona.voice_id, persona.tts_model, raise_errors=True,
+                                         output_format=downlink.output_format),
+                TTS_POLICY, BREAKERS["tts"])
+            duration = downlink.counter()
+            async for audio_chunk in audio_stream:
+                if turn_started is not None:
+                    METRICS.observe(turn_metric, time.perf_counter() - turn_started)
+                    turn_started = None
+                duration.feed(audio_chunk)
+                METRICS.incr(f"tts_bytes_{downlink.name}", len(audio_chunk))
                 await websocket.send_bytes(audio_chunk)
-            text_queue.task_done()
+            await safe_send(websocket, {"type": "tts_sentence", "index": sentence_index, "text": sentence,
+                                        "start_s": round(audio_seconds, 3), "duration_s": round(duration.seconds, 3)})
+            audio_seconds += duration.seconds
+            sentence_index += 1
+        except VendorUnavailable as e:
+            # The text is already on screen via ai_text_chunk; keep draining the queue silently.
+            logging.warning(f"TTS unavailable, continuing text-only: {e}")
+            text_only = True
+            await send_fallback(websocket, "tts")
         except RuntimeError: break
         except Exception as e: logging.error(f"Error in TTS consumer: {e}"); break
-    await safe_send(websocket, {"type": "tts_end"})
+        finally:
+            text_queue.task_done()  # Every item, whether it was spoken, skipped or failed
+    await safe_send(websocket, {"type": "tts_end", "playback_end_at": round(audio_seconds, 3)})
 
-async def llm_producer(websocket: WebSocket, transcript: str, conversation_history: list, text_queue: asyncio.Queue):
-    full_reply, sentence_buffer = "", ""
-    sentence_delimiters = re.compile(r'(?<=[.?!])\s*')
+async def llm_producer(websocket: WebSocket, transcript: str, conversation_history: list, text_queue: asyncio.Queue,
+                       persona: Persona, session_token: str = None):
+    full_reply = ""
+    chunker = SentenceChunker(persona)
     try:
-        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history):
+        reply_stream = stream_with_policy(
+            "llm", lambda: stream_mistral_chat_async(transcript, conversation_history, raise_errors=True,
+                                                     reply_cache=REPLY_CACHE, model=persona.llm_model),
+            LLM_POLICY, BREAKERS["llm"])
+        async for text_chunk in reply_stream:
             full_reply += text_chunk
-            sentence_buffer += text_chunk
             await safe_send(websocket, {"type": "ai_text_chunk", "data": text_chunk})
-            parts = sentence_delimiters.split(sentence_buffer)
-            if len(parts) > 1:
-                for i in range(len(parts) - 1):
-                    if parts[i].strip(): await text_queue.put(parts[i].strip())
-                sentence_buffer = parts[-1]
-        if sentence_buffer.strip(): await text_queue.put(sentence_buffer.strip())
-        log_conversation("AI", full_reply)
+            for sentence in chunker.feed(text_chunk):
+                await text_queue.put(sentence)
+        final_chunk = chunker.flush()
+        if final_chunk: await text_queue.put(final_chunk)
+        log_conversation("AI", full_reply, session=session_token)
     except Exception as e:
         logging.error(f"Error in LLM producer: {e}")
         await text_queue.put("I'm sorry, I'm having a little trouble connecting right now.")
     finally:
         await text_queue.put(None)
 
-async def _process_voice_message(websocket: WebSocket, audio_bytes: bytes, conversation_history: list, character_name: str):
-    tmp_wav_path = ""
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
-            tmp_wav_path = tmp_wav.name
-            with wave.open(tmp_wav, 'wb') as wf:
-                wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(SAMPLE_RATE)
-                wf.writeframes(audio_bytes)
-        
-        transcript = await asyncio.to_thread(transcribe_audio, tmp_wav_path)
-        if not transcript or not transcript.strip(): return
-
-        await safe_send(websocket, {"type": "user_transcript", "data": transcript})
-        log_conversation("User (voice)", transcript)
-        
-        text_queue = asyncio.Queue()
-        tts_task = asyncio.create_task(tts_consumer(websocket, text_queue, character_name))
-        llm_task = asyncio.create_task(llm_producer(websocket, transcript, conversation_history, text_queue))
-        await asyncio.gather(llm_task, tts_task)
-    finally:
-        if tmp_wav_path and os.path.exists(tmp_wav_path): os.remove(tmp_wav_path)
+async def transcribe_segment(pcm: np.ndarray) -> str:
+    """One utterance segment -> text. Raises VendorUnavailable once the STT policy gives up."""
+    encode_started = time.perf_counter()
+    upload = await STT_ENCODER.encode(pcm, SAMPLE_RATE)
+    METRICS.observe("stt_encode", time.perf_counter() - encode_started)
+    METRICS.incr("stt_upload_bytes", len(upload.data))
+    METRICS.incr("stt_upload_raw_bytes", pcm.nbytes)
+    METRICS.incr("stt_segments")
+    # Uploaded from memory; every attempt (retry or hedge) reads its own copy.
+    return await call_with_policy(
+        "stt", lambda: asyncio.to_thread(transcribe_audio, upload.open(), raise_errors=True),
+        STT_POLICY, BREAKERS["stt"])
+
+async def _process_voice_message(websocket: WebSocket, segments: list, conversation_history: list, persona: Persona,
+                                 session_token: str = None, downlink: DownlinkFormat = None,
+                                 turn_metric: str = "turn_latency"):
+    """
+    `segments`: transcription tasks for the utterance's segments, in order; most may be done already.
+    Time from here (the end of the user's turn) to the first reply audio is recorded under turn_metric.
+    """
+    turn_started = time.perf_counter()
+    transcripts = await asyncio.gather(*segments, return_exceptions=True)
+    failures = [result for result in transcripts if isinstance(result, BaseException)]
+    if failures:
+        unavailable = [failure for failure in failures if isinstance(failure, VendorUnavailable)]
+        if not unavailable: raise failures[0]
+        logging.error(f"STT unavailable: {unavailable[0]}")
+        await send_fallback(websocket, "stt")
+        return
+    transcript = " ".join(part.strip() for part in transcripts if part and part.strip())
+    if not transcript: return
 
-async def _process_text_message(websocket: WebSocket, transcript: str, conversation_history: list):
-    log_conversation("User (text)", transcript)
+    await safe_send(websocket, {"type": "user_transcript", "data": transcript})
+    log_conversation("User (voice)", transcript, session=session_token)
+    
+    text_queue = asyncio.Queue()
+    tts_task = asyncio.create_task(tts_consumer(websocket, text_queue, persona, downlink, turn_started, turn_metric))
+    llm_task = asyncio.create_task(llm_producer(websocket, transcript, conversation_history, text_queue, persona,
+                                                session_token))
+    await asyncio.gather(llm_task, tts_task)
+
+async def _process_text_message(websocket: WebSocket, transcript: str, conversation_history: list, persona: Persona,
+                                session_token: str = None):
+    log_conversation("User (text)", transcript, session=session_token)
     full_reply = ""
     try:
-        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history):
+        reply_stream = stream_with_policy(
+            "llm", lambda: stream_mistral_chat_async(transcript, conversation_history, raise_errors=True,
+                                                     reply_cache=REPLY_CACHE, model=persona.llm_model),
+            LLM_POLICY, BREAKERS["llm"])
+        async for text_chunk in reply_stream:
             full_reply += text_chunk
             await safe_send(websocket, {"type": "ai_text_chunk", "data": text_chunk})
-        log_conversation("AI (text)", full_reply)
+        log_conversation("AI (text)", full_reply, session=session_token)
     except Exception as e:
         logging.error(f"Error in text message LLM producer: {e}")
+        await safe_send(websocket, {"type": "ai_text_chunk", "data": "I'm sorry, I'm having a little trouble connecting right now."})
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     app_password = os.getenv("APP_PASSWORD")
     password_from_client = websocket.query_params.get("password")
-    selected_character = websocket.query_params.get("character", "Taara")
+    selected_character = websocket.query_params.get("character")
     logging.info(f"New connection attempt for character: {selected_character}")
 
     if app_password and password_from_client != app_password:
         await websocket.close(code=4001, reason="Authentication failed")
         return
+    if vad_model is None:
+        await websocket.close(code=1013, reason="VAD model is not ready")
+        return
     
     await websocket.accept()
+    # While the client's caller tune plays, open the vendor connections the first turn will need.
+    warm_up_task = asyncio.create_task(warm_up_vendors())
     
-    if selected_character == "Veer":
-        system_prompt = {"role": "system", "content": "You are Veer, a calm, focused, and strategic thinking partner from the TAARA Network. You are helpful and provide clear, logical advice. You speak concisely and directly. Avoid emotional language and stick to facts and rational analysis."}
-    else: # Default to Taara
-        system_prompt = {"role": "system", "content": "You are Taara, a witty, warm, and supportive best friend from the TAARA Network. You are empathetic and always ready for a deep chat or a playful joke. You speak in a friendly, engaging manner, often using a mix of English and Hindi (Hinglish)."}
-    
-    conversation_history: List[dict] = [system_prompt]
+    persona = PERSONAS.get(selected_character)
+    session_token = websocket.query_params.get("session")
+    session = SESSIONS.resume(session_token, persona) if session_token else None
+    resumed = session is not None
+    if not resumed:
+        session = SESSIONS.create(persona)
+    session_owner = session.owner  # Passed back on release, in case a reconnect takes the session over
+    conversation_history: List[dict] = session.history
+    await safe_send(websocket, {
+        "type": "session", "token": session.token, "resumed": resumed,
+        "history": [m for m in conversation_history if m["role"] != "system"] if resumed else [],
+    })
+
+    def start_turn(turn):
+        # Each finished turn is appended to the session store as soon as it completes.
+        task = asyncio.create_task(turn)
+        task.add_done_callback(lambda _: SESSIONS.save(session))
     
-    vad_iterator = VADIterator(model, threshold=0.5)
-    audio_buffer = torch.empty(0, dtype=torch.float32)
-    speech_audio_buffer = []
+    # Each connection gets its own recurrent VAD state; the model weights are shared.
+    vad_iterator = StreamingVADIterator(vad_model.new_stream(), threshold=persona.vad.threshold,
+                                        min_silence_duration_ms=persona.vad.min_silence_duration_ms,
+                                        speech_pad_ms=persona.vad.speech_pad_ms)
+    # The stream's first call is the slow one (buffers, IO binding): pay it now, not on the first words.
+    vad_iterator.stream(np.zeros(VAD_WINDOW_SIZE, dtype=np.float32))
+    vad_iterator.reset_states()
+    utterance_gate = UtteranceGate.from_settings(persona.vad)
+    uplink = UplinkFormat.negotiate({}, SAMPLE_RATE)
+    downlink = DownlinkFormat()
+    # The open segment of the utterance (int16 VAD windows + their probabilities). Long speech is cut
+    # into segments that go to STT while the user keeps talking; their tasks wait in stt_segments.
+    segmenter = UtteranceSegmenter(persona.vad.max_utterance_s, persona.vad.threshold)
+    stt_segments = []
     is_speaking = False
     end_speech_timer = None
+    # The persona's optional greeting is synthesized during the ring and spoken when the call is answered.
+    greeting_audio = None
+    greeted = resumed or not persona.greeting
+    voice_turns = 0
     
     async def process_utterance():
-        nonlocal is_speaking, speech_audio_buffer
-        if not speech_audio_buffer: 
-            is_speaking = False
-            return
+        nonlocal is_speaking, stt_segments, voice_turns
         is_speaking = False
-        full_utterance_tensor = torch.cat(speech_audio_buffer)
-        speech_audio_buffer = []
-        speech_bytes = (full_utterance_tensor * 32767).to(torch.int16).numpy().tobytes()
-        asyncio.create_task(_process_voice_message(websocket, speech_bytes, conversation_history, selected_character))
+        last = segmenter.finish()
+        segments, stt_segments = stt_segments, []
+        if last is not None:
+            # Only a single-segment utterance can be a blip; longer speech already passed the limit.
+            rejected = utterance_gate.check(*last) if not segments else None
+            if rejected:
+                METRICS.incr(f"utterances_rejected_{rejected}")
+                logging.info(f"Dropped a {len(last[0]) / SAMPLE_RATE:.2f}s utterance before STT ({rejected}).")
+                return
+            segments.append(asyncio.create_task(transcribe_segment(last[0])))
+        if not segments:
+            return
+        METRICS.incr("utterances_accepted")
+        # The first turn is reported apart from the rest, so a remaining cold-start penalty stays visible.
+        turn_metric = "turn_latency_first" if voice_turns == 0 else "turn_latency"
+        voice_turns += 1
+        start_turn(_process_voice_message(websocket, segments, conversation_history, persona, session.token,
+                                          downlink, turn_metric))
+
+    def prefetch_greeting():
+        nonlocal greeting_audio
+        if greeting_audio is None and not greeted and persona.voice_id:
+            greeting_audio = asyncio.create_task(synthesize(persona.greeting, persona, downlink))
 
     async def start_end_speech_timer():
-        await asyncio.sleep(0.8)
+        await asyncio.sleep(persona.vad.end_of_turn_s)
         if is_speaking: await process_utterance()
 
     try:
@@ -175,25 +426,45 @@ async def websocket_endpoint(websocket: WebSocket):
             message_text = await websocket.receive_text()
             message = json.loads(message_text)
             if message['type'] == 'audio_chunk':
-                audio_data_bytes = base64.b64decode(message['data'])
-                new_audio_tensor = torch.from_numpy(np.frombuffer(audio_data_bytes, dtype=np.float32).copy())
-                audio_buffer = torch.cat([audio_buffer, new_audio_tensor])
-                VAD_WINDOW_SIZE = 512
-                while audio_buffer.shape[0] >= VAD_WINDOW_SIZE:
-                    current_window = audio_buffer[:VAD_WINDOW_SIZE]
-                    audio_buffer = audio_buffer[VAD_WINDOW_SIZE:]
-                    if is_speaking: speech_audio_buffer.append(current_window)
-                    speech_dict = vad_iterator(current_window, return_seconds=True)
-                    if speech_dict:
-                        if 'start' in speech_dict:
-                            if not is_speaking:
-                                is_speaking = True
-                                speech_audio_buffer = [current_window]
-                            if end_speech_timer and not end_speech_timer.done(): end_speech_timer.cancel()
-                        if 'end' in speech_dict and is_speaking:
-                            if not end_speech_timer or end_speech_timer.done():
-                               end_speech_timer = asyncio.create_task(start_end_speech_timer())
+                vad_cpu_start = time.thread_time()
+                # All complete windows in the message go through the VAD in one call; leftovers carry over.
+                batch = vad_iterator.process(uplink.decode(message['data']))
+                speech_from = 0 if is_speaking else None
+                for kind, window_index, _ in batch.events:
+                    if kind == 'start':
+                        if not is_speaking:
+                            is_speaking = True
+                            speech_from = window_index
+                            asyncio.create_task(warm_up_vendors())  # Rate-limited; keeps the turn's connections warm
+                        if end_speech_timer and not end_speech_timer.done(): end_speech_timer.cancel()
+                    elif kind == 'end' and is_speaking:
+                        if not end_speech_timer or end_speech_timer.done():
+                           end_speech_timer = asyncio.create_task(start_end_speech_timer())
+                if speech_from is not None and speech_from < len(batch.windows):
+                    for pcm, _ in segmenter.append(batch.windows[speech_from:].reshape(-1), batch.probs[speech_from:]):
+                        stt_segments.append(asyncio.create_task(transcribe_segment(pcm)))
+                METRICS.incr("vad_windows", len(batch.probs))
+                METRICS.incr("vad_cpu_us", int((time.thread_time() - vad_cpu_start) * 1e6))
+            elif message['type'] == 'audio_config':
+                uplink = UplinkFormat.negotiate(message, SAMPLE_RATE)
+                await safe_send(websocket, uplink.to_message())
+            elif message['type'] == 'playback_config':
+                downlink = DownlinkFormat.negotiate(message, TTS_DOWNLINK_FORMATS)
+                await safe_send(websocket, downlink.to_message())
+                prefetch_greeting()
+            elif message['type'] == 'call_connected':
+                if not greeted:
+                    greeted = True
+                    prefetch_greeting()
+                    start_turn(send_greeting(websocket, persona, conversation_history, greeting_audio,
+                                             session.token))
             elif message['type'] == 'text_message':
-                asyncio.create_task(_process_text_message(websocket, message['data'], conversation_history))
+                start_turn(_process_text_message(websocket, message['data'], conversation_history, persona,
+                                                 session.token))
     except WebSocketDisconnect:
-        logging.info(f"WebSocket connection closed for {selected_character}.")
\ No newline at end of file
+        logging.info(f"WebSocket connection closed for {persona.name}.")
+    finally:
+        for segment in stt_segments: segment.cancel()
+        warm_up_task.cancel()
+        if greeting_audio is not None: greeting_audio.cancel()
+        SESSIONS.release(session, session_owner)
\ No newline at end of file
@@ -0,0 +1,147 @@
+# sessions/sessionStore.py
+
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "sessions.db")
+
+
+class Session:
+    """One conversation: the token the client reconnects with, its persona and the LLM history."""
+    def __init__(self, token: str, persona_name: str, history: list, persisted: int = 0):
+        self.token = token
+        self.persona_name = persona_name
+        self.history = history
+        self.persisted = persisted  # How many history messages are already on disk
+        self.connected = False  # Set while a socket holds the session
+        self.owner = 0          # Bumped on every hand-out; only the current holder's release() counts
+        self.last_seen = time.monotonic()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+
+class SQLiteSessionStore:
+    """
+    Keeps live sessions in memory and appends each finished turn to SQLite.
+    Resuming a session that is still in memory is a dict lookup; an evicted one
+    is reloaded with a single primary-key range scan, never by replaying logs.
+    """
+    def __init__(self, path: str = DEFAULT_DB_PATH, idle_ttl_s: float = 900.0):
+        self.idle_ttl_s = idle_ttl_s
+        self._active = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            token TEXT PRIMARY KEY, persona TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS messages (
+            token TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,
+            PRIMARY KEY (token, seq)) WITHOUT ROWID""")
+        self._db.commit()
+
+    def create(self, persona) -> Session:
+        session = Session(secrets.token_urlsafe(24), persona.name, [persona.system_message()])
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO sessions VALUES (?, ?, ?, ?)", (session.token, persona.name, now, now))
+            self._active[session.token] = session
+            self._hand_out(session)
+        self.save(session, complete_turns_only=False)
+        return session
+
+    def resume(self, token: str, persona):
+        """
+        Returns the session for `token` if it exists and belongs to this persona, else None.
+        Only sessions that are handed out are cached, so replayed or foreign tokens can't pin memory.
+        A session another socket still holds is taken over: a client reconnecting after a dropped
+        connection usually arrives before the server has noticed the old socket is dead.
+        """
+        with self._lock:
+            session = self._active.get(token)
+            if session is None:
+                session = self._load(token)
+                if session is None or session.persona_name != persona.name:
+                    return None
+                self._active[token] = session
+            elif session.persona_name != persona.name:
+                return None
+            elif session.connected:
+                logging.info(f"Session {token[:8]}… taken over by a new connection.")
+            self._hand_out(session)
+        return session
+
+    @staticmethod
+    def _hand_out(session: Session):
+        session.connected = True
+        session.owner += 1
+        session.touch()
+
+    def _load(self, token: str):
+        row = self._db.execute("SELECT persona FROM sessions WHERE token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        rows = self._db.execute("SELECT role, content FROM messages WHERE token = ? ORDER BY seq", (token,)).fetchall()
+        history = [{"role": role, "content": content} for role, content in rows]
+        return Session(token, row[0], history, persisted=len(history))
+
+    def save(self, session: Session, complete_turns_only: bool = True):
+        """
+        Appends history messages that aren't on disk yet. By default only complete turns
+        (ending in an assistant reply) are written, so an in-flight turn is never persisted half-done.
+        """
+        end = len(session.history)
+        if complete_turns_only:
+            while end > session.persisted and session.history[end - 1]["role"] != "assistant":
+                end -= 1
+        if end <= session.persisted:
+            return
+        new_rows = [(session.token, seq, message["role"], message["content"])
+                    for seq, message in enumerate(session.history[session.persisted:end], start=session.persisted)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)", new_rows)
+            self._db.execute("UPDATE sessions SET updated = ? WHERE token = ?", (time.time(), session.token))
+            self._db.commit()
+        session.persisted = end
+
+    def release(self, session: Session, owner: int = None):
+        """
+        Called when the socket closes, with the `owner` it was handed; the session stays resumable
+        until it is evicted. A socket whose session was taken over only saves, so its late release
+        doesn't mark the new holder disconnected.
+        """
+        with self._lock:
+            if owner is None or owner == session.owner:
+                session.connected = False
+                session.touch()
+        self.save(session)
+
+    def evict_idle(self) -> int:
+        """Drops disconnected sessions idle for longer than the TTL from memory (they stay on disk)."""
+        cutoff = time.monotonic() - self.idle_ttl_s
+        with self._lock:
+            idle = [s for s in self._active.values() if not s.connected and s.last_seen < cutoff]
+        for session in idle:
+            self.save(session)
+            with self._lock:
+                self._active.pop(session.token, None)
+        if idle:
+            logging.info(f"Evicted {len(idle)} idle session(s); {len(self._active)} still in memory.")
+        return len(idle)
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def close(self):
+        with self._lock:
+            for session in self._active.values():
+                session.connected = False
+        for session in list(self._active.values()):
+            self.save(session)
+        self._db.close()
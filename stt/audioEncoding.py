@@ -0,0 +1,78 @@
+# stt/audioEncoding.py
+
+import asyncio
+import io
+import logging
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+# codec -> (file extension, soundfile format, soundfile subtype)
+CODECS = {
+    "wav": ("wav", None, None),
+    "flac": ("flac", "FLAC", "PCM_16"),     # Lossless, typically ~2x smaller for speech
+    "opus": ("ogg", "OGG", "OPUS"),         # Lossy, ~10-20x smaller; needs libsndfile >= 1.0.29
+}
+
+
+class EncodedAudio:
+    """One utterance ready for upload. open() returns a fresh named file object, so retries and hedges can each read it."""
+    def __init__(self, data: bytes, codec: str, filename: str):
+        self.data = data
+        self.codec = codec
+        self.filename = filename
+
+    def open(self) -> io.BytesIO:
+        f = io.BytesIO(self.data)
+        f.name = self.filename  # Multipart uploads take the file name (and content type) from here
+        return f
+
+
+def encode_pcm(pcm: np.ndarray, sample_rate: int = 16000, codec: str = "wav") -> EncodedAudio:
+    """int16 mono PCM -> WAV, FLAC or Ogg/Opus bytes. FLAC and Opus need the optional `soundfile` package."""
+    extension, sf_format, sf_subtype = CODECS[codec]
+    buffer = io.BytesIO()
+    if sf_format is None:
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sample_rate)
+            wf.writeframes(pcm.astype(np.int16, copy=False).tobytes())
+    else:
+        import soundfile
+
+        soundfile.write(buffer, pcm, sample_rate, format=sf_format, subtype=sf_subtype)
+    return EncodedAudio(buffer.getvalue(), codec, f"utterance.{extension}")
+
+
+class UtteranceEncoder:
+    """
+    Encodes utterances for the STT upload off the event loop. libsndfile releases the GIL,
+    so a small thread pool is enough for FLAC; use_processes=True isolates heavier Opus encodes.
+    Falls back to WAV (with a warning) if the codec isn't available on this machine.
+    """
+    def __init__(self, codec: str = "wav", workers: int = 2, use_processes: bool = False):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown STT upload codec '{codec}' (expected one of {', '.join(CODECS)}).")
+        if codec != "wav":
+            try:
+                import soundfile
+
+                if CODECS[codec][2] not in soundfile.available_subtypes(CODECS[codec][1]):
+                    raise ImportError(f"libsndfile {soundfile.__libsndfile_version__} has no {codec} encoder")
+            except ImportError as e:
+                logging.warning(f"STT upload codec '{codec}' unavailable ({e}); uploading WAV.")
+                codec = "wav"
+        self.codec = codec
+        self._executor = None
+        if codec != "wav":
+            self._executor = ProcessPoolExecutor(workers) if use_processes else ThreadPoolExecutor(workers)
+
+    async def encode(self, pcm: np.ndarray, sample_rate: int = 16000) -> EncodedAudio:
+        if self._executor is None:
+            return encode_pcm(pcm, sample_rate, "wav")  # A WAV header is cheaper than a thread hop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, encode_pcm, pcm, sample_rate, self.codec)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -1,18 +1,51 @@
 import os
+from contextlib import nullcontext
+from functools import lru_cache
+import httpx
 from dotenv import load_dotenv
 from sarvamai import SarvamAI
 load_dotenv()
 
+SARVAM_API_URL = "https://api.sarvam.ai"
+KEEPALIVE_EXPIRY_S = 30  # httpx's default (5 s) would drop a warmed connection before the user finishes talking
 
-def transcribe_audio(audio_file):
+
+@lru_cache(maxsize=None)
+def _http_client() -> httpx.Client:
+    """One connection pool per process, shared by every transcription and by warm_up()."""
+    return httpx.Client(timeout=60, limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY_S))
+
+
+@lru_cache(maxsize=None)
+def _get_client(api_key: str) -> SarvamAI:
+    return SarvamAI(api_subscription_key=api_key, httpx_client=_http_client())
+
+
+def warm_up() -> bool:
+    """
+    Opens (or refreshes) the pooled HTTPS connection to Sarvam so DNS, TCP and TLS
+    are paid before the first utterance instead of by it. Any HTTP answer will do.
+    """
+    if not os.getenv("SARVAM_API_KEY"):
+        return False
+    try:
+        _http_client().head(SARVAM_API_URL, timeout=5)
+        return True
+    except httpx.HTTPError as e:
+        print(f"⚠️ Sarvam warm-up failed: {e}")
+        return False
+
+
+def transcribe_audio(audio_file, raise_errors=False):
     api_key = os.getenv("SARVAM_API_KEY")
     if not api_key:
         print("⚠️ SARVAM_API_KEY not found in environment variables.")
         return None
 
-    client = SarvamAI(api_subscription_key=api_key)
+    client = _get_client(api_key)
     try:
-        with open(audio_file, "rb") as f:
+        # Accepts a path or an open/in-memory WAV (e.g. recording.audioSources.to_wav()).
+        with (open(audio_file, "rb") if isinstance(audio_file, (str, os.PathLike)) else nullcontext(audio_file)) as f:
             response = client.speech_to_text.transcribe(
                 file=f,
                 model="saarika:v2",
@@ -22,6 +55,8 @@ def transcribe_audio(audio_file):
         print("📝 Transcript:", transcript)
         return transcript
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ Error during transcription: {e}")
         return None
 
@@ -0,0 +1,41 @@
+# tests/test_audioDuration.py
+
+import io
+
+import numpy as np
+import pytest
+
+from tts.audioDuration import Mp3Duration, OggOpusDuration, PcmDuration
+
+soundfile = pytest.importorskip("soundfile")
+
+
+def encoded(format: str, subtype: str, sample_rate: int, seconds: float = 2.75) -> bytes:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    buffer = io.BytesIO()
+    soundfile.write(buffer, 0.3 * np.sin(2 * np.pi * 220 * t), sample_rate, format=format, subtype=subtype)
+    return buffer.getvalue()
+
+
+def duration_in_chunks(counter, data: bytes, chunk: int) -> float:
+    for offset in range(0, len(data), chunk):
+        counter.feed(data[offset:offset + chunk])
+    return counter.seconds
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 27, 28, 4096, 1 << 20])
+def test_ogg_opus_duration_does_not_depend_on_chunking(chunk):
+    data = encoded("OGG", "OPUS", 48000)
+    assert duration_in_chunks(OggOpusDuration(), data, chunk) == pytest.approx(2.75, abs=1e-3)
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 417, 4096, 1 << 20])
+def test_mp3_duration_does_not_depend_on_chunking(chunk):
+    data = encoded("MP3", "MPEG_LAYER_III", 44100)
+    whole = duration_in_chunks(Mp3Duration(), data, len(data))
+    assert duration_in_chunks(Mp3Duration(), data, chunk) == whole
+    assert 2.75 <= whole < 2.9  # Frame headers include the encoder's padding
+
+
+def test_pcm_duration():
+    assert duration_in_chunks(PcmDuration(16000), bytes(32000 * 3 + 1), 333) == pytest.approx(3.0, abs=1e-4)
@@ -0,0 +1,28 @@
+# tests/test_resampler.py
+
+import numpy as np
+
+from audio.resampler import PolyphaseResampler
+from audio.uplink import UplinkFormat
+
+
+def test_empty_block_returns_empty_output():
+    resampler = PolyphaseResampler(48000, 16000)
+    assert resampler(np.zeros(0, dtype=np.float32)).dtype == np.float32
+    assert len(resampler(np.zeros(0, dtype=np.float32))) == 0
+    assert resampler(np.zeros(0, dtype=np.int16)).dtype == np.int16
+
+
+def test_empty_block_keeps_stream_state():
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(4800) * 3000).astype(np.int16)
+    whole = PolyphaseResampler(48000, 16000)(samples)
+    split = PolyphaseResampler(48000, 16000)
+    out = np.concatenate([split(samples[:2000]), split(samples[:0]), split(samples[2000:])])
+    np.testing.assert_array_equal(out, whole)
+
+
+def test_empty_audio_chunk_from_48k_client():
+    uplink = UplinkFormat.negotiate({"sample_rate": 48000, "encoding": "int16"}, 16000)
+    assert len(uplink.decode("")) == 0
+    assert len(UplinkFormat.negotiate({"sample_rate": 48000}, 16000).decode("")) == 0
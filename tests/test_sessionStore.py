@@ -0,0 +1,51 @@
+# tests/test_sessionStore.py
+
+import pytest
+
+from sessions.sessionStore import SQLiteSessionStore
+
+
+class FakePersona:
+    def __init__(self, name):
+        self.name = name
+
+    def system_message(self):
+        return {"role": "system", "content": f"You are {self.name}."}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl_s=0)
+    yield store
+    store.close()
+
+
+def test_reconnect_while_stale_takes_the_session_over(store):
+    taara = FakePersona("Taara")
+    session = store.create(taara)
+    stale_owner = session.owner
+    session.history += [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello!"}]
+
+    # The old socket is half-open and still holds the session when the client reconnects.
+    resumed = store.resume(session.token, taara)
+    assert resumed is session and resumed.history[-1]["content"] == "hello!"
+    new_owner = resumed.owner
+    assert new_owner != stale_owner
+
+    # The stale handler finally notices its socket is gone: the new holder stays connected.
+    store.release(session, stale_owner)
+    assert session.connected
+    assert store.evict_idle() == 0
+
+    store.release(session, new_owner)
+    assert not session.connected
+    assert store.evict_idle() == 1
+
+
+def test_wrong_persona_is_refused_and_not_cached(store):
+    session = store.create(FakePersona("Taara"))
+    store.release(session, session.owner)
+    store.evict_idle()
+    assert store.resume(session.token, FakePersona("Veer")) is None
+    assert store.active_count == 0
+    assert store.resume(session.token, FakePersona("Taara")).history[0]["content"] == "You are Taara."
@@ -0,0 +1,11 @@
+# tests/test_uplink.py
+
+import pytest
+
+from audio.uplink import DEFAULT_FRAME_MS, UplinkFormat, VAD_WINDOW_SIZE
+
+
+@pytest.mark.parametrize("frame_ms", ["x", None, [64], {}])
+def test_bad_frame_ms_falls_back_to_default(frame_ms):
+    uplink = UplinkFormat.negotiate({"frame_ms": frame_ms}, 16000)
+    assert uplink.frame_samples == int(DEFAULT_FRAME_MS * 16000 / 1000) // VAD_WINDOW_SIZE * VAD_WINDOW_SIZE
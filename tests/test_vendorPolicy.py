@@ -0,0 +1,68 @@
+# tests/test_vendorPolicy.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from resilience import vendorPolicy
+from resilience.vendorPolicy import CallPolicy, CircuitBreaker, VendorUnavailable, call_with_policy
+
+
+def opened_breaker(monkeypatch, now):
+    monkeypatch.setattr(vendorPolicy, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_after_s=10)
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] += 10
+    return breaker
+
+
+def test_half_open_lets_one_probe_through(monkeypatch):
+    now = [100.0]
+    breaker = opened_breaker(monkeypatch, now)
+    assert breaker.allow()
+    assert not breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit(monkeypatch):
+    now = [100.0]
+    breaker = opened_breaker(monkeypatch, now)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] += 10
+    assert breaker.allow()
+
+
+def test_abandoned_probe_is_replaced_after_reset(monkeypatch):
+    now = [100.0]
+    breaker = opened_breaker(monkeypatch, now)
+    assert breaker.allow()
+    now[0] += 10
+    assert breaker.allow()
+
+
+def test_waiting_callers_are_refused_while_the_probe_runs(monkeypatch):
+    now = [100.0]
+    breaker = opened_breaker(monkeypatch, now)
+    policy = CallPolicy(deadline_s=1.0, retries=0)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "ok"
+
+        probe_call = asyncio.create_task(call_with_policy("test", probe, policy, breaker))
+        await asyncio.sleep(0)
+        with pytest.raises(VendorUnavailable):
+            await call_with_policy("test", probe, policy, breaker)
+        release.set()
+        assert await probe_call == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(main())
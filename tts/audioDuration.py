@@ -0,0 +1,139 @@
+# tts/audioDuration.py
+
+import struct
+
+# MPEG audio frame header tables: index by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5) and layer bits.
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MP3_BITRATES_KBPS = {
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),   # MPEG-1 Layer I
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),      # MPEG-1 Layer II
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),       # MPEG-1 Layer III
+    "lsf_1": (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),     # MPEG-2/2.5 Layer I
+    "lsf_23": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),         # MPEG-2/2.5 Layer II & III
+}
+OPUS_GRANULE_RATE = 48000
+
+
+class Mp3Duration:
+    """
+    Counts playable seconds in an MP3 byte stream by walking MPEG frame headers (no decoding).
+    Frames can straddle feed() calls; a leading ID3v2 tag and junk between frames are skipped.
+    """
+    def __init__(self):
+        self.seconds = 0.0
+        self._pending = b""   # Bytes that may hold the start of the next header
+        self._skip = 0        # Bytes of the current frame (or tag) still to come
+
+    def feed(self, chunk: bytes) -> float:
+        before = self.seconds
+        if self._skip >= len(chunk):
+            self._skip -= len(chunk)
+            return 0.0
+        data = self._pending + chunk[self._skip:]
+        self._skip, position = 0, 0
+        while position + 10 <= len(data):
+            if data[position:position + 3] == b"ID3":
+                size = (data[position + 6] << 21) | (data[position + 7] << 14) | (data[position + 8] << 7) | data[position + 9]
+                position += 10 + size
+                continue
+            frame = self._frame(data, position)
+            if frame is None:
+                position += 1  # Not a header: resync on the next byte
+                continue
+            length, samples, rate = frame
+            self.seconds += samples / rate
+            position += length
+        if position > len(data):
+            self._skip, self._pending = position - len(data), b""
+        else:
+            self._pending = data[position:]
+        return self.seconds - before
+
+    @staticmethod
+    def _frame(data: bytes, i: int):
+        """(frame bytes, samples, sample rate) for a valid header at data[i], else None."""
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            return None
+        version, layer = (data[i + 1] >> 3) & 0x03, (data[i + 1] >> 1) & 0x03
+        bitrate_index, rate_index, padding = data[i + 2] >> 4, (data[i + 2] >> 2) & 0x03, (data[i + 2] >> 1) & 0x01
+        if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+        rate = MP3_SAMPLE_RATES[version][rate_index]
+        table = MP3_BITRATES_KBPS[(version, layer)] if version == 3 else MP3_BITRATES_KBPS["lsf_1" if layer == 3 else "lsf_23"]
+        bitrate = table[bitrate_index] * 1000
+        if layer == 3:  # Layer I
+            return (12 * bitrate // rate + padding) * 4, 384, rate
+        if layer == 1 and version != 3:  # Layer III, MPEG-2/2.5
+            return 72 * bitrate // rate + padding, 576, rate
+        return 144 * bitrate // rate + padding, 1152, rate
+
+
+class PcmDuration:
+    """Raw 16-bit mono PCM: duration is just length."""
+    def __init__(self, sample_rate: int):
+        self.bytes_per_second = 2 * sample_rate
+        self.seconds = 0.0
+
+    def feed(self, chunk: bytes) -> float:
+        added = len(chunk) / self.bytes_per_second
+        self.seconds += added
+        return added
+
+
+class OggOpusDuration:
+    """
+    Ogg/Opus: each page header carries the granule position (48 kHz samples decoded so far),
+    so duration is the latest granule minus the pre-skip from the OpusHead packet.
+    Only page headers are parsed; payloads are skipped.
+    """
+    def __init__(self):
+        self.seconds = 0.0
+        self._pending = b""
+        self._skip = 0
+        self._pre_skip = None
+
+    def feed(self, chunk: bytes) -> float:
+        before = self.seconds
+        if self._skip >= len(chunk):
+            self._skip -= len(chunk)
+            return 0.0
+        data = self._pending + chunk[self._skip:]
+        self._skip, position = 0, 0
+        while position + 27 <= len(data):
+            if data[position:position + 4] != b"OggS":
+                position += 1
+                continue
+            segments = data[position + 26]
+            if position + 27 + segments > len(data):
+                break  # Segment table not here yet
+            body = sum(data[position + 27:position + 27 + segments])
+            start = position + 27 + segments
+            if self._pre_skip is None:
+                if start + min(body, 12) > len(data):
+                    break  # Wait for the start of the body: it may be the OpusHead with the pre-skip
+                if data[start:start + 8] == b"OpusHead":
+                    self._pre_skip = struct.unpack_from("<H", data, start + 10)[0]
+            granule = struct.unpack_from("<q", data, position + 6)[0]
+            if granule > 0:
+                self.seconds = max(self.seconds, (granule - (self._pre_skip or 0)) / OPUS_GRANULE_RATE)
+            position = start + body
+        if position > len(data):
+            self._skip, self._pending = position - len(data), b""
+        else:
+            self._pending = data[position:]
+        return self.seconds - before
+
+
+def duration_counter(output_format: str = None):
+    """
+    Counter for an ElevenLabs output_format ("mp3_44100_128", "pcm_16000", "opus_48000_64", ...).
+    None means the API default, MP3.
+    """
+    codec, _, rest = (output_format or "mp3_44100_128").partition("_")
+    if codec == "pcm":
+        return PcmDuration(int(rest.split("_")[0]))
+    if codec == "opus":
+        return OggOpusDuration()
+    if codec == "mp3":
+        return Mp3Duration()
+    raise ValueError(f"No duration counter for output format '{output_format}'.")
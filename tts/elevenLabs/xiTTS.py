@@ -1,38 +1,65 @@
 # tts/elevenLabs/xiTTS.py
 
 import os
+from functools import lru_cache
+import httpx
 from dotenv import load_dotenv
 from elevenlabs.client import AsyncElevenLabs
 
 load_dotenv()
 
-async def stream_tts_audio(text: str, character_name: str):
+ELEVENLABS_API_URL = "https://api.elevenlabs.io"
+KEEPALIVE_EXPIRY_S = 30  # httpx's default (5 s) would drop a warmed connection before the first reply
+
+@lru_cache(maxsize=None)
+def _http_client() -> httpx.AsyncClient:
+    """One connection pool per process: sentences and calls reuse the same HTTPS connections."""
+    return httpx.AsyncClient(timeout=60, limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY_S))
+
+@lru_cache(maxsize=None)
+def _get_client(api_key: str) -> AsyncElevenLabs:
+    return AsyncElevenLabs(api_key=api_key, httpx_client=_http_client())
+
+async def warm_up() -> bool:
+    """Opens (or refreshes) the pooled connection to ElevenLabs ahead of the first sentence."""
+    if not os.getenv("ELEVENLABS_API_KEY"):
+        return False
+    try:
+        await _http_client().head(ELEVENLABS_API_URL, timeout=5)
+        return True
+    except httpx.HTTPError as e:
+        print(f"⚠️ ElevenLabs warm-up failed: {e}")
+        return False
+
+async def stream_tts_audio(text: str, voice_id: str, model_id: str = "eleven_multilingual_v2",
+                           raise_errors: bool = False, output_format: str = None):
     """
-    Streams audio from ElevenLabs using the voice corresponding to the character_name.
+    Streams audio from ElevenLabs for the given voice. The voice and model come from
+    the caller's persona, resolved once per connection rather than per sentence.
+    output_format (e.g. "pcm_16000") overrides ElevenLabs' default MP3 stream.
+    With raise_errors=True, failures propagate to the caller's resilience layer.
     """
     api_key = os.getenv("ELEVENLABS_API_KEY")
     if not api_key:
         print("⚠️ ELEVENLABS_API_KEY not found.")
         return
 
-    if character_name == "Veer":
-        voice_id = os.getenv("xiVEER")
-    else:
-        voice_id = os.getenv("xiTAARA")
-    
     if not voice_id:
-        print(f"⚠️ Voice ID for {character_name} not found in .env file.")
+        print("⚠️ No voice ID given for TTS.")
         return
 
-    client = AsyncElevenLabs(api_key=api_key)
+    client = _get_client(api_key)
     try:
         audio_stream = client.text_to_speech.stream(
             text=text,
             voice_id=voice_id,
-            model_id="eleven_multilingual_v2"
+            model_id=model_id,
+            **({"output_format": output_format} if output_format else {})
         )
         async for chunk in audio_stream:
             yield chunk
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ Error during ElevenLabs TTS streaming: {e}")
\ No newline at end of file
@@ -0,0 +1,234 @@
+# vad/streamingVAD.py
+
+import copy
+import os
+
+import numpy as np
+
+SILERO_REPO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "vad_model", "silero-vad-master")
+SILERO_DATA_DIR = os.path.join(SILERO_REPO_DIR, "src", "silero_vad", "data")
+DEFAULT_ONNX_MODEL = os.path.join(SILERO_DATA_DIR, "silero_vad.onnx")
+SAMPLE_RATE = 16000
+WINDOW_SIZE = 512
+CONTEXT_SIZE = 64
+
+# ==============================================================================
+# 1. MODELS (shared per process) & STREAMS (one per connection)
+# ==============================================================================
+
+class OnnxVADModel:
+    """
+    Silero VAD on onnxruntime + NumPy only: no torch, no torchaudio.
+    The InferenceSession is shared; recurrent state lives in per-connection streams,
+    so concurrent callers never overwrite each other's state.
+    """
+    def __init__(self, path: str = DEFAULT_ONNX_MODEL, use_io_binding: bool = True):
+        import onnxruntime
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"], sess_options=opts)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        self.use_io_binding = use_io_binding
+
+    def new_stream(self):
+        return OnnxVADStream(self)
+
+
+class OnnxVADStream:
+    """
+    Allocation-free call path: input (context + window), state and output live in
+    buffers allocated once per stream. The window is copied into place, the context
+    is shifted in place, and ORT reads/writes those buffers directly through two
+    IO bindings that ping-pong between a pair of state buffers (ORT must not read
+    and write the same state tensor in one run). Shape/dtype checks run on the first call only.
+    """
+    def __init__(self, model: OnnxVADModel):
+        self.model = model
+        self._input = np.zeros((1, CONTEXT_SIZE + WINDOW_SIZE), dtype=np.float32)
+        self._states = (np.zeros((2, 1, 128), dtype=np.float32), np.zeros((2, 1, 128), dtype=np.float32))
+        self._output = np.zeros((1, 1), dtype=np.float32)
+        self._sr = np.array(SAMPLE_RATE, dtype=np.int64)
+        self._validated = False
+        if model.use_io_binding:
+            self._bindings = (self._bind(self._states[0], self._states[1]), self._bind(self._states[1], self._states[0]))
+        else:
+            # Fallback: one reused feed dict; only the returned state array is new per call.
+            self._feeds = {"input": self._input, "state": self._states[0]}
+            if "sr" in model.input_names: self._feeds["sr"] = self._sr
+        self.reset_states()
+
+    def _bind(self, state_in: np.ndarray, state_out: np.ndarray):
+        binding = self.model.session.io_binding()
+        binding.bind_cpu_input("input", self._input)
+        binding.bind_cpu_input("state", state_in)
+        if "sr" in self.model.input_names: binding.bind_cpu_input("sr", self._sr)
+        prob_name, state_name = self.model.output_names
+        binding.bind_output(prob_name, "cpu", 0, np.float32, list(self._output.shape), self._output.ctypes.data)
+        binding.bind_output(state_name, "cpu", 0, np.float32, list(state_out.shape), state_out.ctypes.data)
+        return binding
+
+    def reset_states(self):
+        self._input.fill(0.0)
+        for state in self._states: state.fill(0.0)
+        self._current = 0  # Index of the state buffer holding the latest state
+        if not self.model.use_io_binding: self._feeds["state"] = self._states[0]
+
+    def _validate(self, window: np.ndarray):
+        if window.ndim != 1 or window.shape[0] != WINDOW_SIZE:
+            raise ValueError(f"Expected a 1-D window of {WINDOW_SIZE} samples, got shape {window.shape}.")
+        if window.dtype != np.float32:
+            raise ValueError(f"Expected float32 samples, got {window.dtype}.")
+        self._validated = True
+
+    def __call__(self, window: np.ndarray) -> float:
+        """Speech probability for one 512-sample float32 window at 16 kHz."""
+        if not self._validated: self._validate(window)
+        self._input[0, CONTEXT_SIZE:] = window
+        if self.model.use_io_binding:
+            self.model.session.run_with_iobinding(self._bindings[self._current])
+            self._current ^= 1
+        else:
+            out, self._feeds["state"] = self.model.session.run(None, self._feeds)
+            self._output[0, 0] = out[0, 0]
+        # The last 64 samples of this window become the next call's context.
+        self._input[0, :CONTEXT_SIZE] = self._input[0, WINDOW_SIZE:]
+        return float(self._output[0, 0])
+
+
+class TorchVADModel:
+    """The original TorchScript model from the local silero repo; torch is imported only for this backend."""
+    def __init__(self, repo_dir: str = SILERO_REPO_DIR):
+        import torch
+
+        self.torch = torch
+        self.model, _ = torch.hub.load(repo_or_dir=repo_dir, model="silero_vad", source="local", trust_repo=True)
+
+    def new_stream(self):
+        # The JIT model keeps its recurrent state internally, so each connection needs its own copy.
+        return TorchVADStream(copy.deepcopy(self.model), self.torch)
+
+
+class TorchVADStream:
+    def __init__(self, model, torch):
+        self.model = model
+        self.torch = torch
+
+    def reset_states(self):
+        self.model.reset_states()
+
+    def __call__(self, window: np.ndarray) -> float:
+        with self.torch.no_grad():
+            return self.model(self.torch.from_numpy(window), SAMPLE_RATE).item()
+
+
+def load_vad_model(backend: str = "onnx", onnx_path: str = None):
+    """
+    backend='onnx' needs only onnxruntime + NumPy (`onnx_path` picks another export, e.g. a
+    tuned, 16k-only or quantized model); backend='torch' loads the JIT model via torch.hub.
+    """
+    if backend == "onnx":
+        return OnnxVADModel(onnx_path or DEFAULT_ONNX_MODEL)
+    if backend == "torch":
+        return TorchVADModel()
+    raise ValueError(f"Unknown VAD backend '{backend}' (expected 'onnx' or 'torch').")
+
+# ==============================================================================
+# 2. STREAMING ENDPOINTING
+# ==============================================================================
+
+class VADBatch:
+    """
+    Result of StreamingVADIterator.process(): the complete windows consumed by the call
+    (a (n, 512) view in the caller's dtype), one speech probability per window and the
+    start/end events as (kind, window_index, sample) tuples, `sample` being the padded
+    boundary as an absolute offset into the stream.
+    """
+    def __init__(self, windows: np.ndarray, probs: np.ndarray, events: list):
+        self.windows = windows
+        self.probs = probs
+        self.events = events
+
+
+class StreamingVADIterator:
+    """
+    NumPy port of silero's VADIterator (same state machine and return values),
+    driven by a per-connection stream instead of a shared stateful model.
+    """
+    def __init__(self, stream, threshold: float = 0.5, sampling_rate: int = SAMPLE_RATE,
+                 min_silence_duration_ms: int = 100, speech_pad_ms: int = 30):
+        if sampling_rate != SAMPLE_RATE:
+            raise ValueError("StreamingVADIterator only supports 16000 Hz audio.")
+        self.stream = stream
+        self.threshold = threshold
+        self.sampling_rate = sampling_rate
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+        self._scratch = np.zeros(WINDOW_SIZE, dtype=np.float32)  # int16 windows are scaled into this
+        self.reset_states()
+
+    def reset_states(self):
+        self.stream.reset_states()
+        self.triggered = False
+        self.temp_end = 0
+        self.current_sample = 0
+        self._leftover = None
+
+    def _advance(self, speech_prob: float, window_size_samples: int):
+        """One step of the endpointing state machine; returns ('start' | 'end', sample) or None."""
+        self.current_sample += window_size_samples
+
+        if (speech_prob >= self.threshold) and self.temp_end:
+            self.temp_end = 0
+
+        if (speech_prob >= self.threshold) and not self.triggered:
+            self.triggered = True
+            return 'start', int(max(0, self.current_sample - self.speech_pad_samples - window_size_samples))
+
+        if (speech_prob < self.threshold - 0.15) and self.triggered:
+            if not self.temp_end:
+                self.temp_end = self.current_sample
+            if self.current_sample - self.temp_end < self.min_silence_samples:
+                return None
+            speech_end = self.temp_end + self.speech_pad_samples - window_size_samples
+            self.temp_end = 0
+            self.triggered = False
+            return 'end', int(speech_end)
+
+        return None
+
+    def __call__(self, x: np.ndarray, return_seconds: bool = False, time_resolution: int = 1):
+        """x: one 512-sample float32 window. Returns {'start': ...}, {'end': ...} or None."""
+        event = self._advance(self.stream(x), len(x))
+        if event is None:
+            return None
+        kind, sample = event
+        return {kind: sample if not return_seconds else round(sample / self.sampling_rate, time_resolution)}
+
+    def process(self, buffer: np.ndarray) -> VADBatch:
+        """
+        Runs every complete 512-sample window in `buffer` (float32 in [-1, 1] or int16 PCM)
+        in one call. Samples that don't fill a window are kept and prepended to the next buffer.
+        """
+        if self._leftover is not None and len(self._leftover):
+            buffer = np.concatenate([self._leftover, buffer])
+        count = len(buffer) // WINDOW_SIZE
+        windows = buffer[:count * WINDOW_SIZE].reshape(count, WINDOW_SIZE)
+        self._leftover = buffer[count * WINDOW_SIZE:].copy()
+
+        probs = np.empty(count, dtype=np.float32)
+        events = []
+        is_pcm16 = buffer.dtype == np.int16
+        for i in range(count):
+            if is_pcm16:
+                np.multiply(windows[i], 1.0 / 32768.0, out=self._scratch, casting="unsafe")
+                probs[i] = self.stream(self._scratch)
+            else:
+                probs[i] = self.stream(windows[i])
+            event = self._advance(probs[i], WINDOW_SIZE)
+            if event is not None:
+                events.append((event[0], i, event[1]))
+        return VADBatch(windows, probs, events)
@@ -0,0 +1,43 @@
+# vad/utteranceGate.py
+
+import numpy as np
+
+from vad.streamingVAD import SAMPLE_RATE, WINDOW_SIZE
+
+
+class UtteranceGate:
+    """
+    Last check before an utterance goes to STT. The VAD iterator has no minimum speech
+    duration, so coughs, clicks and short blips would otherwise each cost an STT round trip
+    (and an LLM + TTS one when the transcript isn't empty). Statistics are taken over the
+    active span, from the first to the last window at or above the threshold, so the
+    trailing end-of-turn silence doesn't dilute them. A limit of 0 disables that check.
+    """
+    def __init__(self, threshold: float = 0.5, min_voiced_ms: float = 0, min_mean_prob: float = 0.0,
+                 min_rms: float = 0.0):
+        self.threshold = threshold
+        self.min_voiced_ms = min_voiced_ms
+        self.min_mean_prob = min_mean_prob
+        self.min_rms = min_rms
+
+    @classmethod
+    def from_settings(cls, vad):
+        """From a persona's VADSettings."""
+        return cls(vad.threshold, vad.min_voiced_ms, vad.min_mean_prob, vad.min_rms)
+
+    def check(self, pcm: np.ndarray, probs: np.ndarray):
+        """
+        pcm: the utterance as int16 windows; probs: one speech probability per window.
+        Returns None to accept, or the rejection reason: 'too_short', 'low_probability' or 'too_quiet'.
+        """
+        voiced = np.flatnonzero(probs >= self.threshold)
+        if not len(voiced) or len(voiced) * WINDOW_SIZE * 1000 / SAMPLE_RATE < self.min_voiced_ms:
+            return "too_short"
+        first, last = voiced[0], voiced[-1] + 1
+        if self.min_mean_prob and float(probs[first:last].mean()) < self.min_mean_prob:
+            return "low_probability"
+        if self.min_rms:
+            active = pcm[first * WINDOW_SIZE:last * WINDOW_SIZE].astype(np.float32)
+            if float(np.sqrt(np.dot(active, active) / max(len(active), 1))) < self.min_rms:
+                return "too_quiet"
+        return None
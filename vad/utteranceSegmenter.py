@@ -0,0 +1,63 @@
+# vad/utteranceSegmenter.py
+
+import numpy as np
+
+from vad.streamingVAD import SAMPLE_RATE, WINDOW_SIZE
+
+MIN_SILENCE_AT_MAX_MS = 98  # Same rule as get_speech_timestamps: only cut in a pause of at least ~100 ms
+
+
+class UtteranceSegmenter:
+    """
+    Bounded buffer for the utterance in progress, the streaming analogue of
+    get_speech_timestamps' max_speech_duration_s. Once the open segment reaches
+    `max_utterance_s` it is cut in the last pause of >= ~100 ms below the VAD's exit
+    threshold (in the middle of it), or hard at the limit if there was none, and handed
+    back so it can be transcribed while the user keeps talking. Pauses in the first half of
+    the segment are ignored, so no segment is shorter than half the limit. Segments are
+    contiguous: concatenated, they are exactly the audio that was appended.
+    max_utterance_s=0 disables cutting.
+    """
+    def __init__(self, max_utterance_s: float = 0, threshold: float = 0.5):
+        self.max_windows = int(max_utterance_s * SAMPLE_RATE / WINDOW_SIZE)
+        self.exit_threshold = threshold - 0.15
+        self.min_pause_windows = int(np.ceil(MIN_SILENCE_AT_MAX_MS * SAMPLE_RATE / 1000 / WINDOW_SIZE))
+        self.reset()
+
+    def reset(self):
+        self._pcm = []
+        self._probs = []
+        self._windows = 0
+
+    def __len__(self):
+        return self._windows
+
+    def append(self, pcm: np.ndarray, probs: np.ndarray) -> list:
+        """Adds whole windows (int16, len(probs) * 512 samples); returns the segments this closed as [(pcm, probs)]."""
+        self._pcm.append(pcm)
+        self._probs.append(probs)
+        self._windows += len(probs)
+        closed = []
+        while self.max_windows and self._windows >= self.max_windows:
+            pcm, probs = np.concatenate(self._pcm), np.concatenate(self._probs)
+            cut = self._cut_point(probs[:self.max_windows])
+            closed.append((pcm[:cut * WINDOW_SIZE], probs[:cut]))
+            self._pcm, self._probs = [pcm[cut * WINDOW_SIZE:]], [probs[cut:]]
+            self._windows -= cut
+        return closed
+
+    def finish(self):
+        """Closes the utterance: returns the last (pcm, probs) segment, or None if nothing is left."""
+        pcm = np.concatenate(self._pcm) if self._windows else None
+        probs = np.concatenate(self._probs) if self._windows else None
+        self.reset()
+        return None if pcm is None else (pcm, probs)
+
+    def _cut_point(self, probs: np.ndarray) -> int:
+        """Window index to cut before: the middle of the last long enough pause, else the limit."""
+        quiet = np.concatenate([[False], probs < self.exit_threshold, [False]])
+        edges = np.flatnonzero(np.diff(quiet.astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+        cuts = (starts + ends) // 2
+        usable = np.flatnonzero((ends - starts >= self.min_pause_windows) & (cuts >= len(probs) // 2))
+        return int(cuts[usable[-1]]) if len(usable) else len(probs)
@@ -0,0 +1,215 @@
+from utils import SileroVadDataset, init_jit_model
+from omegaconf import OmegaConf
+from tqdm import tqdm
+import torch.nn as nn
+import numpy as np
+import onnxruntime
+import tempfile
+import inspect
+import torch
+import time
+import os
+torch.set_num_threads(1)
+
+CONTEXT_SIZES = {16000: 64, 8000: 32}  # constant, do not change
+NUM_SAMPLES = {16000: 512, 8000: 256}  # constant, do not change
+# Скриптованные обёртки экспортируются TorchScript экспортёром; в torch >= 2.5 его нужно выбрать явно
+TORCHSCRIPT_EXPORTER = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+
+
+class VadOnnx16k(nn.Module):
+    """Одна 16к голова: (контекст + окно, состояние) -> (вероятность, новое состояние), как silero_vad_16k_op15.onnx"""
+
+    def __init__(self, jit_model):
+        super().__init__()
+        self.stft = jit_model._model.stft
+        self.encoder = jit_model._model.encoder
+        self.decoder = jit_model._model.decoder
+
+    def forward(self, input, state, sr):
+        out, state = self.decoder(self.encoder(self.stft(input)), state)
+        return out.squeeze(-1), state
+
+
+class VadOnnxFull(nn.Module):
+    """Обе головы с выбором по sr внутри графа (If), интерфейс как у silero_vad.onnx"""
+
+    def __init__(self, jit_model):
+        super().__init__()
+        self.stft_16k = jit_model._model.stft
+        self.encoder_16k = jit_model._model.encoder
+        self.decoder_16k = jit_model._model.decoder
+        self.stft_8k = jit_model._model_8k.stft
+        self.encoder_8k = jit_model._model_8k.encoder
+        self.decoder_8k = jit_model._model_8k.decoder
+
+    def forward(self, input, state, sr):
+        if bool(sr == 16000):
+            out, state = self.decoder_16k(self.encoder_16k(self.stft_16k(input)), state)
+        else:
+            out, state = self.decoder_8k(self.encoder_8k(self.stft_8k(input)), state)
+        return out.squeeze(-1), state
+
+
+def export_fp32(jit_model, path, full=True, opset=16):
+    # Обёртки делят stft/encoder/decoder с jit моделью, а export восстанавливает режим обёртки,
+    # поэтому она должна быть в eval, иначе в jit модели включится dropout декодера.
+    # Обе обёртки скриптуются: трассировка stft падает в legacy экспортёре.
+    module = torch.jit.script((VadOnnxFull if full else VadOnnx16k)(jit_model).eval())
+    input = torch.zeros(1, CONTEXT_SIZES[16000] + NUM_SAMPLES[16000])
+    state = torch.zeros(2, 1, 128)
+    sr = torch.tensor(16000, dtype=torch.int64)
+    torch.onnx.export(module, (input, state, sr), path,
+                      input_names=['input', 'state', 'sr'],
+                      output_names=['output', 'stateN'],
+                      dynamic_axes={'input': {0: 'batch', 1: 'sequence'},
+                                    'state': {1: 'batch'},
+                                    'output': {0: 'batch'},
+                                    'stateN': {1: 'batch'}},
+                      opset_version=opset,
+                      do_constant_folding=True,
+                      **TORCHSCRIPT_EXPORTER)
+
+
+def quantize_int8(src, dst):
+    """Динамическое int8 квантование весов (Conv, MatMul, LSTM), активации остаются float"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+
+def convert_fp16(src, dst):
+    """Веса и вычисления во float16, вход и выход во float32, как у silero_vad_half.onnx"""
+    import onnx
+    from onnxconverter_common import float16
+    model = float16.convert_float_to_float16(onnx.load(src), keep_io_types=True)
+    onnx.save(model, dst)
+
+
+def export_variants(config, jit_model):
+    """Экспортирует варианты из `onnx_variants`, возвращает {имя: путь}"""
+    os.makedirs(config.onnx_export_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(config.model_save_path))[0]
+    opset = config.onnx_opset
+    paths = {'full': os.path.join(config.onnx_export_dir, f'{name}_op{opset}.onnx'),
+             '16k': os.path.join(config.onnx_export_dir, f'{name}_16k_op{opset}.onnx'),
+             '16k_int8': os.path.join(config.onnx_export_dir, f'{name}_16k_op{opset}_int8.onnx'),
+             '16k_fp16': os.path.join(config.onnx_export_dir, f'{name}_16k_op{opset}_half.onnx')}
+    exported = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # int8/fp16 всегда строятся из свежего экспорта, а не из 16k файла, оставшегося от другой модели
+        base = os.path.join(tmp_dir, '16k_base.onnx')
+        for variant in config.onnx_variants:
+            print(f'Exporting {variant} -> {paths[variant]}')
+            if variant == 'full':
+                export_fp32(jit_model, paths[variant], full=True, opset=opset)
+            elif variant == '16k':
+                export_fp32(jit_model, paths[variant], full=False, opset=opset)
+            else:
+                if not os.path.exists(base):
+                    export_fp32(jit_model, base, full=False, opset=opset)
+                (quantize_int8 if variant == '16k_int8' else convert_fp16)(base, paths[variant])
+            exported[variant] = paths[variant]
+    return exported
+
+
+class OnnxStream:
+    """Покадровый прогон ONNX модели с контекстом и состоянием, как OnnxWrapper из utils_vad"""
+
+    def __init__(self, path, sr=16000):
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.sr = sr
+        self.reset_states()
+
+    def reset_states(self):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, CONTEXT_SIZES[self.sr]), dtype=np.float32)
+
+    def __call__(self, chunk):
+        x = np.concatenate([self.context, chunk.reshape(1, -1)], axis=1)
+        feeds = {'input': x, 'state': self.state}
+        if 'sr' in self.input_names:
+            feeds['sr'] = np.array(self.sr, dtype=np.int64)
+        out, self.state = self.session.run(None, feeds)
+        self.context = x[:, -CONTEXT_SIZES[self.sr]:]
+        return float(out[0, 0])
+
+
+def jit_probs(jit_model, wav, sr):
+    jit_model.reset_states()
+    num_samples = NUM_SAMPLES[sr]
+    with torch.no_grad():
+        return np.array([jit_model(torch.from_numpy(wav[i:i + num_samples]), sr).item()
+                         for i in range(0, len(wav) - num_samples + 1, num_samples)])
+
+
+def onnx_probs(stream, wav):
+    stream.reset_states()
+    num_samples = NUM_SAMPLES[stream.sr]
+    timings = []
+    probs = []
+    for i in range(0, len(wav) - num_samples + 1, num_samples):
+        started = time.perf_counter()
+        probs.append(stream(wav[i:i + num_samples]))
+        timings.append(time.perf_counter() - started)
+    return np.array(probs), timings
+
+
+def check_variants(config, jit_model, exported: dict):
+    """
+    Сравнивает каждый вариант с jit моделью на первых `onnx_parity_files` аудио валидационной
+    выборки: максимальное и среднее расхождение вероятностей, доля окон с другим решением на
+    пороге 0.5, и время на одно окно (p50/p99) в одном потоке.
+    """
+    dataset = SileroVadDataset(config, mode='val')
+    wavs = [dataset.load_speech_sample(idx)[0].astype(np.float32)
+            for idx in range(min(config.onnx_parity_files, len(dataset)))]
+    results = {}
+    for variant, path in exported.items():
+        rates = [16000, 8000] if variant == 'full' else [16000]
+        for sr in rates:
+            stream = OnnxStream(path, sr)
+            diffs, flips, timings, windows = [], 0, [], 0
+            for wav in tqdm(wavs, desc=f'{variant} @ {sr}'):
+                if sr == 8000:
+                    wav = wav[::2].copy()  # для сравнения достаточно одинакового входа у обеих моделей
+                reference = jit_probs(jit_model, wav, sr)
+                probs, times = onnx_probs(stream, wav)
+                diffs.append(np.abs(probs - reference))
+                flips += int(((probs >= 0.5) != (reference >= 0.5)).sum())
+                windows += len(probs)
+                timings.extend(times)
+            diffs = np.concatenate(diffs)
+            # fp32 варианты должны совпадать с jit почти точно, для int8/fp16 проверяется среднее расхождение
+            exact = variant in ['full', '16k']
+            deviation = diffs.max() if exact else diffs.mean()
+            tolerance = config.onnx_parity_tolerance if exact else config.onnx_quantized_tolerance
+            results[(variant, sr)] = {'max_diff': float(diffs.max()),
+                                      'mean_diff': float(diffs.mean()),
+                                      'flip_rate': flips / max(windows, 1),
+                                      'p50_us': float(np.percentile(timings, 50) * 1e6),
+                                      'p99_us': float(np.percentile(timings, 99) * 1e6),
+                                      'size_mb': os.path.getsize(path) / 2 ** 20,
+                                      'ok': bool(deviation <= tolerance)}
+    return results
+
+
+if __name__ == '__main__':
+    config = OmegaConf.load('config.yml')
+    print(f'Loading tuned model from {config.model_save_path}')
+    model = init_jit_model(config.model_save_path, device='cpu')
+
+    exported = export_variants(config, model)
+    model.eval()
+    results = check_variants(config, model, exported)
+
+    print(f'\n{"variant":>10} {"sr":>6} | {"size MB":>7} {"p50 us":>7} {"p99 us":>7} | {"max diff":>9} {"mean diff":>9} {"flips %":>7}')
+    for (variant, sr), r in results.items():
+        print(f'{variant:>10} {sr:>6} | {r["size_mb"]:7.2f} {r["p50_us"]:7.0f} {r["p99_us"]:7.0f} | '
+              f'{r["max_diff"]:9.5f} {r["mean_diff"]:9.5f} {100 * r["flip_rate"]:7.2f} {"" if r["ok"] else "  <- PARITY FAILED"}')
+    if not all(r['ok'] for r in results.values()):
+        raise SystemExit('Some variants differ from the jit model by more than the configured tolerance')
+    print('Done')
@@ -0,0 +1,229 @@
+from utils import SileroVadDataset, AverageMeter, build_roc_meter, init_jit_model
+from shards import ShardWriter, ShardReader
+from torch.utils.data import Dataset
+from omegaconf import OmegaConf
+from tqdm import tqdm
+import numpy as np
+import torchaudio
+import random
+import torch
+import os
+import gc
+
+FEATURE_DIM = 128  # размер выхода энкодера Silero-VAD
+ENCODER_BATCH = 4096  # окон за один прогон stft+encoder при подсчете кэша
+
+
+def cache_settings(config, mode):
+    """Параметры, от которых зависит содержимое кэша: если они поменялись, кэш пересчитывается."""
+    return {'mode': mode,
+            'tune_8k': bool(config.tune_8k),
+            'noise_loss': float(config.noise_loss),
+            'max_train_length_sec': config.max_train_length_sec if mode == 'train' else None,
+            'aug_copies': int(config.feature_cache_aug_copies) if mode == 'train' else 0,
+            'aug_prob': float(config.aug_prob) if mode == 'train' else None,
+            'fp16': bool(config.feature_cache_fp16),
+            'dataset_path': os.path.abspath(config.train_dataset_path if mode == 'train' else config.val_dataset_path),
+            'jit_model_path': config.jit_model_path}
+
+
+def cache_dir(config, mode):
+    return os.path.join(config.feature_cache_dir, '8k' if config.tune_8k else '16k', mode)
+
+
+def cache_is_valid(config, mode):
+    path = cache_dir(config, mode)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return False
+    return ShardReader(path).meta.get('settings') == cache_settings(config, mode)
+
+
+def encode_windows(wav, stft_layer, encoder_layer, context_size, num_samples, device):
+    """
+    Выход энкодера для всех окон аудио сразу. stft и энкодер не имеют состояния между окнами,
+    поэтому окна (контекст + num_samples) нарезаются через unfold и прогоняются батчами,
+    результат совпадает с покадровым циклом в utils.train.
+    """
+    x = torch.nn.functional.pad(wav.to(device), (context_size, 0))
+    windows = x.unfold(0, context_size + num_samples, num_samples)
+    features = []
+    with torch.no_grad():
+        for i in range(0, len(windows), ENCODER_BATCH):
+            out = encoder_layer(stft_layer(windows[i:i + ENCODER_BATCH]))
+            features.append(out.squeeze(-1).cpu())
+    return torch.cat(features) if features else torch.zeros(0, FEATURE_DIM)
+
+
+def precompute_features(config, jit_model, mode='train'):
+    """
+    Один проход stft+encoder по датасету с записью признаков, разметки и масок в шарды.
+    Для train сохраняется исходная версия каждого аудио и `feature_cache_aug_copies`
+    аугментированных копий с фиксированным seed (банк аугментаций), так что кэш
+    воспроизводим и его можно переиспользовать между запусками.
+    """
+    dataset = SileroVadDataset(config, mode=mode)
+    context_size = 32 if config.tune_8k else 64
+    num_samples = 256 if config.tune_8k else 512
+    stft_layer = jit_model._model_8k.stft if config.tune_8k else jit_model._model.stft
+    encoder_layer = jit_model._model_8k.encoder if config.tune_8k else jit_model._model.encoder
+    resample = torchaudio.transforms.Resample(orig_freq=dataset.sr, new_freq=8000) if config.tune_8k else None
+
+    settings = cache_settings(config, mode)
+    writer = ShardWriter(cache_dir(config, mode),
+                         fields={'features': (np.float16 if settings['fp16'] else np.float32, (FEATURE_DIM,)),
+                                 'labels': (np.uint8, ()),
+                                 'masks': (np.float32, ())},
+                         shard_rows=config.feature_cache_shard_windows)
+
+    copies = 1 + settings['aug_copies']
+    for idx in tqdm(range(len(dataset)), desc=f'Caching {mode} features'):
+        wav, gt, mask = dataset.load_speech_sample(idx)
+        for copy in range(copies):
+            audio = wav
+            if copy:
+                random.seed(copy * len(dataset) + idx)
+                np.random.seed((copy * len(dataset) + idx) % 2 ** 32)
+                audio = dataset.add_augs(wav)
+            labels, masks = gt, mask
+            if mode == 'train' and len(audio) > dataset.max_train_length_samples:
+                audio = audio[:dataset.max_train_length_samples]
+                labels = labels[:int(dataset.max_train_length_samples / dataset.num_samples)]
+                masks = masks[:int(dataset.max_train_length_samples / dataset.num_samples)]
+
+            audio = torch.FloatTensor(audio)
+            if resample is not None:
+                audio = resample(audio)
+            features = encode_windows(audio, stft_layer, encoder_layer, context_size, num_samples, config.device)
+            assert len(features) == len(labels)
+            writer.add(features=features.numpy(), labels=labels, masks=masks)
+
+    writer.close(settings=settings)
+    return ShardReader(cache_dir(config, mode))
+
+
+class CachedFeatureDataset(Dataset):
+    """Признаки энкодера из кэша: (T, 128) признаки, (T,) разметка и (T,) маски на каждое аудио."""
+
+    def __init__(self, path):
+        self.reader = ShardReader(path)
+        print(f'CACHED DATASET SIZE : {len(self.reader)}')
+
+    def __getitem__(self, idx):
+        item = self.reader.get(idx)
+        return (torch.from_numpy(item['features'].astype(np.float32)),
+                torch.from_numpy(item['labels'].astype(np.float32)),
+                torch.from_numpy(np.array(item['masks'])))
+
+    def __len__(self):
+        return len(self.reader)
+
+
+def CachedFeaturePadder(batch):
+    features, labels, masks = zip(*batch)
+    features = torch.nn.utils.rnn.pad_sequence(features, batch_first=True, padding_value=0)
+    labels = torch.nn.utils.rnn.pad_sequence(labels, batch_first=True, padding_value=0)
+    masks = torch.nn.utils.rnn.pad_sequence(masks, batch_first=True, padding_value=0)
+    return features, labels, masks
+
+
+def decode(decoder, features):
+    """Прогон только декодера по закэшированным признакам (B, T, 128) -> вероятности (B, T)."""
+    outs = []
+    state = torch.zeros(0)
+    for t in range(features.shape[1]):
+        out, state = decoder(features[:, t].unsqueeze(-1), state)
+        outs.append(out)
+    return torch.cat(outs, dim=2).squeeze(1)
+
+
+def train_cached(config,
+                 loader,
+                 decoder,
+                 criterion,
+                 optimizer,
+                 device):
+
+    losses = AverageMeter()
+    decoder.train()
+
+    with torch.enable_grad():
+        for _, (features, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
+            features = features.to(device)
+            targets = targets.to(device)
+            masks = masks.to(device)
+
+            stacked = decode(decoder, features)
+
+            loss = criterion(stacked, targets)
+            loss = (loss * masks).mean()
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            losses.update(loss.item(), masks.numel())
+
+    gc.collect()
+
+    return losses.avg
+
+
+def validate_cached(config,
+                    loader,
+                    decoder,
+                    criterion,
+                    device):
+
+    losses = AverageMeter()
+    decoder.eval()
+
+    roc = build_roc_meter(config)
+
+    with torch.no_grad():
+        for _, (features, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
+            features = features.to(device)
+            targets = targets.to(device)
+            masks = masks.to(device)
+
+            stacked = decode(decoder, features)
+
+            roc.update(stacked[masks != 0], targets[masks != 0])
+
+            loss = criterion(stacked, targets)
+            loss = (loss * masks).mean()
+            losses.update(loss.item(), masks.numel())
+    score = roc.compute()
+
+    gc.collect()
+
+    return losses.avg, round(score, 3)
+
+
+def build_cached_loaders(config, jit_model):
+    """Пересчитывает кэш, если его нет или он устарел, и возвращает train/val даталоадеры поверх него."""
+    loaders = []
+    for mode in ['train', 'val']:
+        if cache_is_valid(config, mode):
+            print(f'Using cached {mode} features from {cache_dir(config, mode)}')
+        else:
+            precompute_features(config, jit_model, mode)
+        dataset = CachedFeatureDataset(cache_dir(config, mode))
+        loaders.append(torch.utils.data.DataLoader(dataset,
+                                                   batch_size=config.batch_size,
+                                                   shuffle=mode == 'train',
+                                                   collate_fn=CachedFeaturePadder,
+                                                   num_workers=config.num_workers))
+    return loaders
+
+
+if __name__ == '__main__':
+    config = OmegaConf.load('config.yml')
+    if config.jit_model_path:
+        model = init_jit_model(config.jit_model_path, device=config.device)
+    elif config.use_torchhub:
+        model, _ = torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', onnx=False)
+    else:
+        from silero_vad import load_silero_vad
+        model = load_silero_vad(onnx=False)
+    model.to(config.device)
+    for mode in ['train', 'val']:
+        precompute_features(config, model, mode)
+    print('Done')
@@ -0,0 +1,74 @@
+from utils import read_audio
+from shards import ShardWriter
+from torch.utils.data import Dataset
+from omegaconf import OmegaConf
+from tqdm import tqdm
+import pandas as pd
+import numpy as np
+import torchaudio
+import torch
+import os
+
+SAMPLE_RATE = 16000  # constant, do not change
+NUM_SAMPLES = 512  # constant, do not change
+
+
+def to_pcm16(wav):
+    return (torch.clamp(wav, -1, 32767 / 32768) * 32768).round().to(torch.int16).numpy()
+
+
+class PackSource(Dataset):
+    """
+    Декодирует одно аудио из манифеста: 16к PCM (дополненный до кратного 512), тот же сигнал в 8к
+    и разметку по окнам. Используется только при упаковке, чтобы декодирование шло в воркерах DataLoader.
+    """
+
+    def __init__(self, dataset_path):
+        dataframe = pd.read_feather(dataset_path, columns=['audio_path', 'speech_ts'])
+        self.audio_paths = dataframe['audio_path'].tolist()
+        self.speech_ts = dataframe['speech_ts'].tolist()
+        self.resampler = torchaudio.transforms.Resample(orig_freq=SAMPLE_RATE, new_freq=8000)
+
+    def __len__(self):
+        return len(self.audio_paths)
+
+    def __getitem__(self, idx):
+        wav = read_audio(self.audio_paths[idx], SAMPLE_RATE)
+        if len(wav) % NUM_SAMPLES != 0:
+            wav = torch.nn.functional.pad(wav, (0, NUM_SAMPLES - len(wav) % NUM_SAMPLES))
+
+        gt = np.zeros(len(wav))
+        for i in self.speech_ts[idx]:
+            gt[int(i['start'] * SAMPLE_RATE): int(i['end'] * SAMPLE_RATE)] = 1
+        labels = (np.average(gt.reshape(-1, NUM_SAMPLES), axis=1) > 0.5).astype(np.uint8)
+
+        return to_pcm16(wav), to_pcm16(self.resampler(wav)), labels
+
+
+def pack_dataset(config, mode):
+    """
+    Упаковывает датасет в шарды `packed_dataset_dir/<mode>`: int16 PCM 16к и 8к и метки окон,
+    плюс индекс смещений. Маски не хранятся, они строятся из меток с текущим `noise_loss`.
+    """
+    dataset_path = config.train_dataset_path if mode == 'train' else config.val_dataset_path
+    source = PackSource(dataset_path)
+    loader = torch.utils.data.DataLoader(source,
+                                         batch_size=None,
+                                         num_workers=config.num_workers)
+    writer = ShardWriter(os.path.join(config.packed_dataset_dir, mode),
+                         fields={'pcm_16k': (np.int16, ()),
+                                 'pcm_8k': (np.int16, ()),
+                                 'labels': (np.uint8, ())},
+                         shard_rows=config.packed_shard_samples)
+    for pcm_16k, pcm_8k, labels in tqdm(loader, total=len(source), desc=f'Packing {mode}'):
+        writer.add(pcm_16k=pcm_16k.numpy(), pcm_8k=pcm_8k.numpy(), labels=labels.numpy())
+    writer.close(dataset_path=os.path.abspath(dataset_path), sample_rate=SAMPLE_RATE, num_samples=NUM_SAMPLES)
+    print(f'Packed {len(source)} files into {writer.shard + 1} shards')
+
+
+if __name__ == '__main__':
+    config = OmegaConf.load('config.yml')
+    assert config.packed_dataset_dir, 'set packed_dataset_dir in config.yml'
+    for mode in ['train', 'val']:
+        pack_dataset(config, mode)
+    print('Done')
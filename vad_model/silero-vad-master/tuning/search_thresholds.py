@@ -1,4 +1,5 @@
-from utils import init_jit_model, predict, calculate_best_thresholds, SileroVadDataset, SileroVadPadder
+from utils import init_jit_model, predict, predict_streaming, calculate_best_thresholds, HysteresisThresholdSearch, \
+                  SileroVadDataset, SileroVadPadder
 from omegaconf import OmegaConf
 import torch
 torch.set_num_threads(1)
@@ -29,8 +30,17 @@ if __name__ == '__main__':
     print('Model loaded')
     model.to(config.device)
 
-    print('Making predicts...')
-    all_predicts, all_gts = predict(model, loader, config.device, sr=8000 if config.tune_8k else 16000)
-    print('Calculating thresholds...')
-    best_ths_enter, best_ths_exit, best_acc = calculate_best_thresholds(all_predicts, all_gts)
+    sr = 8000 if config.tune_8k else 16000
+    if config.get('exact_metrics', False):
+        print('Making predicts...')
+        all_predicts, all_gts = predict(model, loader, config.device, sr=sr)
+        print('Calculating thresholds...')
+        best_ths_enter, best_ths_exit, best_acc = calculate_best_thresholds(all_predicts, all_gts)
+    else:
+        print('Making predicts and accumulating threshold statistics...')
+        search = predict_streaming(model, loader, config.device, sr, HysteresisThresholdSearch())
+        best_ths_enter, best_ths_exit, best_acc = search.best()
     print(f'Best threshold: {best_ths_enter}\nBest exit threshold: {best_ths_exit}\nBest accuracy: {best_acc}')
+    if not config.get('exact_metrics', False):
+        precision, recall = search.precision_recall(best_ths_enter, best_ths_exit)
+        print(f'Speech precision: {precision:.3f}\nSpeech recall: {recall:.3f}')
@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+
+
+class ShardWriter:
+    """
+    Appends variable-length items to contiguous raw shard files, one file per field and shard,
+    plus an offset index. Every field of an item lands in the same shard, so a reader maps
+    one shard and slices it without copies. Fields: {name: (dtype, trailing_shape)}.
+    """
+
+    def __init__(self, out_dir, fields, shard_rows=1_000_000):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.fields = {name: (np.dtype(dtype).str, tuple(shape)) for name, (dtype, shape) in fields.items()}
+        self.primary = next(iter(self.fields))
+        self.shard_rows = shard_rows
+        self.shard = -1
+        self.rows = {name: 0 for name in self.fields}
+        self.files = {}
+        self.index = []
+        self._next_shard()
+
+    def _path(self, shard, name):
+        return os.path.join(self.out_dir, f'shard_{shard:05d}.{name}.bin')
+
+    def _next_shard(self):
+        for f in self.files.values():
+            f.close()
+        self.shard += 1
+        self.rows = {name: 0 for name in self.fields}
+        self.files = {name: open(self._path(self.shard, name), 'wb') for name in self.fields}
+
+    def add(self, **arrays):
+        """Appends one item (all fields given); returns its index."""
+        primary_rows = len(arrays[self.primary])
+        if self.rows[self.primary] and self.rows[self.primary] + primary_rows > self.shard_rows:
+            self._next_shard()
+        entry = [self.shard]
+        for name, (dtype, shape) in self.fields.items():
+            array = np.ascontiguousarray(arrays[name], dtype=dtype)
+            assert array.shape[1:] == shape, f'{name}: expected trailing shape {shape}, got {array.shape[1:]}'
+            self.files[name].write(array.tobytes())
+            entry += [self.rows[name], len(array)]
+            self.rows[name] += len(array)
+        self.index.append(entry)
+        return len(self.index) - 1
+
+    def close(self, **meta):
+        for f in self.files.values():
+            f.close()
+        np.save(os.path.join(self.out_dir, 'index.npy'), np.asarray(self.index, dtype=np.int64).reshape(-1, 1 + 2 * len(self.fields)))
+        with open(os.path.join(self.out_dir, 'meta.json'), 'w') as f:
+            json.dump({'fields': {name: [dtype, list(shape)] for name, (dtype, shape) in self.fields.items()},
+                       'shards': self.shard + 1, **meta}, f, indent=2)
+
+
+class ShardReader:
+    """
+    Zero-copy access to a ShardWriter directory. Shards are memory-mapped on first use in
+    each process (so the reader can be handed to DataLoader workers) and items come back
+    as read-only views into the page cache.
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        with open(os.path.join(out_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.fields = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in self.meta['fields'].items()}
+        self.index = np.load(os.path.join(out_dir, 'index.npy'))
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_maps'] = {}  # memmaps are reopened in each worker
+        return state
+
+    def _map(self, shard, name):
+        key = (shard, name)
+        if key not in self._maps:
+            dtype, shape = self.fields[name]
+            path = os.path.join(self.out_dir, f'shard_{shard:05d}.{name}.bin')
+            data = np.memmap(path, dtype=dtype, mode='r') if os.path.getsize(path) else np.empty(0, dtype)
+            self._maps[key] = data.reshape((-1,) + shape)
+        return self._maps[key]
+
+    def get(self, idx):
+        entry = self.index[idx]
+        shard = int(entry[0])
+        item = {}
+        for k, name in enumerate(self.fields):
+            start, length = int(entry[1 + 2 * k]), int(entry[2 + 2 * k])
+            item[name] = self._map(shard, name)[start:start + length]
+        return item
+
+    def lengths(self, name=None):
+        """Per-item length of a field (default: the first one), e.g. for length-bucketed batching."""
+        k = list(self.fields).index(name) if name else 0
+        return self.index[:, 2 + 2 * k]
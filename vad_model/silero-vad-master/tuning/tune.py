@@ -1,4 +1,5 @@
 from utils import SileroVadDataset, SileroVadPadder, VADDecoderRNNJIT, train, validate, init_jit_model
+from feature_cache import build_cached_loaders, train_cached, validate_cached
 from omegaconf import OmegaConf
 import torch.nn as nn
 import torch
@@ -7,18 +8,6 @@ import torch
 if __name__ == '__main__':
     config = OmegaConf.load('config.yml')
 
-    train_dataset = SileroVadDataset(config, mode='train')
-    train_loader = torch.utils.data.DataLoader(train_dataset,
-                                               batch_size=config.batch_size,
-                                               collate_fn=SileroVadPadder,
-                                               num_workers=config.num_workers)
-
-    val_dataset = SileroVadDataset(config, mode='val')
-    val_loader = torch.utils.data.DataLoader(val_dataset,
-                                             batch_size=config.batch_size,
-                                             collate_fn=SileroVadPadder,
-                                             num_workers=config.num_workers)
-
     if config.jit_model_path:
         print(f'Loading model from the local folder: {config.jit_model_path}')
         model = init_jit_model(config.jit_model_path, device=config.device)
@@ -36,6 +25,23 @@ if __name__ == '__main__':
 
     print('Model loaded')
     model.to(config.device)
+
+    if config.use_feature_cache:
+        # stft и энкодер заморожены: считаем их один раз и обучаем только декодер
+        train_loader, val_loader = build_cached_loaders(config, model)
+    else:
+        train_dataset = SileroVadDataset(config, mode='train')
+        train_loader = torch.utils.data.DataLoader(train_dataset,
+                                                   batch_size=config.batch_size,
+                                                   collate_fn=SileroVadPadder,
+                                                   num_workers=config.num_workers)
+
+        val_dataset = SileroVadDataset(config, mode='val')
+        val_loader = torch.utils.data.DataLoader(val_dataset,
+                                                 batch_size=config.batch_size,
+                                                 collate_fn=SileroVadPadder,
+                                                 num_workers=config.num_workers)
+
     decoder = VADDecoderRNNJIT().to(config.device)
     decoder.load_state_dict(model._model_8k.decoder.state_dict() if config.tune_8k else model._model.decoder.state_dict())
     decoder.train()
@@ -47,8 +53,12 @@ if __name__ == '__main__':
     best_val_roc = 0
     for i in range(config.num_epochs):
         print(f'Starting epoch {i + 1}')
-        train_loss = train(config, train_loader, model, decoder, criterion, optimizer, config.device)
-        val_loss, val_roc = validate(config, val_loader, model, decoder, criterion, config.device)
+        if config.use_feature_cache:
+            train_loss = train_cached(config, train_loader, decoder, criterion, optimizer, config.device)
+            val_loss, val_roc = validate_cached(config, val_loader, decoder, criterion, config.device)
+        else:
+            train_loss = train(config, train_loader, model, decoder, criterion, optimizer, config.device)
+            val_loss, val_roc = validate(config, val_loader, model, decoder, criterion, config.device)
         print(f'Metrics after epoch {i + 1}:\n'
               f'\tTrain loss: {round(train_loss, 3)}\n',
               f'\tValidation loss: {round(val_loss, 3)}\n'
@@ -9,6 +9,7 @@ import warnings
 import random
 import torch
 import gc
+import os
 warnings.filterwarnings('ignore')
 
 
@@ -73,11 +74,20 @@ class SileroVadDataset(Dataset):
         assert self.max_train_length_samples % self.num_samples == 0
         assert mode in ['train', 'val']
 
-        dataset_path = config.train_dataset_path if mode == 'train' else config.val_dataset_path
-        self.dataframe = pd.read_feather(dataset_path).reset_index(drop=True)
-        self.index_dict = self.dataframe.to_dict('index')
+        packed_dataset_dir = config.get('packed_dataset_dir', '')
+        if packed_dataset_dir:
+            # предварительно декодированные шарды из pack_dataset.py, читаются через memmap без копий
+            from shards import ShardReader
+            self.packed = ShardReader(os.path.join(packed_dataset_dir, mode))
+            self.index_dict = None
+        else:
+            dataset_path = config.train_dataset_path if mode == 'train' else config.val_dataset_path
+            self.dataframe = pd.read_feather(dataset_path).reset_index(drop=True)
+            self.index_dict = self.dataframe.to_dict('index')
+            self.packed = None
         self.mode = mode
-        print(f'DATASET SIZE : {len(self.dataframe)}')
+        self.resampler = torchaudio.transforms.Resample(orig_freq=self.sr, new_freq=8000) if self.resample_to_8k else None
+        print(f'DATASET SIZE : {len(self)}')
 
         if mode == 'train':
             self.augs = build_audiomentations_augs(p=config.aug_prob)
@@ -86,6 +96,11 @@ class SileroVadDataset(Dataset):
 
     def __getitem__(self, idx):
         idx = None if self.mode == 'train' else idx
+        if self.packed is not None and self.resample_to_8k and self.mode == 'val':
+            # без аугментаций можно сразу брать 8к аудио, ресемплированное при упаковке
+            item = self.packed.get(idx)
+            gt, mask = self.packed_ground_truth(item['labels'])
+            return torch.from_numpy(self.packed_pcm(item['pcm_8k'])), torch.FloatTensor(gt), torch.from_numpy(mask)
         wav, gt, mask = self.load_speech_sample(idx)
 
         if self.mode == 'train':
@@ -97,17 +112,19 @@ class SileroVadDataset(Dataset):
 
         wav = torch.FloatTensor(wav)
         if self.resample_to_8k:
-            transform = torchaudio.transforms.Resample(orig_freq=self.sr,
-                                                       new_freq=8000)
-            wav = transform(wav)
+            wav = self.resampler(wav)
         return wav, torch.FloatTensor(gt), torch.from_numpy(mask)
 
     def __len__(self):
-        return len(self.index_dict)
+        return len(self.packed) if self.packed is not None else len(self.index_dict)
 
     def load_speech_sample(self, idx=None):
         if idx is None:
-            idx = random.randint(0, len(self.index_dict) - 1)
+            idx = random.randint(0, len(self) - 1)
+        if self.packed is not None:
+            item = self.packed.get(idx)
+            gt, mask = self.packed_ground_truth(item['labels'])
+            return self.packed_pcm(item['pcm_16k']), gt, mask
         wav = read_audio(self.index_dict[idx]['audio_path'], self.sr).numpy()
 
         if len(wav) % self.num_samples != 0:
@@ -134,6 +151,16 @@ class SileroVadDataset(Dataset):
         mask[squeezed_predicts == 0] = self.noise_loss
         return squeezed_predicts, mask
 
+    @staticmethod
+    def packed_pcm(pcm):
+        return np.multiply(pcm, 1 / 32768, dtype=np.float32)
+
+    def packed_ground_truth(self, labels):
+        gt = labels.astype(int)
+        mask = np.ones(len(gt))
+        mask[gt == 0] = self.noise_loss
+        return gt, mask
+
     def add_augs(self, wav):
         while True:
             try:
@@ -205,6 +232,119 @@ class AverageMeter(object):
         self.avg = self.sum / self.count
 
 
+class StreamingRocAuc(object):
+    """ROC-AUC from per-class histograms of the predicted probability, O(bins) memory"""
+
+    def __init__(self, bins=10000):
+        self.bins = bins
+        self.reset()
+
+    def reset(self):
+        self.positives = None
+        self.negatives = None
+
+    def update(self, predicts, targets):
+        predicts = predicts.detach().flatten()
+        positive = targets.detach().flatten() > 0.5
+        idx = (predicts * self.bins).long().clamp_(0, self.bins - 1)
+        if self.positives is None:
+            self.positives = torch.zeros(self.bins, dtype=torch.float64, device=predicts.device)
+            self.negatives = torch.zeros(self.bins, dtype=torch.float64, device=predicts.device)
+        self.positives += torch.bincount(idx[positive], minlength=self.bins)
+        self.negatives += torch.bincount(idx[~positive], minlength=self.bins)
+
+    def compute(self):
+        positives = self.positives.cpu().numpy() if self.positives is not None else np.zeros(self.bins)
+        negatives = self.negatives.cpu().numpy() if self.negatives is not None else np.zeros(self.bins)
+        if not positives.sum() or not negatives.sum():
+            raise ValueError('Only one class present in y_true. ROC AUC score is not defined in that case.')
+        # P(score of a positive > score of a negative), pairs in the same bin count as ties
+        positives_above = np.cumsum(positives[::-1])[::-1] - positives
+        return float((negatives * (positives_above + 0.5 * positives)).sum() / (positives.sum() * negatives.sum()))
+
+
+class ExactRocAuc(object):
+    """Keeps every prediction and computes sklearn's exact ROC-AUC at the end"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.predicts = []
+        self.targets = []
+
+    def update(self, predicts, targets):
+        self.predicts.append(predicts.detach().flatten().float().cpu())
+        self.targets.append(targets.detach().flatten().cpu())
+
+    def compute(self):
+        return roc_auc_score(torch.cat(self.targets).numpy(), torch.cat(self.predicts).numpy())
+
+
+def build_roc_meter(config):
+    if config.get('exact_metrics', False):
+        return ExactRocAuc()
+    return StreamingRocAuc(config.get('metric_bins', 10000))
+
+
+class HysteresisThresholdSearch(object):
+    """
+    Streaming version of calculate_best_thresholds: every (enter, exit) pair of the grid is
+    evaluated on each batch as it arrives, keeping only per-pair sums of per-file accuracy and
+    confusion counts (tp, fp, fn, tn) instead of every prediction.
+    """
+
+    def __init__(self, grid=np.linspace(0, 1, 20), pairs_per_step=16):
+        pairs = [(ths_enter, ths_exit) for ths_enter in grid for ths_exit in grid if ths_exit < ths_enter]
+        self.enter = torch.tensor([p[0] for p in pairs], dtype=torch.float32)
+        self.exit = torch.tensor([p[1] for p in pairs], dtype=torch.float32)
+        self.pairs_per_step = pairs_per_step
+        self.accuracy_sum = np.zeros(len(pairs))
+        self.confusion = np.zeros((len(pairs), 4), dtype=np.int64)
+        self.files = 0
+
+    def update(self, predicts, targets, masks):
+        predicts, targets, masks = predicts.detach().float().cpu(), targets.cpu(), masks.cpu()
+        valid = masks != 0
+        # predict() drops masked frames before the state machine runs, so move valid frames to the front
+        order = torch.sort((~valid).int(), dim=1, stable=True).indices
+        lengths = valid.sum(dim=1)
+        keep = lengths > 0
+        predicts = predicts.gather(1, order)[keep]
+        targets = targets.gather(1, order)[keep] > 0.5
+        lengths = lengths[keep]
+        valid = torch.arange(predicts.shape[1])[None] < lengths[:, None]
+        positions = torch.arange(predicts.shape[1])
+
+        for k in range(0, len(self.enter), self.pairs_per_step):
+            enter = self.enter[k:k + self.pairs_per_step, None, None]
+            exit = self.exit[k:k + self.pairs_per_step, None, None]
+            decided = torch.full((len(enter),) + predicts.shape, -1, dtype=torch.int8)
+            decided[(predicts <= exit).expand_as(decided)] = 0
+            decided[(predicts >= enter).expand_as(decided)] = 1
+            # the speech flag holds its last decided value; it starts as non-speech
+            last = torch.where(decided >= 0, positions, torch.full_like(positions, -1)).cummax(dim=2).values
+            speech = (decided.gather(2, last.clamp(min=0)) == 1) & (last >= 0)
+
+            hits = (speech == targets) & valid
+            self.accuracy_sum[k:k + self.pairs_per_step] += (hits.sum(dim=2) / lengths).sum(dim=1).numpy()
+            for j, (pred, gt) in enumerate([(True, True), (True, False), (False, True), (False, False)]):
+                counts = ((speech == pred) & (targets == gt) & valid).sum(dim=(1, 2))
+                self.confusion[k:k + self.pairs_per_step, j] += counts.numpy()
+        self.files += len(lengths)
+
+    def best(self):
+        mean_acc = np.round(self.accuracy_sum / max(self.files, 1), 3)
+        k = int(np.argmax(mean_acc))
+        return round(float(self.enter[k]), 2), round(float(self.exit[k]), 2), mean_acc[k]
+
+    def precision_recall(self, ths_enter, ths_exit):
+        """Frame-level speech precision and recall at a grid pair, e.g. the one best() chose."""
+        k = int(np.argmin(np.abs(self.enter.numpy() - ths_enter) + np.abs(self.exit.numpy() - ths_exit)))
+        tp, fp, fn, _ = self.confusion[k]
+        return tp / max(tp + fp, 1), tp / max(tp + fn, 1)
+
+
 def train(config,
           loader,
           jit_model,
@@ -260,8 +400,7 @@ def validate(config,
     losses = AverageMeter()
     decoder.eval()
 
-    predicts = []
-    gts = []
+    roc = build_roc_meter(config)
 
     context_size = 32 if config.tune_8k else 64
     num_samples = 256 if config.tune_8k else 512
@@ -285,13 +424,12 @@ def validate(config,
                 outs.append(out)
             stacked = torch.cat(outs, dim=2).squeeze(1)
 
-            predicts.extend(stacked[masks != 0].tolist())
-            gts.extend(targets[masks != 0].tolist())
+            roc.update(stacked[masks != 0], targets[masks != 0])
 
             loss = criterion(stacked, targets)
             loss = (loss * masks).mean()
             losses.update(loss.item(), masks.numel())
-    score = roc_auc_score(gts, predicts)
+    score = roc.compute()
 
     torch.cuda.empty_cache()
     gc.collect()
@@ -324,6 +462,16 @@ def predict(model, loader, device, sr):
     return all_predicts, all_gts
 
 
+def predict_streaming(model, loader, device, sr, search):
+    """predict() feeding a HysteresisThresholdSearch instead of collecting per-file lists"""
+    with torch.no_grad():
+        for _, (x, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
+            x = x.to(device)
+            out = model.audio_forward(x, sr=sr)
+            search.update(out, targets, masks)
+    return search
+
+
 def calculate_best_thresholds(all_predicts, all_gts):
     best_acc = 0
     for ths_enter in tqdm(np.linspace(0, 1, 20)):
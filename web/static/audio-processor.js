@@ -1,10 +1,50 @@
+// Collects 128-sample render quanta into larger frames before posting them to the main thread.
+// Frame size is a multiple of the server's 512-sample VAD window and is set by the server on connect,
+// as is the wire encoding: 'int16' halves the uplink compared to raw 'float32' samples.
 class AudioProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    this.encoding = 'float32';
+    this.setFrameSamples((options.processorOptions || {}).frameSamples || 1024);
+    this.port.onmessage = (event) => {
+      if (event.data.encoding) this.encoding = event.data.encoding;
+      if (event.data.frameSamples) this.setFrameSamples(event.data.frameSamples);
+    };
+  }
+
+  setFrameSamples(frameSamples) {
+    this.frameSamples = frameSamples;
+    this.frame = new Float32Array(frameSamples);
+    this.filled = 0;
+  }
+
+  postFrame() {
+    if (this.encoding === 'int16') {
+      const pcm = new Int16Array(this.frameSamples);
+      for (let i = 0; i < this.frameSamples; i++) {
+        const s = Math.max(-1, Math.min(1, this.frame[i]));
+        pcm[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+      }
+      this.port.postMessage(pcm.buffer, [pcm.buffer]);
+    } else {
+      this.port.postMessage(this.frame.buffer, [this.frame.buffer]);
+      this.frame = new Float32Array(this.frameSamples);
+    }
+    this.filled = 0;
+  }
+
   process(inputs) {
     const inputChannel = inputs[0][0];
-    if (inputChannel) {
-      this.port.postMessage(inputChannel.buffer, [inputChannel.buffer]);
+    if (!inputChannel) return true;
+    let offset = 0;
+    while (offset < inputChannel.length) {
+      const count = Math.min(inputChannel.length - offset, this.frameSamples - this.filled);
+      this.frame.set(inputChannel.subarray(offset, offset + count), this.filled);
+      this.filled += count;
+      offset += count;
+      if (this.filled === this.frameSamples) this.postFrame();
     }
     return true;
   }
 }
-registerProcessor('audio-processor', AudioProcessor);
\ No newline at end of file
+registerProcessor('audio-processor', AudioProcessor);
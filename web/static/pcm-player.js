@@ -0,0 +1,52 @@
+// Plays streamed 16-bit PCM replies with a small jitter buffer, skipping MediaSource and its decoder buffering.
+// The AudioContext runs at the stream's sample rate, so samples are copied straight out of the queue.
+// Playback starts once prebufferSamples are queued (or after waiting that long for a short tail) and
+// re-buffers the same way after an underrun. The main thread is told how many samples have played.
+class PcmPlayer extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    this.prebufferSamples = (options.processorOptions || {}).prebufferSamples || 1280;
+    this.reset();
+    this.port.onmessage = (event) => {
+      if (event.data === 'reset') { this.reset(); return; }
+      this.chunks.push(new Float32Array(event.data));
+      this.queued += this.chunks[this.chunks.length - 1].length;
+    };
+  }
+
+  reset() {
+    this.chunks = [];
+    this.readOffset = 0;
+    this.queued = 0;
+    this.played = 0;
+    this.playing = false;
+    this.waited = 0;
+    this.quantaSinceReport = 0;
+  }
+
+  process(inputs, outputs) {
+    const output = outputs[0][0];
+    if (!this.playing && this.queued > 0) {
+      this.waited += output.length;
+      this.playing = this.queued >= this.prebufferSamples || this.waited >= this.prebufferSamples;
+    }
+    let written = 0;
+    while (this.playing && written < output.length && this.chunks.length) {
+      const chunk = this.chunks[0];
+      const count = Math.min(output.length - written, chunk.length - this.readOffset);
+      output.set(chunk.subarray(this.readOffset, this.readOffset + count), written);
+      written += count;
+      this.readOffset += count;
+      if (this.readOffset === chunk.length) { this.chunks.shift(); this.readOffset = 0; }
+    }
+    output.fill(0, written);
+    this.queued -= written;
+    this.played += written;
+    if (this.playing && this.queued === 0) { this.playing = false; this.waited = 0; }
+    // ~50 ms at 16 kHz; often enough to reopen the mic on time without flooding the port.
+    if (written && ++this.quantaSinceReport >= 6) { this.quantaSinceReport = 0; this.port.postMessage(this.played); }
+    else if (!written && this.quantaSinceReport) { this.quantaSinceReport = 0; this.port.postMessage(this.played); }
+    return true;
+  }
+}
+registerProcessor('pcm-player', PcmPlayer);
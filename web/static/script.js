@@ -48,15 +48,29 @@ document.addEventListener('DOMContentLoaded', () => {
     const connectionChime = document.getElementById('connection-chime');
     const typingSound = document.getElementById('typing-sound');
 
+    const UPLINK_FRAME_MS = 64; // Mic audio is batched into 32-100 ms frames instead of one message per 8 ms
+    const UPLINK_ENCODING = 'int16'; // 16-bit PCM on the wire: half the bytes of float32
+    // Reply audio formats in order of preference; the server picks the first one it allows.
+    // Raw PCM starts playing soonest, MP3/Opus use a fraction of the bytes.
+    const PLAYBACK_FORMATS = ['pcm_16000', 'mp3', 'opus'];
+    const MSE_TYPES = { mp3: 'audio/mpeg', opus: 'audio/ogg; codecs="opus"' };
+    const PCM_SAMPLE_RATE = 16000;
+    const PCM_PREBUFFER_MS = 80; // Jitter buffer: audio queued before PCM playback (re)starts
+
     // State variables
     let socket;
     let audioContext, workletNode, mediaStream;
-    let timerInterval, seconds = 0;
+    let timerInterval, ringTimer, seconds = 0;
     let mediaSource, sourceBuffer, audioElement;
     let audioQueue = [], isAppending = false;
     let isAiSpeaking = false, isMuted = false;
+    let replyMediaStart = 0, playbackEndTimer = null;
+    let playbackFormat = 'mp3', pcmReady = Promise.resolve(false);
+    let pcmContext, pcmPlayer, pcmCarry = null, pcmQueued = 0, pcmPlayed = 0;
     let currentAiMessageElement = null;
     let aiSpeakingAnimationId;
+    let currentContact = null;
+    let uplinkEncoding = null;
 
     // --- SCREEN MANAGEMENT LOGIC ---
     if (document.getElementById('model-select-screen').classList.contains('active')) {
@@ -99,36 +113,48 @@ document.addEventListener('DOMContentLoaded', () => {
         callerTune.play().catch(e => console.error("Caller tune failed to play:", e));
         const randomDelay = Math.random() * 4000 + 1000;
 
-        setTimeout(() => {
+        // The socket opens as the phone starts ringing: the server warms its vendor connections
+        // (and prefetches the greeting) while the caller tune plays, and the call is answered after.
+        try {
+            setupAudioPlayback();
+            const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+            // MODIFIED: Pass the selected character name as a URL parameter
+            const wsUrl = `${wsProtocol}//${window.location.host}/ws?password=${encodeURIComponent(password)}&character=${contact}`;
+            // Reconnecting after a dropped call resumes the same conversation on the server.
+            const savedSession = sessionStorage.getItem(`session-${contact}`);
+            currentContact = contact;
+            socket = new WebSocket(savedSession ? `${wsUrl}&session=${encodeURIComponent(savedSession)}` : wsUrl);
+            socket.binaryType = 'arraybuffer';
+            socket.onopen = () => negotiatePlayback();
+            socket.onmessage = handleSocketMessage;
+            socket.onclose = (event) => {
+                if (event.code === 4001) { alert("Authentication failed."); }
+                endCall(`Connection closed (code: ${event.code})`, true);
+            };
+            socket.onerror = () => endCall('A connection error occurred.', true);
+        } catch (error) {
+            endCall('Failed to initialize call.');
+            return;
+        }
+
+        const answerCall = () => {
+            setupAudioProcessing();
+            socket.send(JSON.stringify({ type: 'call_connected' }));
+            callName.textContent = contact;
+            showScreen('call-screen');
+            startTimer();
+            updateMuteButton();
+            updateChatInputState();
+            updateStatusIndicator('listening');
+            setTimeout(() => { addMessageToChatLog('ai', "I'm connected! By default, we're in VOICE mode. Just start talking! To switch to TEXT mode, press the Mute button."); }, 500);
+        };
+
+        ringTimer = setTimeout(() => {
             callerTune.pause();
             callerTune.currentTime = 0;
             connectionChime.play().catch(e => console.error("Chime failed to play:", e));
-            try {
-                setupAudioPlayback();
-                const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-                // MODIFIED: Pass the selected character name as a URL parameter
-                const wsUrl = `${wsProtocol}//${window.location.host}/ws?password=${encodeURIComponent(password)}&character=${contact}`;
-                socket = new WebSocket(wsUrl);
-                
-                socket.onopen = () => {
-                    setupAudioProcessing();
-                    callName.textContent = contact;
-                    showScreen('call-screen');
-                    startTimer();
-                    updateMuteButton();
-                    updateChatInputState();
-                    updateStatusIndicator('listening');
-                    setTimeout(() => { addMessageToChatLog('ai', "I'm connected! By default, we're in VOICE mode. Just start talking! To switch to TEXT mode, press the Mute button."); }, 500);
-                };
-                socket.onmessage = handleSocketMessage;
-                socket.onclose = (event) => {
-                    if (event.code === 4001) { alert("Authentication failed."); }
-                    endCall(`Connection closed (code: ${event.code})`);
-                };
-                socket.onerror = () => endCall('A connection error occurred.');
-            } catch (error) {
-                endCall('Failed to initialize call.');
-            }
+            if (socket.readyState === WebSocket.OPEN) answerCall();
+            else socket.addEventListener('open', answerCall, { once: true });
         }, randomDelay);
     };
     
@@ -146,16 +172,23 @@ document.addEventListener('DOMContentLoaded', () => {
             mediaStream = await navigator.mediaDevices.getUserMedia({ audio: { sampleRate: 16000, channelCount: 1, echoCancellation: true, noiseSuppression: true } });
             audioContext = new AudioContext({ sampleRate: 16000 });
             await audioContext.audioWorklet.addModule('/static/audio-processor.js');
-            workletNode = new AudioWorkletNode(audioContext, 'audio-processor');
+            workletNode = new AudioWorkletNode(audioContext, 'audio-processor', { processorOptions: { frameSamples: 1024 } });
+            // Ask for ~64 ms int16 frames; the server answers with the exact frame size.
+            // Mic audio is held back until that answer arrives so the server never misreads the encoding.
+            // Browsers may ignore the 16 kHz hint: report the real rate and the server resamples.
+            uplinkEncoding = null;
+            socket.send(JSON.stringify({ type: 'audio_config', frame_ms: UPLINK_FRAME_MS, encoding: UPLINK_ENCODING,
+                                         sample_rate: audioContext.sampleRate }));
             workletNode.port.onmessage = (event) => {
-                if (isMuted || isAiSpeaking || audioQueue.length > 0 || socket?.readyState !== WebSocket.OPEN) return;
+                if (!uplinkEncoding || isMuted || isAiSpeaking || socket?.readyState !== WebSocket.OPEN) return;
                 
                 const audioBuffer = event.data;
                 const base64Data = btoa(String.fromCharCode.apply(null, new Uint8Array(audioBuffer)));
                 socket.send(JSON.stringify({ type: 'audio_chunk', data: base64Data }));
 
-                const floatArray = new Float32Array(audioBuffer);
-                const avgVolume = floatArray.reduce((a, b) => a + Math.abs(b), 0) / floatArray.length;
+                const samples = uplinkEncoding === 'int16' ? new Int16Array(audioBuffer) : new Float32Array(audioBuffer);
+                const fullScale = uplinkEncoding === 'int16' ? 32768 : 1;
+                const avgVolume = samples.reduce((a, b) => a + Math.abs(b), 0) / samples.length / fullScale;
                 let scale = 1 + avgVolume * 8;
                 scale = Math.min(scale, 1.3);
                 callVisualizer.style.transform = `scale(${scale})`;
@@ -169,10 +202,18 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function setupAudioPlayback() {
         audioElement = new Audio();
+        playbackFormat = 'mp3';
+        openMediaSource(MSE_TYPES.mp3);
+        pcmReady = setupPcmPlayer();
+    }
+
+    function openMediaSource(mimeCodec) {
+        if (!window.MediaSource) return;
+        if (audioElement.src) URL.revokeObjectURL(audioElement.src);
+        sourceBuffer = null;
         mediaSource = new MediaSource();
         audioElement.src = URL.createObjectURL(mediaSource);
         mediaSource.addEventListener('sourceopen', () => {
-            const mimeCodec = 'audio/mpeg';
             if (MediaSource.isTypeSupported(mimeCodec)) {
                 sourceBuffer = mediaSource.addSourceBuffer(mimeCodec);
                 sourceBuffer.addEventListener('updateend', () => { isAppending = false; processAudioQueue(); });
@@ -180,6 +221,55 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Raw PCM goes to an AudioWorklet in a context running at the stream's rate, so no resampling is
+    // needed. Browsers that won't run a context at that rate simply don't offer PCM.
+    async function setupPcmPlayer() {
+        pcmCarry = null; pcmQueued = 0; pcmPlayed = 0;
+        if (!window.AudioWorkletNode) return false;
+        try {
+            pcmContext = new AudioContext({ sampleRate: PCM_SAMPLE_RATE, latencyHint: 'interactive' });
+            if (pcmContext.sampleRate !== PCM_SAMPLE_RATE) { pcmContext.close(); pcmContext = null; return false; }
+            await pcmContext.audioWorklet.addModule('/static/pcm-player.js');
+            pcmPlayer = new AudioWorkletNode(pcmContext, 'pcm-player', {
+                outputChannelCount: [1],
+                processorOptions: { prebufferSamples: PCM_PREBUFFER_MS * PCM_SAMPLE_RATE / 1000 },
+            });
+            pcmPlayer.port.onmessage = (event) => { pcmPlayed = event.data; };
+            pcmPlayer.connect(pcmContext.destination);
+            return true;
+        } catch (err) {
+            console.error("PCM player unavailable:", err);
+            return false;
+        }
+    }
+
+    const negotiatePlayback = async () => {
+        const pcmSupported = await pcmReady;
+        const formats = PLAYBACK_FORMATS.filter(format => format === 'pcm_16000'
+            ? pcmSupported
+            : !!window.MediaSource && MediaSource.isTypeSupported(MSE_TYPES[format]));
+        if (socket?.readyState === WebSocket.OPEN) socket.send(JSON.stringify({ type: 'playback_config', formats }));
+    };
+
+    // 16-bit little-endian PCM; a chunk can end halfway through a sample, which is carried over.
+    function playPcmChunk(buffer) {
+        let bytes = new Uint8Array(buffer);
+        if (pcmCarry) {
+            const joined = new Uint8Array(pcmCarry.length + bytes.length);
+            joined.set(pcmCarry); joined.set(bytes, pcmCarry.length);
+            bytes = joined; pcmCarry = null;
+        }
+        const whole = bytes.length - (bytes.length % 2);
+        if (whole < bytes.length) pcmCarry = bytes.slice(whole);
+        if (!whole || !pcmPlayer) return;
+        const pcm = new Int16Array(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + whole));
+        const samples = new Float32Array(pcm.length);
+        for (let i = 0; i < pcm.length; i++) samples[i] = pcm[i] / 32768;
+        if (pcmContext.state === 'suspended') pcmContext.resume().catch(e => console.error("PCM playback failed:", e));
+        pcmPlayer.port.postMessage(samples.buffer, [samples.buffer]);
+        pcmQueued += pcm.length;
+    }
+
     function processAudioQueue() {
         if (isAppending || audioQueue.length === 0 || !sourceBuffer || sourceBuffer.updating) return;
         isAppending = true;
@@ -187,15 +277,63 @@ document.addEventListener('DOMContentLoaded', () => {
         sourceBuffer.appendBuffer(audioChunk);
     }
 
+    const isPcmPlayback = () => playbackFormat === 'pcm_16000';
+
+    // Seconds of reply audio played so far on this call.
+    const playbackClock = () => isPcmPlayback() ? pcmPlayed / PCM_SAMPLE_RATE : audioElement.currentTime;
+
+    // End of everything queued so far on the playback timeline; a reply's audio starts here.
+    const bufferedMediaEnd = () => {
+        if (isPcmPlayback()) return pcmQueued / PCM_SAMPLE_RATE;
+        if (!sourceBuffer || sourceBuffer.buffered.length === 0) return 0;
+        return sourceBuffer.buffered.end(sourceBuffer.buffered.length - 1);
+    };
+
+    const finishAiSpeaking = () => {
+        clearTimeout(playbackEndTimer);
+        playbackEndTimer = null;
+        isAiSpeaking = false;
+        updateStatusIndicator('listening');
+        stopAiSpeakingAnimation();
+    };
+
+    // The server reports exactly how much audio the reply holds (playback_end_at, in seconds), so the
+    // mic reopens when the player reaches that point instead of after a fixed delay. If playback never
+    // starts (autoplay blocked, unsupported codec) the wall clock takes over shortly after.
+    const reopenMicAtPlaybackEnd = (playbackEndAt) => {
+        const target = replyMediaStart + playbackEndAt;
+        const deadline = performance.now() + Math.max(0, target - playbackClock()) * 1000 + 1500;
+        const check = () => {
+            const remaining = target - playbackClock();
+            if (remaining <= 0.05 || performance.now() > deadline) { finishAiSpeaking(); return; }
+            playbackEndTimer = setTimeout(check, Math.min(remaining * 1000, 250));
+        };
+        clearTimeout(playbackEndTimer);
+        if (!playbackEndAt) { finishAiSpeaking(); return; }
+        check();
+    };
+
     function handleSocketMessage(event) {
-        if (event.data instanceof Blob) {
+        if (event.data instanceof ArrayBuffer) {
+            if (isPcmPlayback()) { playPcmChunk(event.data); return; }
             if (audioElement.paused) { audioElement.play().catch(e => console.error("Audio play failed:", e)); }
-            const reader = new FileReader();
-            reader.onload = function() { audioQueue.push(reader.result); processAudioQueue(); };
-            reader.readAsArrayBuffer(event.data);
+            audioQueue.push(event.data);
+            processAudioQueue();
         } else {
             const msg = JSON.parse(event.data);
-            if (msg.type === 'user_transcript') {
+            if (msg.type === 'audio_config') {
+                if (workletNode) workletNode.port.postMessage({ frameSamples: msg.frame_samples, encoding: msg.encoding });
+                uplinkEncoding = msg.encoding;
+            } else if (msg.type === 'playback_config') {
+                // MP3's MediaSource is already open; Opus needs its own.
+                if (msg.format === 'opus' && playbackFormat !== 'opus') openMediaSource(MSE_TYPES.opus);
+                playbackFormat = msg.format;
+            } else if (msg.type === 'session') {
+                sessionStorage.setItem(`session-${currentContact}`, msg.token);
+                if (msg.resumed) {
+                    msg.history.forEach(m => addMessageToChatLog(m.role === 'user' ? 'user' : 'ai', m.content));
+                }
+            } else if (msg.type === 'user_transcript') {
                 addMessageToChatLog('user', msg.data);
                 currentAiMessageElement = null;
                 updateStatusIndicator('processing');
@@ -210,20 +348,27 @@ document.addEventListener('DOMContentLoaded', () => {
                 else { currentAiMessageElement.textContent += msg.data; }
                 chatLog.scrollTop = chatLog.scrollHeight;
             } else if (msg.type === 'tts_start') {
+                clearTimeout(playbackEndTimer);
+                replyMediaStart = Math.max(bufferedMediaEnd(), playbackClock());
                 isAiSpeaking = true;
                 updateStatusIndicator('speaking');
                 startAiSpeakingAnimation();
+            } else if (msg.type === 'fallback') {
+                // A vendor is down: the server keeps replying in text, so switch the call to TEXT mode.
+                if (msg.reason === 'stt') {
+                    addMessageToChatLog('ai', "I can't hear you properly right now. Let's switch to text for a bit!");
+                    if (!isMuted) toggleMute();
+                }
             } else if (msg.type === 'tts_end') {
-                setTimeout(() => {
-                    isAiSpeaking = false;
-                    updateStatusIndicator('listening');
-                    stopAiSpeakingAnimation();
-                }, 2000); 
+                reopenMicAtPlaybackEnd(msg.playback_end_at || 0);
             }
         }
     }
     
-    const endCall = (reason = 'Call ended.') => {
+    const endCall = (reason = 'Call ended.', keepSession = false) => {
+        // Hanging up on purpose starts a fresh conversation next time; a dropped connection resumes.
+        if (!keepSession && currentContact) sessionStorage.removeItem(`session-${currentContact}`);
+        clearTimeout(ringTimer);
         callerTune.pause(); callerTune.currentTime = 0;
         connectionChime.pause(); connectionChime.currentTime = 0;
         if (audioElement) { audioElement.pause(); audioElement.src = ''; }
@@ -234,7 +379,10 @@ document.addEventListener('DOMContentLoaded', () => {
         if (audioContext && audioContext.state !== 'closed') audioContext.close();
         if (socket && socket.readyState !== WebSocket.CLOSED) socket.close();
         if (audioElement && audioElement.src) URL.revokeObjectURL(audioElement.src);
+        if (pcmContext && pcmContext.state !== 'closed') pcmContext.close();
+        pcmContext = null; pcmPlayer = null;
         audioQueue = []; isAiSpeaking = false;
+        clearTimeout(playbackEndTimer); playbackEndTimer = null;
         stopAiSpeakingAnimation();
         showScreen('model-select-screen');
         updateStatusIndicator('idle');